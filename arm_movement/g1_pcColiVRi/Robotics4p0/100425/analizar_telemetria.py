@@ -0,0 +1,210 @@
+"""
+Análisis fuera de línea de los registros (data_g1_*.csv o .g1t de telemetria.py).
+
+Por articulación de brazos y cintura calcula, con NumPy sobre el registro
+completo:
+    - pico y RMS de tau_est, también como fracción del par máximo del URDF (effort);
+    - tiempo por encima de cada umbral (fracciones del par máximo);
+    - pico de velocidad y percentil 99 de aceleración (dq del registro si lo
+      tiene; si no, derivada de q).
+Con --rutina, el registro se alinea a los pasos de la rutina (duraciones
+redondeadas a ticks, como en el reproductor) a partir de --inicio o del primer
+movimiento, y se agregan por paso el pico de torque y el error de posición al
+final del paso.
+
+Las articulaciones cerca del límite se listan en "alertas". La salida es JSON.
+
+Uso:
+    python3 analizar_telemetria.py <registro> [...] [--rutina rutina.txt] [--inicio S] [--rapido]
+                                   [--umbrales 0.5,0.8] [--salida informe.json]
+"""
+import json
+import os
+import sys
+
+import numpy as np
+
+from telemetria import cargar_registro
+
+RUTA_LANZAMIENTO = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))),
+    "lanzamiento_aura")
+sys.path.insert(0, RUTA_LANZAMIENTO)
+from modelo_g1 import ModeloG1  # noqa: E402
+from rutinas import (ARM_JOINTS, COLUMNA, CONTROL_DT, CONTROL_DT_RAPIDO, RutinaInvalida,  # noqa: E402
+                     cargar_rutina, resolver_pasos, ticks_de)
+
+# Fracciones del par máximo del URDF
+UMBRALES = (0.5, 0.8)
+# Alerta: el pico supera ALERTA_PICO del par máximo o el RMS supera ALERTA_RMS
+ALERTA_PICO = 0.8
+ALERTA_RMS = 0.4
+# Velocidad (rad/s) a partir de la cual se considera que la rutina empezó
+VELOCIDAD_MOVIMIENTO = 0.1
+# Un hueco entre muestras de más de HUECO veces el periodo típico no cuenta como tiempo registrado
+HUECO = 5.0
+
+
+def pesos_tiempo(t):
+    """Tiempo (s) que representa cada muestra, sin contar los huecos del registro."""
+    if len(t) < 2:
+        return np.ones(len(t))
+    dt = np.diff(t, append=t[-1] + np.median(np.diff(t)))
+    return np.clip(dt, 0.0, HUECO * np.median(dt))
+
+
+def velocidades(registro):
+    """(velocidad, aceleración) por muestra y motor."""
+    if len(registro) < 3:
+        cero = np.zeros_like(registro.q, dtype=np.float64)
+        return cero, cero
+    t = registro.t
+    if "dq" in registro.columnas:
+        v = registro.dq.astype(np.float64)
+    else:
+        v = np.gradient(registro.q.astype(np.float64), t, axis=0)
+    return v, np.gradient(v, t, axis=0)
+
+
+def esfuerzos_urdf(articulaciones):
+    modelo = ModeloG1()
+    return np.array([modelo.articulacion(j).esfuerzo for j in articulaciones])
+
+
+def redondear(x, decimales=4):
+    return round(float(x), decimales)
+
+
+def por_articulacion(registro, articulaciones, esfuerzos, umbrales=UMBRALES):
+    tau = np.abs(registro.tau[:, articulaciones].astype(np.float64))
+    pesos = pesos_tiempo(registro.t)
+    total = pesos.sum()
+    pico = tau.max(axis=0)
+    rms = np.sqrt((tau ** 2 * pesos[:, None]).sum(axis=0) / total)
+    encima = {u: (pesos[:, None] * (tau > u * esfuerzos)).sum(axis=0) for u in umbrales}
+    v, a = velocidades(registro)
+    v, a = np.abs(v[:, articulaciones]), np.abs(a[:, articulaciones])
+    dq_pico = v.max(axis=0)
+    ddq_p99 = np.percentile(a, 99, axis=0)
+    resultado = {}
+    for k, joint in enumerate(articulaciones):
+        resultado[str(joint)] = {
+            "tau_pico": redondear(pico[k]),
+            "tau_rms": redondear(rms[k]),
+            "esfuerzo_urdf": redondear(esfuerzos[k]),
+            "carga_pico": redondear(pico[k] / esfuerzos[k]),
+            "carga_rms": redondear(rms[k] / esfuerzos[k]),
+            "tiempo_sobre_umbral": {str(u): redondear(encima[u][k], 3) for u in umbrales},
+            "dq_pico": redondear(dq_pico[k]),
+            "ddq_p99": redondear(ddq_p99[k]),
+        }
+    return resultado
+
+
+def detectar_inicio(registro, articulaciones, velocidad=VELOCIDAD_MOVIMIENTO):
+    """Instante (s) de la primera muestra en que algún brazo se mueve."""
+    v, _ = velocidades(registro)
+    moviendo = np.flatnonzero(np.abs(v[:, articulaciones]).max(axis=1) > velocidad)
+    return float(registro.t[moviendo[0]]) if len(moviendo) else 0.0
+
+
+def por_paso(registro, articulaciones, ruta_rutina, inicio=None, control_dt=CONTROL_DT):
+    """
+    Estadísticas de cada paso de la rutina; el paso k termina en
+    inicio + suma de sus duraciones redondeadas a ticks.
+    """
+    destinos, duraciones = resolver_pasos(cargar_rutina(ruta_rutina))
+    if inicio is None:
+        inicio = detectar_inicio(registro, articulaciones)
+    fines = inicio + np.cumsum([ticks_de(d, control_dt) for d in duraciones]) * control_dt
+    limites = np.searchsorted(registro.t, np.concatenate([[inicio], fines]))
+    limites = np.clip(limites, 0, len(registro) - 1)
+    columnas = [COLUMNA[j] for j in articulaciones]
+    q = registro.q[:, articulaciones].astype(np.float64)
+    tau = np.abs(registro.tau[:, articulaciones].astype(np.float64))
+    pasos = []
+    for k, (a, b) in enumerate(zip(limites[:-1], limites[1:])):
+        tramo = tau[a:b + 1]
+        error = q[b] - destinos[k, columnas]
+        peor = int(np.abs(error).argmax())
+        pasos.append({
+            "paso": k + 1,
+            "inicio": redondear(registro.t[a], 3),
+            "fin": redondear(fines[k], 3),
+            "muestras": int(b - a),
+            "tau_pico": {str(j): redondear(x) for j, x in zip(articulaciones, tramo.max(axis=0))},
+            "error_final": {str(j): redondear(x) for j, x in zip(articulaciones, error)},
+            "peor_articulacion": articulaciones[peor],
+            "peor_error": redondear(error[peor]),
+        })
+    return {"rutina": ruta_rutina, "inicio": redondear(inicio, 3), "pasos": pasos,
+            "fuera_del_registro": bool(fines[-1] > registro.t[-1])}
+
+
+def alertas(ruta, articulaciones):
+    resultado = []
+    for joint, datos in articulaciones.items():
+        if datos["carga_pico"] > ALERTA_PICO:
+            resultado.append({"registro": ruta, "articulacion": int(joint), "motivo": "pico",
+                              "carga": datos["carga_pico"]})
+        if datos["carga_rms"] > ALERTA_RMS:
+            resultado.append({"registro": ruta, "articulacion": int(joint), "motivo": "rms",
+                              "carga": datos["carga_rms"]})
+    return resultado
+
+
+def analizar(ruta, rutina=None, inicio=None, umbrales=UMBRALES, control_dt=CONTROL_DT):
+    registro = cargar_registro(ruta)
+    presentes = registro.meta.get("articulaciones", ARM_JOINTS)
+    articulaciones = [j for j in ARM_JOINTS if j in presentes]
+    informe = {
+        "registro": ruta,
+        "muestras": len(registro),
+        "duracion": redondear(registro.duracion, 3),
+        "articulaciones": por_articulacion(registro, articulaciones, esfuerzos_urdf(articulaciones), umbrales),
+    }
+    if rutina:
+        informe["rutina"] = por_paso(registro, articulaciones, rutina, inicio, control_dt)
+    return informe
+
+
+def valor_de(opcion, convertir=str, defecto=None):
+    if opcion not in sys.argv:
+        return defecto
+    return convertir(sys.argv[sys.argv.index(opcion) + 1])
+
+
+def main():
+    opciones = ("--rutina", "--inicio", "--umbrales", "--salida")
+    args = [a for i, a in enumerate(sys.argv[1:], 1)
+            if not a.startswith("--") and sys.argv[i - 1] not in opciones]
+    if not args:
+        print(f"Uso: python3 {sys.argv[0]} <registro> [...] [--rutina rutina.txt] [--inicio S] [--rapido] "
+              "[--umbrales 0.5,0.8] [--salida informe.json]")
+        sys.exit(1)
+    rutina = valor_de("--rutina")
+    inicio = valor_de("--inicio", float)
+    umbrales = valor_de("--umbrales", lambda s: tuple(float(u) for u in s.split(",")), UMBRALES)
+    control_dt = CONTROL_DT_RAPIDO if "--rapido" in sys.argv else CONTROL_DT
+
+    informes, avisos = [], []
+    for ruta in args:
+        try:
+            informe = analizar(ruta, rutina, inicio, umbrales, control_dt)
+        except (OSError, ValueError, RutinaInvalida) as e:
+            print(f"{ruta}: error: {e}", file=sys.stderr)
+            continue
+        informes.append(informe)
+        avisos += alertas(ruta, informe["articulaciones"])
+    texto = json.dumps({"registros": informes, "alertas": avisos}, indent=2, ensure_ascii=False)
+    salida = valor_de("--salida")
+    if salida:
+        with open(salida, "w") as f:
+            f.write(texto)
+        print(f"{len(informes)} registros analizados, {len(avisos)} alertas -> '{salida}'.")
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,524 @@
+"""
+Bus local del estado del robot en memoria compartida.
+
+Un solo proceso puente se suscribe por DDS a rt/lowstate y rt/odommodestate y
+copia cada mensaje a un anillo en `multiprocessing.shared_memory`. Las demás
+herramientas del mismo PC (registros, visualizadores, captura, reproductor)
+leen de ahí en lugar de abrir su propia suscripción, así que el costo de
+deserializar el flujo de 500 Hz se paga una vez sin importar cuántas haya.
+
+Cada canal es un anillo de RANURAS muestras guardado por columnas (t, q, dq,
+tau, IMU...; la odometría tiene las suyas). Un solo escritor protege cada
+ranura con un seqlock: antes de escribir pone su secuencia en impar y al
+terminar en par, y al final publica el contador del canal. El lector copia la
+ranura y la acepta solo si la secuencia era par y no cambió durante la copia;
+si no, vuelve a leer. `columnas()` devuelve las vistas NumPy del anillo sin
+copiar, para quien prefiera leerlas directamente y validar con `valida()`.
+
+La cabecera lleva también el PID del escritor, una generación (distinta en
+cada segmento creado) y un latido: el instante de la última escritura, que
+el puente renueva además cada segundo aunque no lleguen mensajes. Un bus
+cuyo escritor murió o que no late desde hace LATIDO_MAXIMO s no se abre, y
+quien lo crea de nuevo reemplaza un segmento así.
+
+Uso:
+    python3 bus_estado.py <interfaz_red>      (el puente; Ctrl+C lo cierra y libera la memoria)
+
+Los consumidores usan `suscribir()` en lugar de ChannelSubscriber: si el
+puente está corriendo leen del bus, y si no, se suscriben por DDS como antes.
+En cada proceso hay un solo hilo de sondeo por canal; los mensajes de cada
+lote se arman una vez y se entregan a todos los handlers del canal. Si el bus
+deja de latir, el hilo lo vuelve a abrir: si el puente se reinició (otra
+generación) sigue con el nuevo, y si ya no hay bus pasa a DDS y lo avisa.
+Sin robot, reproducir_telemetria.py crea el bus en lugar del puente y lo llena
+con un registro grabado.
+"""
+import os
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+NOMBRE_BUS = "g1_estado"
+MAGIA = b"G1BUS002"
+# ~2 s de rt/lowstate: un lector que se atrase menos que eso no pierde muestras
+RANURAS = 1024
+MOTORES = 35
+# Cada cuánto revisa el bus un suscriptor (s)
+PERIODO_SONDEO = 0.001
+# Sin latido por más de esto (s) el bus se da por abandonado
+LATIDO_MAXIMO = 3.0
+# Cada cuánto revisa un suscriptor sin muestras nuevas si el bus sigue vivo (s)
+PERIODO_REVISION = 0.5
+CANALES = {"rt/lowstate": "bajo", "rt/odommodestate": "odom"}
+
+COLUMNAS = {
+    "bajo": [("t", np.float64, None), ("tick", np.uint32, None),
+             ("q", np.float32, MOTORES), ("dq", np.float32, MOTORES), ("tau", np.float32, MOTORES),
+             ("quaternion", np.float32, 4), ("gyroscope", np.float32, 3),
+             ("accelerometer", np.float32, 3), ("rpy", np.float32, 3)],
+    "odom": [("t", np.float64, None), ("position", np.float32, 3), ("velocity", np.float32, 3),
+             ("yaw_speed", np.float32, None), ("quaternion", np.float32, 4), ("rpy", np.float32, 3)],
+}
+
+
+def disposicion(ranuras=RANURAS):
+    """{canal: [(columna, dtype, forma, offset)]} y el tamaño total en bytes."""
+    offset = 64  # MAGIA, ranuras, un contador por canal, PID, generación y latido
+    resultado = {}
+    for canal, columnas in COLUMNAS.items():
+        resultado[canal] = [("seq", np.uint64, (ranuras,), offset)]
+        offset += ranuras * 8
+        for nombre, dtype, ancho in columnas:
+            forma = (ranuras, ancho) if ancho else (ranuras,)
+            offset = -(-offset // 8) * 8
+            resultado[canal].append((nombre, dtype, forma, offset))
+            offset += int(np.prod(forma)) * np.dtype(dtype).itemsize
+    return resultado, offset
+
+
+class BusEstado:
+    """Vistas NumPy sobre la memoria compartida; la crea el puente y la abren los lectores."""
+
+    def __init__(self, nombre=NOMBRE_BUS, crear=False, ranuras=RANURAS):
+        if crear:
+            capas, tamano = disposicion(ranuras)
+            self.memoria = shared_memory.SharedMemory(nombre, create=True, size=tamano)
+        else:
+            self.memoria = shared_memory.SharedMemory(nombre)
+            # El segmento es del puente: que este proceso no lo borre al salir
+            resource_tracker.unregister(self.memoria._name, "shared_memory")
+            if bytes(self.memoria.buf[:8]) != MAGIA:
+                self.memoria.close()
+                raise ValueError(f"'{nombre}' no es un bus de estado")
+            ranuras = int(np.ndarray(1, np.uint64, self.memoria.buf, 8)[0])
+            capas, _ = disposicion(ranuras)
+        self.creador = crear
+        self.ranuras = ranuras
+        self.contadores = np.ndarray(len(COLUMNAS), np.uint64, self.memoria.buf, 16)
+        self.escritor = np.ndarray(2, np.uint64, self.memoria.buf, 32)  # PID, generación
+        self.latido = np.ndarray(1, np.float64, self.memoria.buf, 48)
+        self.canales = {
+            canal: {nombre: np.ndarray(forma, dtype, self.memoria.buf, offset)
+                    for nombre, dtype, forma, offset in columnas}
+            for canal, columnas in capas.items()
+        }
+        self.indice = {canal: i for i, canal in enumerate(COLUMNAS)}
+        if crear:
+            np.ndarray(1, np.uint64, self.memoria.buf, 8)[0] = ranuras
+            self.escritor[:] = os.getpid(), time.time_ns()
+            self.latir()
+            # La magia al final: un lector no acepta la cabecera a medio escribir
+            self.memoria.buf[:8] = MAGIA
+        self.generacion = int(self.escritor[1])
+
+    @staticmethod
+    def crear(nombre=NOMBRE_BUS, ranuras=RANURAS):
+        """
+        Crea el bus; si ya hay uno abandonado (ver vivo()) lo reemplaza.
+        FileExistsError si el que hay sigue vivo.
+        """
+        try:
+            return BusEstado(nombre, crear=True, ranuras=ranuras)
+        except FileExistsError:
+            try:
+                viejo = BusEstado(nombre)
+            except ValueError:
+                viejo = None
+            if viejo is not None:
+                vivo = viejo.vivo()
+                viejo.cerrar()
+                if vivo:
+                    raise
+            shared_memory.SharedMemory(nombre).unlink()
+            return BusEstado(nombre, crear=True, ranuras=ranuras)
+
+    def cerrar(self):
+        # Las vistas tienen que soltarse antes de cerrar el segmento
+        self.canales = self.contadores = self.escritor = self.latido = None
+        self.memoria.close()
+        if self.creador:
+            self.memoria.unlink()
+
+    def vivo(self, latido_maximo=LATIDO_MAXIMO):
+        """True si el escritor sigue corriendo y latió hace menos de `latido_maximo` s."""
+        if time.monotonic() - float(self.latido[0]) > latido_maximo:
+            return False
+        try:
+            os.kill(int(self.escritor[0]), 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def latir(self):
+        """Renueva el latido (el escritor, cuando no tiene muestras que escribir)."""
+        self.latido[0] = time.monotonic()
+
+    # --- Escritor (solo el puente) ---
+
+    def _empezar(self, canal):
+        n = int(self.contadores[self.indice[canal]])
+        ranura = n % self.ranuras
+        columnas = self.canales[canal]
+        columnas["seq"][ranura] = 2 * n + 1
+        columnas["t"][ranura] = time.monotonic()
+        return n, ranura, columnas
+
+    def _publicar(self, canal, n, ranura, columnas):
+        columnas["seq"][ranura] = 2 * n + 2
+        self.contadores[self.indice[canal]] = n + 1
+        self.latido[0] = columnas["t"][ranura]
+
+    def escribir(self, canal, **valores):
+        """Una muestra a partir de columnas ya armadas; las que no se pasan conservan lo que tenía la ranura."""
+        n, i, c = self._empezar(canal)
+        for nombre, valor in valores.items():
+            c[nombre][i] = valor
+        self._publicar(canal, n, i, c)
+
+    def escribir_bajo(self, msg):
+        n, i, c = self._empezar("bajo")
+        motores = msg.motor_state[:MOTORES]
+        c["q"][i] = [m.q for m in motores]
+        c["dq"][i] = [m.dq for m in motores]
+        c["tau"][i] = [m.tau_est for m in motores]
+        c["tick"][i] = msg.tick
+        imu = msg.imu_state
+        c["quaternion"][i] = imu.quaternion
+        c["gyroscope"][i] = imu.gyroscope
+        c["accelerometer"][i] = imu.accelerometer
+        c["rpy"][i] = imu.rpy
+        self._publicar("bajo", n, i, c)
+
+    def escribir_odom(self, msg):
+        n, i, c = self._empezar("odom")
+        c["position"][i] = msg.position
+        c["velocity"][i] = msg.velocity
+        c["yaw_speed"][i] = msg.yaw_speed
+        c["quaternion"][i] = msg.imu_state.quaternion
+        c["rpy"][i] = msg.imu_state.rpy
+        self._publicar("odom", n, i, c)
+
+    # --- Lectores ---
+
+    def contador(self, canal="bajo"):
+        """Muestras publicadas hasta ahora en el canal."""
+        return int(self.contadores[self.indice[canal]])
+
+    def columnas(self, canal="bajo"):
+        """Vistas del anillo sin copiar; la muestra n está en la ranura n % ranuras."""
+        return self.canales[canal]
+
+    def valida(self, canal, n):
+        """True si la ranura de la muestra n todavía contiene esa muestra completa."""
+        return int(self.canales[canal]["seq"][n % self.ranuras]) == 2 * n + 2
+
+    def leer(self, canal="bajo", n=None):
+        """
+        Copia de la muestra n (por defecto la última) -> {columna: valor}, o
+        None si todavía no hay ninguna o ya fue sobrescrita.
+        """
+        columnas = self.canales[canal]
+        while True:
+            m = self.contador(canal) - 1 if n is None else n
+            if m < 0:
+                return None
+            ranura = m % self.ranuras
+            if int(columnas["seq"][ranura]) != 2 * m + 2:
+                if n is not None:
+                    return None
+                continue
+            copia = {nombre: v[ranura].copy() for nombre, v in columnas.items() if nombre != "seq"}
+            if int(columnas["seq"][ranura]) == 2 * m + 2:
+                return copia
+            if n is not None:
+                return None
+
+    def nuevas(self, desde, canal="bajo"):
+        """
+        Muestras desde..contador-1 en orden -> (hasta, {columna: array}, perdidas).
+        Si el lector se atrasó más que el anillo, las más viejas se pierden.
+        """
+        hasta = self.contador(canal)
+        # La ranura de la muestra hasta - ranuras puede estar escribiéndose ya
+        inicio = max(desde, hasta - self.ranuras + 1)
+        perdidas = inicio - desde
+        indices = np.arange(inicio, hasta) % self.ranuras
+        esperadas = 2 * np.arange(inicio, hasta, dtype=np.uint64) + 2
+        columnas = self.canales[canal]
+        # seq se copia primero y se vuelve a mirar al final: lo que el escritor pisó mientras tanto no sirve
+        copia = {nombre: v[indices] for nombre, v in columnas.items()}
+        buenas = (copia.pop("seq") == esperadas) & (columnas["seq"][indices] == esperadas)
+        if not buenas.all():
+            perdidas += int(np.count_nonzero(~buenas))
+            copia = {nombre: v[buenas] for nombre, v in copia.items()}
+        return hasta, copia, perdidas
+
+
+def abrir_bus(nombre=NOMBRE_BUS):
+    """El bus si el puente está corriendo y late, o None (tampoco si quedó abandonado)."""
+    try:
+        bus = BusEstado(nombre)
+    except (FileNotFoundError, ValueError):
+        return None
+    if not bus.vivo():
+        bus.cerrar()
+        return None
+    return bus
+
+
+class _Motor:
+    __slots__ = ("q", "dq", "tau_est")
+
+    def __init__(self, q, dq, tau_est):
+        self.q, self.dq, self.tau_est = q, dq, tau_est
+
+
+class _Motores:
+    """
+    motor_state de LowState_ sobre las filas de una muestra (vistas del lote
+    copiado del bus); se pasan a float al primer acceso y cada motor se crea al
+    pedirlo.
+    """
+
+    __slots__ = ("_filas", "_q", "_dq", "_tau")
+
+    def __init__(self, q, dq, tau):
+        self._filas = (q, dq, tau)
+        self._q = None
+
+    def _convertir(self):
+        self._q, self._dq, self._tau = (fila.tolist() for fila in self._filas)
+
+    def __len__(self):
+        return len(self._filas[0])
+
+    def __getitem__(self, j):
+        if self._q is None:
+            self._convertir()
+        if isinstance(j, slice):
+            return [_Motor(*v) for v in zip(self._q[j], self._dq[j], self._tau[j])]
+        return _Motor(self._q[j], self._dq[j], self._tau[j])
+
+    def __iter__(self):
+        return iter(self[:])
+
+
+class _Imu:
+    __slots__ = ("quaternion", "gyroscope", "accelerometer", "rpy")
+
+    def __init__(self, quaternion, gyroscope=None, accelerometer=None, rpy=None):
+        self.quaternion, self.gyroscope, self.accelerometer, self.rpy = quaternion, gyroscope, accelerometer, rpy
+
+
+class _Bajo:
+    __slots__ = ("motor_state", "imu_state", "tick", "t")
+
+    def __init__(self, motor_state, imu_state, tick, t):
+        self.motor_state, self.imu_state, self.tick, self.t = motor_state, imu_state, tick, t
+
+
+class _Odom:
+    __slots__ = ("position", "velocity", "yaw_speed", "imu_state", "t")
+
+    def __init__(self, position, velocity, yaw_speed, imu_state, t):
+        self.position, self.velocity, self.yaw_speed, self.imu_state, self.t = \
+            position, velocity, yaw_speed, imu_state, t
+
+
+def mensajes_bajo(columnas):
+    """
+    Objetos con la forma de LowState_ (motor_state, imu_state, tick) para un
+    lote de muestras del bus. Los motores se convierten solo si se leen.
+    """
+    imu = [columnas[k].tolist() for k in ("quaternion", "gyroscope", "accelerometer", "rpy")]
+    return [_Bajo(_Motores(q, dq, tau), _Imu(*valores_imu), tick, t)
+            for q, dq, tau, *valores_imu, tick, t in zip(columnas["q"], columnas["dq"], columnas["tau"], *imu,
+                                                         columnas["tick"].tolist(), columnas["t"].tolist())]
+
+
+def mensajes_odom(columnas):
+    """Objetos con la forma de SportModeState_ (position, velocity, yaw_speed, imu_state) para un lote."""
+    return [_Odom(p, v, w, _Imu(c, rpy=r), t)
+            for p, v, w, c, r, t in zip(*(columnas[k].tolist() for k in
+                                          ("position", "velocity", "yaw_speed", "quaternion", "rpy", "t")))]
+
+
+class _Sondeo:
+    """
+    Un hilo por canal y proceso: revisa el contador cada PERIODO_SONDEO, arma
+    los mensajes de cada lote nuevo una sola vez y los entrega en orden a
+    todos los handlers suscritos. Si el bus deja de latir se reconecta al bus
+    nuevo o, si no hay, se suscribe por DDS (`tipo`) y termina.
+    """
+
+    def __init__(self, bus, canal, topico, tipo):
+        self.bus = bus
+        self.canal = canal
+        self.topico = topico
+        self.tipo = tipo
+        self.convertir = mensajes_bajo if canal == "bajo" else mensajes_odom
+        self.handlers = []
+        self.perdidas = 0
+        self.dds = None
+        self.lock = threading.Lock()
+        self.hilo = threading.Thread(target=self._sondear, name=f"bus_{canal}", daemon=True)
+        self.hilo.start()
+
+    def _entregar(self, mensaje):
+        with self.lock:
+            handlers = list(self.handlers)
+        for handler in handlers:
+            handler(mensaje)
+
+    def _sondear(self):
+        leidas = self.bus.contador(self.canal)
+        revision = time.monotonic() + PERIODO_REVISION
+        while True:
+            if self.bus.contador(self.canal) == leidas:
+                if time.monotonic() > revision:
+                    revision = time.monotonic() + PERIODO_REVISION
+                    if not self.bus.vivo():
+                        if not self._reconectar():
+                            return
+                        leidas = self.bus.contador(self.canal)
+                        continue
+                time.sleep(PERIODO_SONDEO)
+                continue
+            revision = time.monotonic() + PERIODO_REVISION
+            leidas, columnas, perdidas = self.bus.nuevas(leidas, self.canal)
+            self.perdidas += perdidas
+            with self.lock:
+                handlers = list(self.handlers)
+            if not handlers:
+                continue
+            for mensaje in self.convertir(columnas):
+                for handler in handlers:
+                    handler(mensaje)
+
+    def _reconectar(self):
+        """
+        El bus dejó de latir: True si hay uno nuevo (el puente se reinició)
+        y se sigue con él; False si se pasó a DDS.
+        """
+        nuevo = abrir_bus()
+        if nuevo is not None and nuevo.generacion != self.bus.generacion:
+            print(f"\nBus de estado reiniciado: {self.topico} sigue desde el bus nuevo.")
+            self.bus = nuevo
+            return True
+        if nuevo is not None:
+            # Misma generación y late de nuevo: fue una pausa del escritor
+            nuevo.cerrar()
+            return True
+        print(f"\nEl bus de estado dejó de latir: {self.topico} pasa a DDS.")
+        with _lock_sondeos:
+            if _sondeos.get(self.canal) is self:
+                del _sondeos[self.canal]
+            self.bus = None
+        from unitree_sdk2py.core.channel import ChannelSubscriber
+        self.dds = ChannelSubscriber(self.topico, self.tipo)
+        self.dds.Init(self._entregar, 10)
+        return False
+
+
+_sondeos = {}
+_lock_sondeos = threading.Lock()
+
+
+class SuscriptorBus:
+    """
+    Reemplazo de ChannelSubscriber que lee del bus. Todos los suscriptores de
+    un canal en el proceso comparten el hilo de sondeo y los mensajes.
+    """
+
+    def __init__(self, sondeo):
+        self.sondeo = sondeo
+        self.canal = sondeo.canal
+        self.handler = None
+
+    @property
+    def perdidas(self):
+        return self.sondeo.perdidas
+
+    def Init(self, handler, _profundidad=None):
+        self.handler = handler
+        with self.sondeo.lock:
+            self.sondeo.handlers.append(handler)
+
+    def Close(self):
+        with self.sondeo.lock:
+            if self.handler in self.sondeo.handlers:
+                self.sondeo.handlers.remove(self.handler)
+
+
+def suscribir(canal, tipo, handler, profundidad=10):
+    """
+    Suscribe `handler` a rt/lowstate o rt/odommodestate: desde el bus si el
+    puente está corriendo, o por DDS si no. Devuelve el suscriptor.
+    """
+    sondeo = None
+    if canal in CANALES:
+        with _lock_sondeos:
+            sondeo = _sondeos.get(CANALES[canal])
+            if sondeo is None:
+                # El bus ya abierto en este proceso se reutiliza si sigue vivo
+                otro = next((s for s in _sondeos.values() if s.bus is not None and s.bus.vivo()), None)
+                bus = otro.bus if otro is not None else abrir_bus()
+                if bus is not None:
+                    sondeo = _sondeos[CANALES[canal]] = _Sondeo(bus, CANALES[canal], canal, tipo)
+    if sondeo is not None:
+        suscriptor = SuscriptorBus(sondeo)
+    else:
+        from unitree_sdk2py.core.channel import ChannelSubscriber
+        suscriptor = ChannelSubscriber(canal, tipo)
+    suscriptor.Init(handler, profundidad)
+    return suscriptor
+
+
+class PuenteEstado:
+    """Única suscripción DDS del PC: copia cada mensaje al bus."""
+
+    def __init__(self, nombre=NOMBRE_BUS):
+        self.bus = BusEstado.crear(nombre)
+
+    def Init(self):
+        from unitree_sdk2py.core.channel import ChannelSubscriber
+        from unitree_sdk2py.idl.unitree_hg.msg.dds_ import LowState_
+        from unitree_sdk2py.idl.unitree_go.msg.dds_ import SportModeState_
+        self.subscriber_low = ChannelSubscriber("rt/lowstate", LowState_)
+        self.subscriber_low.Init(self.bus.escribir_bajo, 10)
+        self.subscriber_odom = ChannelSubscriber("rt/odommodestate", SportModeState_)
+        self.subscriber_odom.Init(self.bus.escribir_odom, 10)
+
+    def cerrar(self):
+        self.bus.cerrar()
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(f"Uso: python3 {sys.argv[0]} <interfaz_red>")
+    from unitree_sdk2py.core.channel import ChannelFactoryInitialize
+    ChannelFactoryInitialize(0, sys.argv[1])
+    try:
+        puente = PuenteEstado()
+    except FileExistsError:
+        sys.exit(f"Ya hay un bus '{NOMBRE_BUS}' (¿otro puente corriendo?).")
+    puente.Init()
+    print(f"Bus '{NOMBRE_BUS}' activo. Ctrl+C para cerrar.")
+    try:
+        while True:
+            time.sleep(1.0)
+            puente.bus.latir()
+            print(f"\r  lowstate: {puente.bus.contador('bajo')}  odom: {puente.bus.contador('odom')}", end="")
+    except KeyboardInterrupt:
+        print("\nCerrando el bus.")
+    finally:
+        puente.cerrar()
+
+
+if __name__ == "__main__":
+    main()
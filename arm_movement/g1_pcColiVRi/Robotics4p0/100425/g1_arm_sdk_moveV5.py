@@ -17,9 +17,10 @@
     - Versión G1 29DoF con articulaciones compatibles para brazos, muñecas y torso.
 
     @uso
-        python3 g1_armsdk_moveV5.py <nombreInterfaz> 
+        python3 g1_armsdk_moveV5.py <nombreInterfaz> [--imu]
 
         - <nombreInterfaz>: nombre de la interfaz de red conectada al robot (ej. 'lo', 'eth0').
+        - --imu: guarda también la IMU en el registro de telemetría.
 
     @funcionalidades
     - Control de articulaciones superiores (brazos, cintura, muñecas) del G1.
@@ -27,7 +28,8 @@
     - Modo por archivo: lectura de secuencias desde archivo `.txt`, línea por línea.
     - Movimiento interpolado suave entre posiciones para mayor seguridad y fluidez.
     - Verificación de posición alcanzada al final de cada movimiento.
-    - Registro automático de posiciones y torques en archivo `.csv` con timestamp.
+    - Registro de q, dq y torque de todos los motores a 500 Hz en un archivo `.g1t` (ver telemetria.py;
+      `python3 telemetria.py <archivo> --csv` lo exporta al CSV de siempre).
     - Liberación progresiva del control y finalización segura del script.
 """
 
@@ -36,12 +38,9 @@ import sys
 import numpy as np
 import threading
 import math
-import csv
-from datetime import datetime
 
 # Importación de módulos de la SDK de Unitree para comunicación y control
 from unitree_sdk2py.core.channel import ChannelPublisher, ChannelFactoryInitialize
-from unitree_sdk2py.core.channel import ChannelSubscriber
 from unitree_sdk2py.idl.default import unitree_hg_msg_dds__LowCmd_
 from unitree_sdk2py.idl.default import unitree_hg_msg_dds__LowState_
 from unitree_sdk2py.idl.unitree_hg.msg.dds_ import LowCmd_
@@ -50,6 +49,9 @@ from unitree_sdk2py.utils.crc import CRC
 from unitree_sdk2py.utils.thread import RecurrentThread
 from unitree_sdk2py.g1.loco.g1_loco_client import LocoClient
 
+from bus_estado import suscribir
+from telemetria import RegistradorTelemetria
+
 class G1JointIndex:
     """
     Índices de las articulaciones del robot G1 de Unitree.
@@ -104,7 +106,7 @@ class G1JointIndex:
     
 class Custom:
     """Clase para controlar los movimientos del robot G1 de Unitree."""
-    def __init__(self):
+    def __init__(self, imu=False):
         self.lock = threading.Lock()  # Bloqueo para sincronización
         self.control_dt_ = 0.02  # Intervalo de control (20 ms)
         self.kp = 60.  # Ganancia proporcional
@@ -141,20 +143,8 @@ class Custom:
         self.target_pos = {joint: 0.0 for joint in self.arm_joints}  
         self.alpha = 0.05  
         
-        #Creación del CSV
-        self.csv_file = open(f"data_g1_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv", mode="w", newline="")
-        self.csv_writer = csv.writer(self.csv_file)
-
-        # Escribe encabezado del CSV
-                
-        header = ["timestamp"]
-        
-        for joint in self.arm_joints:
-            header.extend([f"q_joint{joint}", f"tau_joint{joint}"])
-        self.csv_writer.writerow(header)
-
-        
-        self.sample_count = 0
+        # Registro de telemetría: el callback solo copia al buffer, un hilo escribe el archivo
+        self.telemetria = RegistradorTelemetria(imu=imu)
 
     def Init(self):
         """Inicializa la comunicación con el robot."""
@@ -162,9 +152,9 @@ class Custom:
         self.arm_sdk_publisher = ChannelPublisher("rt/arm_sdk", LowCmd_)
         self.arm_sdk_publisher.Init()
 
-        # Suscriptor para recibir el estado del robot
-        self.lowstate_subscriber = ChannelSubscriber("rt/lowstate", LowState_)
-        self.lowstate_subscriber.Init(self.LowStateHandler, 10)
+        # Suscriptor para recibir el estado del robot (del bus local si bus_estado.py está corriendo)
+        self.telemetria.empezar()
+        self.lowstate_subscriber = suscribir("rt/lowstate", LowState_, self.LowStateHandler)
         
         #Inicialización cliente de alto nivel
         client = LocoClient()
@@ -202,20 +192,8 @@ class Custom:
 
         if not self.first_update_low_state:
             self.first_update_low_state = True
-            
-        self.sample_count += 1
-        if self.sample_count % 500 == 0:
-            self.sample_count = 0
-            # Guardar los valores de torque en el CSV
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
-            row = [timestamp]
-
-            for joint in self.arm_joints:
-                tau = msg.motor_state[joint].tau_est
-                q = msg.motor_state[joint].q
-                row.extend([q, tau])
 
-            self.csv_writer.writerow(row)
+        self.telemetria.registrar(msg)
 
     def interpolate_position(self, q_init, q_target):
         """Interpolación de posición para un movimiento suave."""
@@ -308,8 +286,10 @@ class Custom:
 
                 time.sleep(self.control_dt_)  # Esperar 20ms por cada iteración  
         
-        self.csv_file.close()  # Cierra archivo CSV correctamente
-        print("Archivo CSV cerrado.")
+        self.telemetria.terminar()  # Escribe lo que quede en el buffer y cierra el archivo
+        print(f"Telemetría guardada en '{self.telemetria.ruta}'.")
+        if self.telemetria.perdidas:
+            print(f"Aviso: se descartaron {self.telemetria.perdidas} muestras (disco lento).")
         print("\nControl liberado completamente.")
         
             
@@ -533,6 +513,6 @@ if __name__ == '__main__':
     else:
         ChannelFactoryInitialize(0)
 
-    custom = Custom()
+    custom = Custom(imu="--imu" in sys.argv)
     custom.Init()
     custom.Start()
@@ -1,33 +1,161 @@
-import csv
-import time
-from datetime import datetime
-from collections import deque
+"""
+Visualización en vivo de posición y torque mientras se graba el registro.
 
+Acepta los data_g1_*.csv y los registros binarios de telemetria.py (.g1t).
+Cada refresco solo lee lo que se agregó al archivo desde la última vez (se
+guarda el offset en bytes), lo agrega a buffers circulares de NumPy y dibuja
+una versión decimada por mínimo/máximo por tramo: los picos se conservan y
+el costo de cada refresco no crece con la duración de la sesión.
+
+Uso:
+    python3 g1_arm_sdk_visualizer_pos_torque.py [archivo.csv|archivo.g1t]
+"""
+import os
+
+import numpy as np
 from PyQt5 import QtWidgets, QtCore
 import pyqtgraph as pg
 
+from telemetria import (ARTICULACIONES_CSV, EXTENSION, MAGIA, articulaciones_csv, leer_bloque, leer_cabecera,
+                        leer_filas_csv)
+
+# 60 s a 500 Hz (o varias horas de los CSV antiguos, una fila por segundo)
+MAX_MUESTRAS = 30000
+# Tramos de la decimación: cada uno aporta su mínimo y su máximo
+PUNTOS_PANTALLA = 1000
+
+
+class BufferCircular:
+    """Últimas `capacidad` filas de (t, q, tau); `datos()` las devuelve en orden."""
+
+    def __init__(self, capacidad, columnas):
+        self.capacidad = capacidad
+        self.t = np.zeros(capacidad, dtype=np.float64)
+        self.q = np.zeros((capacidad, columnas), dtype=np.float32)
+        self.tau = np.zeros((capacidad, columnas), dtype=np.float32)
+        self.escritas = 0
+
+    def agregar(self, t, q, tau):
+        n = len(t)
+        if n > self.capacidad:
+            t, q, tau = t[-self.capacidad:], q[-self.capacidad:], tau[-self.capacidad:]
+            self.escritas += n - self.capacidad
+            n = self.capacidad
+        i = self.escritas % self.capacidad
+        primera = min(n, self.capacidad - i)
+        for destino, origen in ((self.t, t), (self.q, q), (self.tau, tau)):
+            destino[i:i + primera] = origen[:primera]
+            destino[:n - primera] = origen[primera:]
+        self.escritas += n
+
+    def datos(self):
+        if self.escritas <= self.capacidad:
+            n = self.escritas
+            return self.t[:n], self.q[:n], self.tau[:n]
+        i = self.escritas % self.capacidad
+        return tuple(np.concatenate([a[i:], a[:i]]) for a in (self.t, self.q, self.tau))
+
+
+def decimar_min_max(t, columnas, puntos=PUNTOS_PANTALLA):
+    """
+    Reduce a `puntos` tramos: cada tramo se dibuja con su mínimo y su máximo
+    (en el orden en que ocurren) en el inicio y el final del tramo. `columnas`
+    es una lista de arrays (muestras, articulaciones) con el mismo eje t.
+    """
+    n = len(t)
+    if n <= 2 * puntos:
+        return t, columnas
+    k = n // puntos
+    m = k * puntos
+    tiempos = np.empty(2 * puntos)
+    tiempos[0::2] = t[0:m:k]
+    tiempos[1::2] = t[k - 1:m:k]
+    resultado = []
+    for y in columnas:
+        tramos = y[:m].reshape(puntos, k, -1)
+        i_min, i_max = tramos.argmin(axis=1), tramos.argmax(axis=1)
+        minimo = np.take_along_axis(tramos, i_min[:, None], axis=1)[:, 0]
+        maximo = np.take_along_axis(tramos, i_max[:, None], axis=1)[:, 0]
+        primero_min = i_min <= i_max
+        decimada = np.empty((2 * puntos, y.shape[1]), dtype=y.dtype)
+        decimada[0::2] = np.where(primero_min, minimo, maximo)
+        decimada[1::2] = np.where(primero_min, maximo, minimo)
+        resultado.append(np.concatenate([decimada, y[m:]]))
+    return np.concatenate([tiempos, t[m:]]), resultado
+
+
+class FuenteCSV:
+    """Sigue un data_g1_*.csv desde el último byte leído; solo procesa líneas completas."""
+
+    def __init__(self, ruta):
+        self.archivo = open(ruta, "rb")
+        self.articulaciones = articulaciones_csv(self.archivo.readline().decode())
+        self.offset = self.archivo.tell()
+        self.inicio = None
+
+    def leer(self):
+        self.archivo.seek(self.offset)
+        nuevo = self.archivo.read()
+        fin = nuevo.rfind(b"\n") + 1
+        if fin == 0:
+            return None
+        self.offset += fin
+        lineas = [l for l in nuevo[:fin].decode().splitlines() if "," in l]
+        if not lineas:
+            return None
+        marcas, q, tau = leer_filas_csv(lineas)
+        if self.inicio is None:
+            self.inicio = marcas[0]
+        return (marcas - self.inicio).astype(np.float64) * 1e-6, q, tau
+
+
+class FuenteTelemetria:
+    """Sigue un registro .g1t bloque a bloque; un bloque a medio escribir se vuelve a intentar."""
+
+    def __init__(self, ruta, articulaciones=ARTICULACIONES_CSV):
+        self.archivo = open(ruta, "rb")
+        self.articulaciones = list(articulaciones)
+        self.cabecera = None
+
+    def leer(self):
+        if self.cabecera is None:
+            self.archivo.seek(0)
+            self.cabecera = leer_cabecera(self.archivo)
+            if self.cabecera is None:
+                return None
+        motores, imu, _, meta = self.cabecera
+        bloques = []
+        while True:
+            bloque = leer_bloque(self.archivo, motores, imu)
+            if bloque is None:
+                break
+            bloques.append(bloque)
+        if not bloques:
+            return None
+        t = np.concatenate([b["t"] for b in bloques]) - meta["inicio_monotonico"]
+        q = np.concatenate([b["q"][:, self.articulaciones] for b in bloques])
+        tau = np.concatenate([b["tau"][:, self.articulaciones] for b in bloques])
+        return t, q, tau
+
+
+def abrir_fuente(ruta):
+    with open(ruta, "rb") as f:
+        binario = f.read(len(MAGIA)) == MAGIA
+    return FuenteTelemetria(ruta) if binario or ruta.endswith(EXTENSION) else FuenteCSV(ruta)
+
+
 class CSVVisualizer(QtWidgets.QMainWindow):
-    def __init__(self, csv_file, max_samples=500, refresh_rate=50):
+    def __init__(self, csv_file, max_samples=MAX_MUESTRAS, refresh_rate=50, puntos=PUNTOS_PANTALLA):
         super().__init__()
         self.setWindowTitle("Torque y Posición de Articulaciones")
 
         self.csv_file = csv_file
-        self.max_samples = max_samples
         self.refresh_rate = refresh_rate
+        self.puntos = puntos
 
-        # Leer encabezado
-        with open(csv_file, 'r') as f:
-            reader = csv.reader(f)
-            header = next(reader)
-            self.joint_labels = header[1:]
-            self.num_joints = len(self.joint_labels) // 2
-
-        # Preparar datos
-        self.q_data = [deque(maxlen=max_samples) for _ in range(self.num_joints)]
-        self.tau_data = [deque(maxlen=max_samples) for _ in range(self.num_joints)]
-        self.time_data = deque(maxlen=max_samples)
-        self.initial_time = None
-        self.last_line = 1
+        self.fuente = abrir_fuente(csv_file)
+        self.num_joints = len(self.fuente.articulaciones)
+        self.buffer = BufferCircular(max_samples, self.num_joints)
 
         # Layout principal
         central_widget = QtWidgets.QWidget()
@@ -37,8 +165,8 @@ class CSVVisualizer(QtWidgets.QMainWindow):
         # Checkboxes para seleccionar articulaciones
         self.checkboxes = []
         checkbox_layout = QtWidgets.QVBoxLayout()
-        for i in range(self.num_joints):
-            cb = QtWidgets.QCheckBox(f"Joint {i}")
+        for joint in self.fuente.articulaciones:
+            cb = QtWidgets.QCheckBox(f"Joint {joint}")
             cb.setChecked(True)
             cb.stateChanged.connect(self.update_visibility)
             self.checkboxes.append(cb)
@@ -65,10 +193,10 @@ class CSVVisualizer(QtWidgets.QMainWindow):
 
         colors = ['r', 'g', 'b', 'c', 'm', 'y', 'w']
 
-        for i in range(self.num_joints):
+        for i, joint in enumerate(self.fuente.articulaciones):
             color = colors[i % len(colors)]
-            curve_q = self.plot_widget_q.plot(pen=pg.mkPen(color, width=2), name=f"q{i}")
-            curve_tau = self.plot_widget_tau.plot(pen=pg.mkPen(color, style=pg.QtCore.Qt.DashLine), name=f"τ{i}")
+            curve_q = self.plot_widget_q.plot(pen=pg.mkPen(color, width=2), name=f"q{joint}")
+            curve_tau = self.plot_widget_tau.plot(pen=pg.mkPen(color, style=pg.QtCore.Qt.DashLine), name=f"τ{joint}")
             self.curves_q.append(curve_q)
             self.curves_tau.append(curve_tau)
 
@@ -88,46 +216,28 @@ class CSVVisualizer(QtWidgets.QMainWindow):
 
     def update_plot(self):
         try:
-            with open(self.csv_file, 'r') as f:
-                reader = list(csv.reader(f))
-                new_rows = reader[self.last_line:]
-                if not new_rows:
-                    return
-
-                for row in new_rows:
-                    if len(row) < 2:
-                        continue
-
-                    timestamp_str = row[0]
-                    timestamp = datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S.%f")
-                    if self.initial_time is None:
-                        self.initial_time = timestamp
-
-                    elapsed = (timestamp - self.initial_time).total_seconds()
-                    self.time_data.append(elapsed)
-
-                    values = row[1:]
-                    for j in range(self.num_joints):
-                        q = float(values[j * 2])
-                        tau = float(values[j * 2 + 1])
-                        self.q_data[j].append(q)
-                        self.tau_data[j].append(tau)
-
-                self.last_line += len(new_rows)
-
-                # Actualizar gráficas
-                t = list(self.time_data)
-                for j in range(self.num_joints):
-                    self.curves_q[j].setData(t, list(self.q_data[j]))
-                    self.curves_tau[j].setData(t, list(self.tau_data[j]))
+            nuevas = self.fuente.leer()
+            if nuevas is None:
+                return
+            self.buffer.agregar(*nuevas)
+
+            # Actualizar gráficas con la versión decimada
+            t, q, tau = self.buffer.datos()
+            t, (q, tau) = decimar_min_max(t, [q, tau], self.puntos)
+            for j in range(self.num_joints):
+                self.curves_q[j].setData(t, q[:, j])
+                self.curves_tau[j].setData(t, tau[:, j])
 
         except Exception as e:
             print("Error actualizando gráfico:", e)
 
+
 if __name__ == "__main__":
     import sys
     app = QtWidgets.QApplication(sys.argv)
-    csv_path = input("Ingrese la ruta del archivo .csv: ").strip()
-    viewer = CSVVisualizer(csv_path)
+    ruta = sys.argv[1] if len(sys.argv) > 1 else input("Ingrese la ruta del archivo .csv o .g1t: ").strip()
+    if not os.path.exists(ruta):
+        sys.exit(f"No existe '{ruta}'.")
+    viewer = CSVVisualizer(ruta)
     viewer.show()
     sys.exit(app.exec_())
@@ -0,0 +1,302 @@
+"""
+Reproduce un registro grabado (data_g1_*.csv o .g1t) como si fuera rt/lowstate.
+
+Sirve para probar sin el robot los scripts que esperan el primer LowState en
+Start(): registros, visualizadores, reproductor, odometría. Cada muestra se
+publica en el instante que le toca según el registro, a `--velocidad` veces
+la velocidad real, en uno o dos destinos:
+
+    bus         (por defecto) el bus local de bus_estado.py, en lugar del
+                puente: lo leen las herramientas que usan suscribir()
+    --dds IF    LowState_ por DDS en la interfaz IF (p. ej. lo) para los
+                scripts que usan ChannelSubscriber; se inician con la misma IF
+
+Los CSV no tienen dq (se deriva de q) y las articulaciones que no están en el
+archivo se publican en 0. Como los CSV antiguos tienen pocas muestras por
+segundo, --frecuencia HZ interpola el registro a una grilla uniforme. Si el
+.g1t tiene IMU también se publica rt/odommodestate con la orientación de la
+IMU; la posición y la velocidad quedan en cero. `tick` cuenta los mensajes
+publicados y sigue creciendo al saltar o volver a empezar. Al terminar el bus
+se borra y los lectores pasan a DDS (ver bus_estado.py).
+
+Con --desde/--hasta se reproduce solo ese tramo y con --bucle se repite sin
+fin (pruebas largas). Mientras corre, escribir un número de segundos y Enter
+salta a ese instante del registro; "p" pausa o continúa.
+
+Uso:
+    python3 reproducir_telemetria.py <registro> [--velocidad 1.0] [--desde S] [--hasta S] [--bucle]
+                                     [--frecuencia HZ] [--dds interfaz] [--sin-bus]
+"""
+import sys
+import threading
+import time
+
+import numpy as np
+
+from bus_estado import NOMBRE_BUS, BusEstado
+from telemetria import COLUMNAS_IMU, cargar_registro
+
+# Tope de cada espera (s): un salto o una pausa se atiende a lo sumo con este retraso
+ESPERA_MAXIMA = 0.05
+
+
+def valor_de(opcion, convertir=str, defecto=None):
+    if opcion not in sys.argv:
+        return defecto
+    return convertir(sys.argv[sys.argv.index(opcion) + 1])
+
+
+def remuestrear(t, columnas, frecuencia):
+    """Interpolación lineal de cada columna a una grilla uniforme de `frecuencia` Hz."""
+    nuevo = np.arange(t[0], t[-1], 1.0 / frecuencia)
+    indice = np.clip(np.searchsorted(t, nuevo, side="right") - 1, 0, len(t) - 2)
+    fraccion = ((nuevo - t[indice]) / np.maximum(t[indice + 1] - t[indice], 1e-9)).astype(np.float32)
+    resultado = {}
+    for nombre, y in columnas.items():
+        f = fraccion.reshape(-1, *([1] * (y.ndim - 1)))
+        resultado[nombre] = y[indice] + (y[indice + 1] - y[indice]) * f
+    return nuevo, resultado
+
+
+def derivar(t, q):
+    """
+    dq por diferencias sobre las marcas distintas (los CSV repiten marcas);
+    las muestras con la marca repetida toman la derivada de la primera.
+    """
+    t_unico, primeras, grupo = np.unique(t, return_index=True, return_inverse=True)
+    if len(t_unico) < 3:
+        return np.zeros_like(q)
+    dq = np.gradient(np.nan_to_num(q[primeras].astype(np.float64)), t_unico, axis=0)
+    return dq[grupo]
+
+
+def preparar(registro, frecuencia=None):
+    """(t desde 0, {columna: array float32 sin NaN}) listos para publicar."""
+    t = registro.t.astype(np.float64)
+    columnas = {"q": registro.q, "tau": registro.tau}
+    if "dq" in registro.columnas:
+        columnas["dq"] = registro.dq
+    else:
+        columnas["dq"] = derivar(t, registro.q)
+    columnas.update({nombre: getattr(registro, nombre) for nombre, _ in COLUMNAS_IMU
+                     if nombre in registro.columnas})
+    columnas = {nombre: np.nan_to_num(np.asarray(v, dtype=np.float32)) for nombre, v in columnas.items()}
+    if frecuencia and len(t) > 1:
+        t, columnas = remuestrear(t, columnas, frecuencia)
+    return t - t[0], columnas
+
+
+class DestinoBus:
+    """Escribe cada muestra en el bus local, como lo haría el puente."""
+
+    def __init__(self, imu, nombre=NOMBRE_BUS):
+        self.bus = BusEstado.crear(nombre)
+        self.imu = imu
+
+    def publicar(self, muestra, tick):
+        self.bus.escribir("bajo", tick=tick, **muestra)
+        if self.imu:
+            self.bus.escribir("odom", yaw_speed=muestra["gyroscope"][2],
+                              quaternion=muestra["quaternion"], rpy=muestra["rpy"])
+
+    def latir(self):
+        # En pausa no se escribe: sin latido los lectores darían el bus por abandonado
+        self.bus.latir()
+
+    def cerrar(self):
+        self.bus.cerrar()
+
+
+class DestinoDDS:
+    """Publica LowState_ (y SportModeState_ si hay IMU) por DDS."""
+
+    def __init__(self, interfaz, imu):
+        from unitree_sdk2py.core.channel import ChannelFactoryInitialize, ChannelPublisher
+        from unitree_sdk2py.idl.default import unitree_go_msg_dds__SportModeState_, unitree_hg_msg_dds__LowState_
+        from unitree_sdk2py.idl.unitree_go.msg.dds_ import SportModeState_
+        from unitree_sdk2py.idl.unitree_hg.msg.dds_ import LowState_
+        ChannelFactoryInitialize(0, interfaz)
+        self.imu = imu
+        self.low_state = unitree_hg_msg_dds__LowState_()
+        self.publisher_low = ChannelPublisher("rt/lowstate", LowState_)
+        self.publisher_low.Init()
+        if imu:
+            self.odom_state = unitree_go_msg_dds__SportModeState_()
+            self.publisher_odom = ChannelPublisher("rt/odommodestate", SportModeState_)
+            self.publisher_odom.Init()
+
+    def publicar(self, muestra, tick):
+        msg = self.low_state
+        for motor, q, dq, tau in zip(msg.motor_state, muestra["q"].tolist(), muestra["dq"].tolist(),
+                                     muestra["tau"].tolist()):
+            motor.q, motor.dq, motor.tau_est = q, dq, tau
+        msg.tick = tick
+        if self.imu:
+            for nombre, _ in COLUMNAS_IMU:
+                setattr(msg.imu_state, nombre, muestra[nombre].tolist())
+        self.publisher_low.Write(msg)
+        if self.imu:
+            odom = self.odom_state
+            odom.yaw_speed = float(muestra["gyroscope"][2])
+            odom.imu_state.quaternion = muestra["quaternion"].tolist()
+            odom.imu_state.rpy = muestra["rpy"].tolist()
+            self.publisher_odom.Write(odom)
+
+    def latir(self):
+        pass
+
+    def cerrar(self):
+        pass
+
+
+class ReproductorTelemetria:
+    """
+    Publica las muestras en `destinos` con el horario del registro. La muestra
+    k sale en base_pared + (t[k] - base_t) / velocidad; saltar, pausar o
+    volver a empezar solo mueven esa base.
+    """
+
+    def __init__(self, t, columnas, destinos, velocidad=1.0, desde=0.0, hasta=None, bucle=False):
+        self.t = t
+        self.columnas = columnas
+        self.destinos = destinos
+        self.velocidad = velocidad
+        self.desde = desde
+        self.hasta = float(t[-1]) if hasta is None else min(hasta, float(t[-1]))
+        self.bucle = bucle
+        self.lock = threading.Lock()
+        self.publicadas = 0
+        self.vueltas = 0
+        self.atraso_maximo = 0.0
+        self.pausado = False
+        self.activo = False
+        self._ir_a(desde)
+
+    def _ir_a(self, segundo):
+        self.k = int(np.searchsorted(self.t, segundo))
+        self.base_t = float(self.t[min(self.k, len(self.t) - 1)])
+        self.base_pared = time.monotonic()
+
+    @property
+    def posicion(self):
+        return float(self.t[min(self.k, len(self.t) - 1)])
+
+    def buscar(self, segundo):
+        with self.lock:
+            self._ir_a(min(max(segundo, 0.0), self.hasta))
+
+    def pausar(self, pausado=None):
+        """Pausa, continúa o alterna (None); al continuar sigue desde donde quedó."""
+        with self.lock:
+            self.pausado = not self.pausado if pausado is None else pausado
+            if not self.pausado:
+                self._ir_a(self.posicion)
+
+    def _publicar(self, k):
+        muestra = {nombre: v[k] for nombre, v in self.columnas.items()}
+        for destino in self.destinos:
+            destino.publicar(muestra, self.publicadas)
+        self.publicadas += 1
+
+    def ejecutar(self):
+        """Publica hasta el final del tramo (o sin fin con bucle) o hasta detener()."""
+        self.activo = True
+        while self.activo:
+            with self.lock:
+                if self.pausado:
+                    espera = ESPERA_MAXIMA
+                elif self.k >= len(self.t) or self.t[self.k] > self.hasta:
+                    if not self.bucle:
+                        break
+                    self.vueltas += 1
+                    self._ir_a(self.desde)
+                    continue
+                else:
+                    espera = self.base_pared + (self.t[self.k] - self.base_t) / self.velocidad - time.monotonic()
+                    if espera <= 0:
+                        self.atraso_maximo = max(self.atraso_maximo, -espera)
+                        self._publicar(self.k)
+                        self.k += 1
+                        continue
+            time.sleep(min(espera, ESPERA_MAXIMA))
+        self.activo = False
+
+    def detener(self):
+        self.activo = False
+
+
+def leer_controles(reproductor):
+    """Número de segundos: salta a ese instante; "p": pausa o continúa."""
+    for linea in sys.stdin:
+        orden = linea.strip()
+        if orden == "p":
+            reproductor.pausar()
+        elif orden:
+            try:
+                reproductor.buscar(float(orden))
+            except ValueError:
+                print(f"\nOrden no reconocida: '{orden}' (segundos o p)")
+
+
+def main():
+    opciones = ("--velocidad", "--desde", "--hasta", "--frecuencia", "--dds")
+    args = [a for i, a in enumerate(sys.argv[1:], 1)
+            if not a.startswith("--") and sys.argv[i - 1] not in opciones]
+    if not args:
+        sys.exit(f"Uso: python3 {sys.argv[0]} <registro> [--velocidad 1.0] [--desde S] [--hasta S] [--bucle] "
+                 "[--frecuencia HZ] [--dds interfaz] [--sin-bus]")
+    interfaz = valor_de("--dds")
+    if "--sin-bus" in sys.argv and interfaz is None:
+        sys.exit("Con --sin-bus hace falta --dds <interfaz>.")
+
+    try:
+        registro = cargar_registro(args[0])
+    except (OSError, ValueError) as e:
+        sys.exit(f"{args[0]}: {e}")
+    if len(registro) < 2:
+        sys.exit(f"{args[0]}: el registro tiene menos de dos muestras.")
+    if not np.ptp(registro.t.astype(np.float64)) > 0:
+        sys.exit(f"{args[0]}: todas las muestras tienen la misma marca de tiempo.")
+    t, columnas = preparar(registro, valor_de("--frecuencia", float))
+    imu = "rpy" in columnas
+
+    destinos = []
+    reproductor = hilo = None
+    if "--sin-bus" not in sys.argv:
+        try:
+            destinos.append(DestinoBus(imu))
+        except FileExistsError:
+            sys.exit(f"Ya hay un bus '{NOMBRE_BUS}' (¿el puente o otra reproducción corriendo?).")
+    try:
+        if interfaz is not None:
+            destinos.append(DestinoDDS(interfaz, imu))
+
+        reproductor = ReproductorTelemetria(t, columnas, destinos, velocidad=valor_de("--velocidad", float, 1.0),
+                                            desde=valor_de("--desde", float, 0.0), hasta=valor_de("--hasta", float),
+                                            bucle="--bucle" in sys.argv)
+        print(f"{args[0]}: {len(t)} muestras, {t[-1]:.1f} s ({(len(t) - 1) / t[-1]:.0f} Hz)"
+              + (", con IMU" if imu else "") + f". Reproduciendo x{reproductor.velocidad:g}; "
+              "segundos + Enter salta, p pausa, Ctrl+C sale.")
+        hilo = threading.Thread(target=reproductor.ejecutar, name="reproduccion", daemon=True)
+        hilo.start()
+        threading.Thread(target=leer_controles, args=(reproductor,), name="controles", daemon=True).start()
+        while hilo.is_alive():
+            hilo.join(1.0)
+            for destino in destinos:
+                destino.latir()
+            print(f"\r  t {reproductor.posicion:7.1f}/{reproductor.hasta:.1f} s  vuelta {reproductor.vueltas}  "
+                  f"publicadas {reproductor.publicadas}  atraso máximo {reproductor.atraso_maximo * 1000:.1f} ms"
+                  + ("  (pausa)" if reproductor.pausado else ""), end="", flush=True)
+        print("\nFin del registro.")
+    except KeyboardInterrupt:
+        print("\nReproducción detenida.")
+        if hilo is not None:
+            reproductor.detener()
+            hilo.join()
+    finally:
+        for destino in destinos:
+            destino.cerrar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+"""
+Registro de telemetría de rt/lowstate a 500 Hz en un archivo binario por columnas.
+
+El callback de DDS solo copia q, dq y tau_est de todos los motores (y la IMU,
+si se pide) a un buffer circular preasignado y avanza un contador; no abre
+archivos ni formatea fechas. Un hilo aparte vuelca bloques de BLOQUE filas al
+archivo y lo hace visible (flush) para los visualizadores que lo siguen.
+
+Formato (.g1t), little-endian:
+    cabecera        CABECERA: MAGIA, versión, motores, opciones (bit 0: IMU), filas por bloque, largo del meta
+    meta            JSON utf-8: fecha, frecuencia, inicio (time.time y time.monotonic de la primera muestra)
+    bloques         BLOQUE_CABECERA: b"BLOQ", filas; después cada columna completa, en el orden de columnas():
+                    t float64 (time.monotonic), q/dq/tau float32 (filas, motores), IMU float32 (filas, 3 o 4)
+
+Todos los bloques tienen las mismas filas salvo el último. Un bloque a medio
+escribir al final del archivo se ignora, así que el archivo se puede leer
+mientras se graba.
+
+Uso:
+    python3 telemetria.py <archivo.g1t> [--csv salida.csv]
+Sin --csv muestra un resumen; con --csv lo exporta con las columnas de los
+data_g1_*.csv (timestamp, q_jointN, tau_jointN de brazos y cintura).
+"""
+import io
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+MAGIA = b"G1TL"
+VERSION = 1
+EXTENSION = ".g1t"
+CABECERA = struct.Struct("<4sHHHHI")
+BLOQUE_CABECERA = struct.Struct("<4sI")
+MAGIA_BLOQUE = b"BLOQ"
+OPCION_IMU = 1
+
+MOTORES = 35
+FRECUENCIA = 500
+# Filas por bloque (1 s a 500 Hz) y bloques que caben en el buffer circular
+BLOQUE = 500
+BLOQUES_BUFFER = 8
+
+# Articulaciones de los data_g1_*.csv: brazos y después cintura
+ARTICULACIONES_CSV = list(range(15, 29)) + [12, 13, 14]
+
+COLUMNAS_MOTOR = ("q", "dq", "tau")
+COLUMNAS_IMU = (("quaternion", 4), ("gyroscope", 3), ("accelerometer", 3), ("rpy", 3))
+
+
+def columnas(motores, imu):
+    """[(nombre, dtype, ancho)] en el orden en que se guardan dentro de cada bloque."""
+    resultado = [("t", np.float64, None)]
+    resultado += [(nombre, np.float32, motores) for nombre in COLUMNAS_MOTOR]
+    if imu:
+        resultado += [(nombre, np.float32, ancho) for nombre, ancho in COLUMNAS_IMU]
+    return resultado
+
+
+def bytes_por_fila(motores, imu):
+    return sum(np.dtype(dtype).itemsize * (ancho or 1) for _, dtype, ancho in columnas(motores, imu))
+
+
+class RegistradorTelemetria:
+    """
+    Buffer circular de BLOQUES_BUFFER bloques alimentado desde el callback de
+    rt/lowstate. Un solo escritor y sin lock: el callback escribe la fila y
+    después avanza `escritas`; el hilo de volcado solo lee filas ya contadas.
+    Si el disco se atrasa tanto que el buffer se llena, las muestras nuevas se
+    descartan (y se cuentan en `perdidas`) en lugar de pisar las no escritas.
+    """
+
+    def __init__(self, ruta=None, motores=MOTORES, imu=False, bloque=BLOQUE, bloques_buffer=BLOQUES_BUFFER):
+        if ruta is None:
+            ruta = f"data_g1_{datetime.now().strftime('%Y%m%d_%H%M%S')}{EXTENSION}"
+        self.ruta = ruta
+        self.motores = motores
+        self.imu = imu
+        self.bloque = bloque
+        self.capacidad = bloque * bloques_buffer
+        self.buffers = {
+            nombre: np.zeros((self.capacidad, ancho) if ancho else self.capacidad, dtype=dtype)
+            for nombre, dtype, ancho in columnas(motores, imu)
+        }
+        self.escritas = 0
+        self.volcadas = 0
+        self.perdidas = 0
+        self.grabando = False
+        self.archivo = None
+        self.hilo = None
+        self.aviso = threading.Event()
+
+    def empezar(self):
+        self.archivo = open(self.ruta, "wb")
+        self.escritas = self.volcadas = self.perdidas = 0
+        self.grabando = True
+        self.hilo = threading.Thread(target=self._volcar, name="telemetria", daemon=True)
+        self.hilo.start()
+
+    def registrar(self, msg):
+        """Copia el mensaje al buffer; pensado para llamarse dentro del callback de DDS."""
+        if not self.grabando:
+            return
+        n = self.escritas
+        if n - self.volcadas >= self.capacidad:
+            self.perdidas += 1
+            return
+        i = n % self.capacidad
+        b = self.buffers
+        b["t"][i] = time.monotonic()
+        motores = msg.motor_state[:self.motores]
+        # Una lista por columna y una sola conversión por fila, más barato que asignar escalar por escalar
+        b["q"][i] = [m.q for m in motores]
+        b["dq"][i] = [m.dq for m in motores]
+        b["tau"][i] = [m.tau_est for m in motores]
+        if self.imu:
+            imu = msg.imu_state
+            for nombre, _ in COLUMNAS_IMU:
+                b[nombre][i] = getattr(imu, nombre)
+        self.escritas = n + 1
+        if (n + 1) % self.bloque == 0:
+            self.aviso.set()
+
+    def terminar(self):
+        """Deja de grabar, escribe lo que quede en el buffer y cierra el archivo."""
+        if not self.grabando:
+            return
+        self.grabando = False
+        self.aviso.set()
+        self.hilo.join()
+        self._escribir_bloques(final=True)
+        self.archivo.close()
+
+    def _volcar(self):
+        while self.grabando:
+            self.aviso.wait(1.0)
+            self.aviso.clear()
+            self._escribir_bloques()
+
+    def _escribir_bloques(self, final=False):
+        while True:
+            pendientes = self.escritas - self.volcadas
+            if pendientes >= self.bloque or (final and pendientes > 0):
+                self._escribir(min(pendientes, self.bloque))
+            else:
+                break
+        self.archivo.flush()
+
+    def _escribir(self, filas):
+        if self.volcadas == 0:
+            self._escribir_cabecera()
+        inicio = self.volcadas % self.capacidad
+        # La capacidad es múltiplo del bloque: un bloque nunca da la vuelta al buffer
+        tramo = slice(inicio, inicio + filas)
+        partes = [BLOQUE_CABECERA.pack(MAGIA_BLOQUE, filas)]
+        partes += [self.buffers[nombre][tramo].tobytes() for nombre, _, _ in columnas(self.motores, self.imu)]
+        self.archivo.write(b"".join(partes))
+        self.volcadas += filas
+
+    def _escribir_cabecera(self):
+        t0 = float(self.buffers["t"][0])
+        meta = json.dumps({
+            "fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "frecuencia": FRECUENCIA,
+            # time.time() que corresponde a t0, para convertir los tiempos monotónicos a hora real
+            "inicio_reloj": time.time() - (time.monotonic() - t0),
+            "inicio_monotonico": t0,
+        }).encode("utf-8")
+        opciones = OPCION_IMU if self.imu else 0
+        self.archivo.write(CABECERA.pack(MAGIA, VERSION, self.motores, opciones, self.bloque, len(meta)) + meta)
+
+
+class Telemetria:
+    """Columnas completas de un registro: t (s desde la primera muestra), q, dq, tau (muestras, motores), IMU."""
+
+    def __init__(self, columnas, meta, motores, ruta=None):
+        self.columnas = columnas
+        self.meta = meta
+        self.motores = motores
+        self.ruta = ruta
+
+    def __getattr__(self, nombre):
+        try:
+            return self.__dict__["columnas"][nombre]
+        except KeyError:
+            raise AttributeError(nombre) from None
+
+    def __len__(self):
+        return len(self.columnas["t"])
+
+    @property
+    def duracion(self):
+        return float(self.t[-1]) if len(self) else 0.0
+
+    def reloj(self):
+        """Hora real (time.time) de cada muestra."""
+        return self.meta.get("inicio_reloj", 0.0) + self.t
+
+
+def leer_cabecera(f):
+    """Lee la cabecera desde la posición actual -> (motores, imu, bloque, meta), o None si está incompleta."""
+    datos = f.read(CABECERA.size)
+    if len(datos) < CABECERA.size:
+        return None
+    magia, version, motores, opciones, bloque, largo_meta = CABECERA.unpack(datos)
+    if magia != MAGIA:
+        raise ValueError("no es un registro de telemetría (.g1t)")
+    if version != VERSION:
+        raise ValueError(f"versión de telemetría no soportada: {version}")
+    meta = f.read(largo_meta)
+    if len(meta) < largo_meta:
+        return None
+    return motores, bool(opciones & OPCION_IMU), bloque, json.loads(meta.decode("utf-8"))
+
+
+def leer_bloque(f, motores, imu):
+    """
+    Lee un bloque desde la posición actual -> {columna: array}, o None si el
+    archivo termina antes (en ese caso la posición queda donde estaba).
+    """
+    inicio = f.tell()
+    datos = f.read(BLOQUE_CABECERA.size)
+    if len(datos) == BLOQUE_CABECERA.size:
+        magia, filas = BLOQUE_CABECERA.unpack(datos)
+        if magia != MAGIA_BLOQUE:
+            raise ValueError(f"bloque dañado en el byte {inicio}")
+        cuerpo = f.read(filas * bytes_por_fila(motores, imu))
+        if len(cuerpo) == filas * bytes_por_fila(motores, imu):
+            bloque, offset = {}, 0
+            for nombre, dtype, ancho in columnas(motores, imu):
+                n = filas * (ancho or 1)
+                bloque[nombre] = np.frombuffer(cuerpo, dtype=dtype, count=n, offset=offset)
+                if ancho:
+                    bloque[nombre] = bloque[nombre].reshape(filas, ancho)
+                offset += n * np.dtype(dtype).itemsize
+            return bloque
+    f.seek(inicio)
+    return None
+
+
+def cargar_telemetria(ruta):
+    """Lee un .g1t completo; los tiempos quedan en segundos desde la primera muestra."""
+    with open(ruta, "rb") as f:
+        cabecera = leer_cabecera(f)
+        if cabecera is None:
+            raise ValueError(f"'{ruta}' está vacío o incompleto")
+        motores, imu, _, meta = cabecera
+        bloques = []
+        while True:
+            bloque = leer_bloque(f, motores, imu)
+            if bloque is None:
+                break
+            bloques.append(bloque)
+    datos = {}
+    for nombre, dtype, ancho in columnas(motores, imu):
+        vacio = np.zeros((0, ancho) if ancho else 0, dtype=dtype)
+        datos[nombre] = np.concatenate([b[nombre] for b in bloques]) if bloques else vacio
+    datos["t"] = datos["t"] - meta.get("inicio_monotonico", datos["t"][0] if len(datos["t"]) else 0.0)
+    return Telemetria(datos, meta, motores, ruta)
+
+
+def articulaciones_csv(encabezado):
+    """Motores de un encabezado de data_g1_*.csv (timestamp, q_jointN, tau_jointN, ...)."""
+    return [int(c.rsplit("joint", 1)[1]) for c in encabezado.strip().split(",")[1::2]]
+
+
+def leer_filas_csv(lineas):
+    """Líneas de datos de un data_g1_*.csv -> (marcas datetime64[us], q, tau)."""
+    marcas, _, valores = zip(*(l.partition(",") for l in lineas))
+    valores = np.loadtxt(io.StringIO("\n".join(valores)), delimiter=",", ndmin=2, dtype=np.float32)
+    return np.array(marcas, dtype="datetime64[us]"), valores[:, 0::2], valores[:, 1::2]
+
+
+def cargar_csv(ruta, motores=MOTORES):
+    """
+    Lee un data_g1_*.csv como Telemetria de `motores` columnas; las
+    articulaciones que no están en el archivo quedan en NaN y no hay dq.
+    """
+    with open(ruta) as f:
+        articulaciones = articulaciones_csv(f.readline())
+        lineas = [l for l in f.read().splitlines() if "," in l]
+    if not lineas:
+        raise ValueError(f"'{ruta}' no tiene muestras")
+    marcas, q_csv, tau_csv = leer_filas_csv(lineas)
+    q = np.full((len(lineas), motores), np.nan, dtype=np.float32)
+    tau = np.full((len(lineas), motores), np.nan, dtype=np.float32)
+    q[:, articulaciones], tau[:, articulaciones] = q_csv, tau_csv
+    t = (marcas - marcas[0]).astype(np.float64) * 1e-6
+    meta = {"articulaciones": articulaciones,
+            "inicio_reloj": datetime.fromisoformat(lineas[0].partition(",")[0]).timestamp()}
+    return Telemetria({"t": t, "q": q, "tau": tau}, meta, motores, ruta)
+
+
+def cargar_registro(ruta):
+    """Telemetria de un .g1t o de un data_g1_*.csv, según el contenido."""
+    with open(ruta, "rb") as f:
+        binario = f.read(len(MAGIA)) == MAGIA
+    return cargar_telemetria(ruta) if binario else cargar_csv(ruta)
+
+
+def exportar_csv(telemetria, ruta, articulaciones=ARTICULACIONES_CSV):
+    """Escribe el registro con las columnas de los data_g1_*.csv."""
+    reloj = telemetria.reloj()
+    marcas = [datetime.fromtimestamp(s).strftime("%Y-%m-%d %H:%M:%S.%f") for s in reloj]
+    valores = np.empty((len(telemetria), 2 * len(articulaciones)), dtype=np.float64)
+    valores[:, 0::2] = telemetria.q[:, articulaciones]
+    valores[:, 1::2] = telemetria.tau[:, articulaciones]
+    with open(ruta, "w") as f:
+        encabezado = ["timestamp"] + [f"{c}_joint{j}" for j in articulaciones for c in ("q", "tau")]
+        f.write(",".join(encabezado) + "\n")
+        for marca, fila in zip(marcas, valores.tolist()):
+            f.write(marca + "," + ",".join(map(repr, fila)) + "\n")
+
+
+def resumen(telemetria):
+    n = len(telemetria)
+    lineas = [f"{telemetria.ruta}: {n} muestras en {telemetria.duracion:.1f} s, {telemetria.motores} motores"
+              + (" + IMU" if "rpy" in telemetria.columnas else "")]
+    if n > 1:
+        periodos = np.diff(telemetria.t)
+        lineas.append(f"  frecuencia media {(n - 1) / telemetria.duracion:.1f} Hz, "
+                      f"periodo máximo {periodos.max() * 1e3:.1f} ms")
+    return "\n".join(lineas)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(f"Uso: python3 {sys.argv[0]} <archivo{EXTENSION}> [--csv salida.csv]")
+        sys.exit(1)
+    try:
+        telemetria = cargar_telemetria(sys.argv[1])
+    except (OSError, ValueError) as e:
+        sys.exit(f"Error: {e}")
+    print(resumen(telemetria))
+    if "--csv" in sys.argv:
+        i = sys.argv.index("--csv") + 1
+        destino = sys.argv[i] if i < len(sys.argv) else os.path.splitext(sys.argv[1])[0] + ".csv"
+        exportar_csv(telemetria, destino)
+        print(f"Exportado a '{destino}'.")
+
+
+if __name__ == "__main__":
+    main()
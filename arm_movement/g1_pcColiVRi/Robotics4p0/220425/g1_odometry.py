@@ -17,34 +17,47 @@ y timeout por objetivo. El sistema permite la carga de objetivos desde archivo o
 - Acceso a la interfaz `loco_client` y al canal `SportModeState_` para odometría.
 
 @uso
-    python3 g1_odometry.py <nombreInterfaz> 
+    python3 g1_odometry.py <nombreInterfaz> [--perfil]
 
     - <nombreInterfaz>: nombre de la interfaz de red conectada al robot (ej. 'eth0', 'enp0s31f6').
+    - --perfil: mide los callbacks de rt/lowstate y rt/odommodestate con perfilador.py
+      (lanzamiento_aura); el informe sale con kill -USR1 <pid> y al terminar.
 
 """
 
+import os
 import sys
 import time
 import math
 
-from unitree_sdk2py.core.channel import ChannelFactoryInitialize, ChannelPublisher, ChannelSubscriber
+from unitree_sdk2py.core.channel import ChannelFactoryInitialize, ChannelPublisher
 from unitree_sdk2py.idl.unitree_hg.msg.dds_ import LowState_
 from unitree_sdk2py.idl.unitree_go.msg.dds_ import SportModeState_, IMUState_
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "100425"))
+from bus_estado import suscribir
+
+RUTA_PERFILADOR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "lanzamiento_aura")
+
 
 
 class OdomRegister:
-    def __init__(self):
+    def __init__(self, perfil=None):
         self.low_state = None
         self.first_update = False
         self.odom_state = None
         self.counter_ = 0
+        # Perfilador de los callbacks; None no los envuelve
+        self.perfil = perfil
 
     def Init(self):
-        self.subscriber_low = ChannelSubscriber("rt/lowstate", LowState_)
-        self.subscriber_low.Init(self.LowStateHandler, 10)
-        self.subscriber_odom = ChannelSubscriber("rt/odommodestate",SportModeState_)
-        self.subscriber_odom.Init(self.OdomMessageHandler, 10)
+        # Del bus local si bus_estado.py está corriendo; si no, por DDS
+        handler_low, handler_odom = self.LowStateHandler, self.OdomMessageHandler
+        if self.perfil is not None:
+            handler_low = self.perfil.envolver(handler_low, "lowstate")
+            handler_odom = self.perfil.envolver(handler_odom, "odom")
+        self.subscriber_low = suscribir("rt/lowstate", LowState_, handler_low)
+        self.subscriber_odom = suscribir("rt/odommodestate", SportModeState_, handler_odom)
         
     def Start(self):
         while not self.first_update:
@@ -79,11 +92,18 @@ class OdomRegister:
 
 
 def main():
-    if len(sys.argv) < 2:
-        sys.exit("Uso: python3 g1_odometry.py <interfaz_red>")
-
-    ChannelFactoryInitialize(0, sys.argv[1])
-    odom = OdomRegister()
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if not args:
+        sys.exit("Uso: python3 g1_odometry.py <interfaz_red> [--perfil]")
+
+    perfil = None
+    if "--perfil" in sys.argv:
+        sys.path.insert(0, RUTA_PERFILADOR)
+        from perfilador import Perfilador
+        perfil = Perfilador().instalar()
+
+    ChannelFactoryInitialize(0, args[0])
+    odom = OdomRegister(perfil=perfil)
     odom.Init()
     odom.Start()
 
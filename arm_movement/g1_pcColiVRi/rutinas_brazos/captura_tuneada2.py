@@ -1,11 +1,16 @@
+import os
 import sys
 import time
 import math
 import json
 from datetime import datetime
-from unitree_sdk2py.core.channel import ChannelFactoryInitialize, ChannelSubscriber
+import numpy as np
+from unitree_sdk2py.core.channel import ChannelFactoryInitialize
 from unitree_sdk2py.idl.unitree_hg.msg.dds_ import LowState_
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Robotics4p0", "100425"))
+from bus_estado import suscribir
+
 class G1JointIndex:
     LeftHipPitch = 0
     LeftHipRoll = 1
@@ -50,31 +55,77 @@ MIRROR_MAP = {
 
 id_a_nombre = {v: k for k, v in G1JointIndex.__dict__.items() if not k.startswith('__') and not callable(v)}
 
+# Últimas muestras de rt/lowstate (~500 Hz) que se combinan en cada captura
+VENTANA_CAPTURA = 100
+# Desviación típica (rad) a partir de la cual se avisa que la articulación se movía
+UMBRAL_QUIETO = 0.005
+
 class ArmStateReader:
-    def __init__(self):
+    """
+    Guarda las últimas `ventana` posiciones de brazos y cintura en un buffer
+    circular. El callback solo copia una fila y avanza el contador (un
+    escritor, sin lock); las capturas devuelven la mediana (o la media) de la
+    ventana y dejan en `desviacion` la desviación típica de cada articulación
+    capturada.
+    """
+    def __init__(self, ventana=VENTANA_CAPTURA, modo="mediana"):
         self.low_state = None
         self.first_update = False
+        self.modo = modo
+        self.muestras = np.zeros((ventana, len(BRAZOS_Y_CINTURA)), dtype=np.float32)
+        self.columna = {j: i for i, j in enumerate(BRAZOS_Y_CINTURA)}
+        self.escritas = 0
+        self.desviacion = {}
 
     def init(self):
-        self.subscriber = ChannelSubscriber("rt/lowstate", LowState_)
-        self.subscriber.Init(self.lowstate_callback, 10)
+        # Del bus local si bus_estado.py está corriendo; si no, por DDS
+        self.subscriber = suscribir("rt/lowstate", LowState_, self.lowstate_callback)
 
     def lowstate_callback(self, msg: LowState_):
+        motores = msg.motor_state
+        self.muestras[self.escritas % len(self.muestras)] = [motores[j].q for j in BRAZOS_Y_CINTURA]
+        self.escritas += 1
         self.low_state = msg
         self.first_update = True
 
-    def get_joint_positions(self, joint_list):
+    def ventana(self, joint_list):
+        """Muestras guardadas (n, len(joint_list)); n < ventana al arrancar."""
+        columnas = [self.columna[j] for j in joint_list]
+        return self.muestras[:min(self.escritas, len(self.muestras)), columnas].astype(np.float64)
+
+    def get_joint_variance(self, joint_list):
+        return dict(zip(joint_list, self.ventana(joint_list).var(axis=0).tolist()))
+
+    def get_joint_positions(self, joint_list, modo=None):
+        """Pose filtrada ("mediana" o "media" de la ventana, o "instantanea")."""
         if self.low_state is None:
             return {}
-        return {j: self.low_state.motor_state[j].q for j in joint_list}
-
-def vista_previa_parcial(junta, pos, paso_idx):
+        modo = modo or self.modo
+        if modo == "instantanea" or any(j not in self.columna for j in joint_list):
+            # Una sola muestra: no hay desviación que mostrar (ni la de una captura anterior)
+            self.desviacion = {}
+            return {j: self.low_state.motor_state[j].q for j in joint_list}
+        muestras = self.ventana(joint_list)
+        pose = np.median(muestras, axis=0) if modo == "mediana" else muestras.mean(axis=0)
+        self.desviacion = dict(zip(joint_list, muestras.std(axis=0).tolist()))
+        return dict(zip(joint_list, pose.tolist()))
+
+def vista_previa_parcial(junta, pos, paso_idx, desviacion=None):
     print(f"\nPaso {paso_idx + 1} ({junta}) capturado.")
+    movidas = []
     for motor_id in sorted(pos):
         nombre_mostrar = id_a_nombre.get(motor_id, f"Joint {motor_id}")
         valor_rad = pos[motor_id]
         valor_deg = math.degrees(valor_rad)
-        print(f"  {nombre_mostrar:18}: {valor_rad:7.4f} rad ({valor_deg:6.2f} deg)")
+        linea = f"  {nombre_mostrar:18}: {valor_rad:7.4f} rad ({valor_deg:6.2f} deg)"
+        if desviacion and motor_id in desviacion:
+            linea += f"  ± {math.degrees(desviacion[motor_id]):5.2f} deg"
+            if desviacion[motor_id] > UMBRAL_QUIETO:
+                linea += "  <- se movía"
+                movidas.append(nombre_mostrar)
+        print(linea)
+    if movidas:
+        print(f"Aviso: {', '.join(movidas)} no estaban quietas durante la captura.")
     print()
 
 def solicitar_duracion():
@@ -134,12 +185,12 @@ def grabar_modo_1(reader, pasos, contador):
     print(f"\nCapturando paso {contador} en modo 1 (brazos → cintura)...")
     
     pos_brazos = reader.get_joint_positions(BRAZO_IZQ + BRAZO_DER)
-    vista_previa_parcial("brazos", pos_brazos, contador - 1)
+    vista_previa_parcial("brazos", pos_brazos, contador - 1, reader.desviacion)
 
     incluir_cintura = input("¿Capturar cintura también? [s/n]: ").strip().lower()
     if incluir_cintura == 's':
         pos_cintura = reader.get_joint_positions(CINTURA)
-        vista_previa_parcial("cintura", pos_cintura, contador - 1)
+        vista_previa_parcial("cintura", pos_cintura, contador - 1, reader.desviacion)
     else:
         pos_cintura = {j: 0.0 for j in CINTURA}
 
@@ -163,18 +214,18 @@ def grabar_modo_2(reader, pasos, contador):
         "duracion": 0
     }
     pasos.append(paso)
-    vista_previa_parcial("brazo izquierdo", pos_izq, contador - 1)
+    vista_previa_parcial("brazo izquierdo", pos_izq, contador - 1, reader.desviacion)
 
     input(f"Captura brazo derecho para paso {contador}. Enter para continuar...")
     pos_der = reader.get_joint_positions(BRAZO_DER)
     pasos[-1]["posiciones"].update(pos_der)
-    vista_previa_parcial("brazo derecho", pos_der, contador - 1)
+    vista_previa_parcial("brazo derecho", pos_der, contador - 1, reader.desviacion)
 
     grabar_cintura = input("¿Capturar cintura para este paso? [s/n]: ").strip().lower()
     if grabar_cintura == 's':
         pos_cintura = reader.get_joint_positions(CINTURA)
         pasos[-1]["posiciones"].update(pos_cintura)
-        vista_previa_parcial("cintura", pos_cintura, contador - 1)
+        vista_previa_parcial("cintura", pos_cintura, contador - 1, reader.desviacion)
     else:
         for j in CINTURA:
             pasos[-1]["posiciones"][j] = 0.0
@@ -195,13 +246,13 @@ def grabar_modo_3(reader, pasos, contador):
         "duracion": 0
     }
     pasos.append(paso_obj)
-    vista_previa_parcial("brazo izquierdo + espejo derecho", paso, contador - 1)
+    vista_previa_parcial("brazo izquierdo + espejo derecho", paso, contador - 1, reader.desviacion)
 
     grabar_cintura = input("¿Capturar cintura para este paso? [s/n]: ").strip().lower()
     if grabar_cintura == 's':
         pos_cintura = reader.get_joint_positions(CINTURA)
         pasos[-1]["posiciones"].update(pos_cintura)
-        vista_previa_parcial("cintura", pos_cintura, contador - 1)
+        vista_previa_parcial("cintura", pos_cintura, contador - 1, reader.desviacion)
     else:
         for j in CINTURA:
             pasos[-1]["posiciones"][j] = 0.0
@@ -266,20 +317,27 @@ def modificar_paso(pasos, reader):
         opcion = input("Seleccione una opción: ").strip()
         if opcion == '1':
             modo = input("Modo (1, 2 o 3): ").strip()
+            # Cada captura pisa reader.desviacion: se juntan las de todas para la vista previa
+            desviacion = {}
             if modo == '1':
                 pos = reader.get_joint_positions(BRAZOS_Y_CINTURA)
+                desviacion.update(reader.desviacion)
             elif modo == '2':
                 pos = reader.get_joint_positions(BRAZO_IZQ)
+                desviacion.update(reader.desviacion)
                 input("Captura brazo derecho. Presione Enter...")
                 pos.update(reader.get_joint_positions(BRAZO_DER))
+                desviacion.update(reader.desviacion)
                 incluir_cintura = input("¿Capturar cintura también? [s/n]: ").strip().lower()
                 if incluir_cintura == 's':
                     pos.update(reader.get_joint_positions(CINTURA))
+                    desviacion.update(reader.desviacion)
                 else:
                     for j in CINTURA:
                         pos[j] = 0.0
             elif modo == '3':
                 pos_izq = reader.get_joint_positions(BRAZO_IZQ)
+                desviacion.update(reader.desviacion)
                 pos = {k: v for k, v in pos_izq.items()}
                 for izq_id, (der_id, signo) in MIRROR_MAP.items():
                     if izq_id in pos:
@@ -287,6 +345,7 @@ def modificar_paso(pasos, reader):
                 incluir_cintura = input("¿Capturar cintura también? [s/n]: ").strip().lower()
                 if incluir_cintura == 's':
                     pos.update(reader.get_joint_positions(CINTURA))
+                    desviacion.update(reader.desviacion)
                 else:
                     for j in CINTURA:
                         pos[j] = 0.0
@@ -294,11 +353,11 @@ def modificar_paso(pasos, reader):
                 print("Modo inválido.")
                 return
             pasos[idx]["posiciones"] = pos
-            vista_previa_parcial("modificado", pos, idx)
+            vista_previa_parcial("modificado", pos, idx, desviacion)
         elif opcion == '2':
             pos_cintura = reader.get_joint_positions(CINTURA)
             pasos[idx]["posiciones"].update(pos_cintura)
-            vista_previa_parcial("solo cintura", pos_cintura, idx)
+            vista_previa_parcial("solo cintura", pos_cintura, idx, reader.desviacion)
         elif opcion == '3':
             nueva_dur = solicitar_duracion()
             pasos[idx]["duracion"] = nueva_dur
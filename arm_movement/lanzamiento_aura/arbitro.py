@@ -0,0 +1,87 @@
+"""
+Árbitro del canal de brazos (`rt/arm_sdk`).
+
+Solo el reproductor persistente publica en el canal; los clientes piden
+una concesión con prioridad y duración. Mientras una concesión está vigente,
+solo el mismo cliente o uno de prioridad igual o mayor puede mandar sobre
+los brazos; al tomar el control, la rutina nueva se mezcla con la anterior
+(ver ArmSequence.iniciar). Las concesiones vencen solas si el cliente no las
+renueva o suelta.
+"""
+import itertools
+import threading
+import time
+
+PRIORIDAD_GESTO = 1
+PRIORIDAD_OPERADOR = 5
+PRIORIDAD_SEGURIDAD = 10
+DURACION_CONCESION = 5.0
+
+
+class Concesion:
+    def __init__(self, token, cliente, prioridad, vence):
+        self.token = token
+        self.cliente = cliente
+        self.prioridad = prioridad
+        self.vence = vence
+
+    def describir(self, ahora):
+        return {
+            "cliente": self.cliente,
+            "prioridad": self.prioridad,
+            "restante": max(self.vence - ahora, 0.0),
+        }
+
+
+class ArbitroBrazos:
+    def __init__(self, reloj=time.monotonic):
+        self.reloj = reloj
+        self.lock = threading.Lock()
+        self.actual = None
+        self.tokens = itertools.count(1)
+
+    def vigente(self):
+        """Concesión en vigor o None si no hay o ya venció."""
+        if self.actual is not None and self.actual.vence <= self.reloj():
+            self.actual = None
+        return self.actual
+
+    def permite(self, cliente, prioridad):
+        actual = self.vigente()
+        return actual is None or actual.cliente == cliente or prioridad >= actual.prioridad
+
+    def solicitar(self, cliente, prioridad=PRIORIDAD_GESTO, duracion=DURACION_CONCESION):
+        """
+        Concede (o renueva) el canal a `cliente` durante `duracion` s.
+        Devuelve la Concesion, o None si lo tiene otro de mayor prioridad.
+        """
+        with self.lock:
+            if not self.permite(cliente, prioridad):
+                return None
+            ahora = self.reloj()
+            actual = self.actual
+            if actual is not None and actual.cliente == cliente:
+                actual.prioridad = max(actual.prioridad, prioridad)
+                actual.vence = max(actual.vence, ahora + duracion)
+                return actual
+            self.actual = Concesion(next(self.tokens), cliente, prioridad, ahora + duracion)
+            return self.actual
+
+    def soltar(self, cliente, token=None):
+        """Libera la concesión de `cliente` (o solo la del token dado). True si la tenía."""
+        with self.lock:
+            actual = self.vigente()
+            if actual is None or actual.cliente != cliente or (token is not None and actual.token != token):
+                return False
+            self.actual = None
+            return True
+
+    def anular(self):
+        """Retira la concesión vigente, sea de quien sea (brazos liberados)."""
+        with self.lock:
+            self.actual = None
+
+    def estado(self):
+        with self.lock:
+            actual = self.vigente()
+            return None if actual is None else actual.describir(self.reloj())
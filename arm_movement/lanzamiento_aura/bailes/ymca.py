@@ -1,162 +1,15 @@
-#RUTA DE LA RUTINA
-ruta="ymca.txt"
-
-import sys
-import time
-import math
-import json
-
-from unitree_sdk2py.core.channel import ChannelFactoryInitialize, ChannelPublisher, ChannelSubscriber
-from unitree_sdk2py.idl.unitree_hg.msg.dds_ import LowCmd_, LowState_
-from unitree_sdk2py.idl.default import unitree_hg_msg_dds__LowCmd_
-from unitree_sdk2py.utils.crc import CRC
-from unitree_sdk2py.utils.thread import RecurrentThread
-
-class G1JointIndex:
-    LeftHipPitch = 0
-    LeftHipRoll = 1
-    LeftHipYaw = 2
-    LeftKnee = 3
-    LeftAnklePitch = 4
-    LeftAnkleRoll = 5
-    RightHipPitch = 6
-    RightHipRoll = 7
-    RightHipYaw = 8
-    RightKnee = 9
-    RightAnklePitch = 10
-    RightAnkleRoll = 11
-    WaistYaw = 12
-    WaistRoll = 13
-    WaistPitch = 14
-    LeftShoulderPitch = 15
-    LeftShoulderRoll = 16
-    LeftShoulderYaw = 17
-    LeftElbow = 18
-    LeftWristRoll = 19
-    LeftWristPitch = 20
-    LeftWristYaw = 21
-    RightShoulderPitch = 22
-    RightShoulderRoll = 23
-    RightShoulderYaw = 24
-    RightElbow = 25
-    RightWristRoll = 26
-    RightWristPitch = 27
-    RightWristYaw = 28
-    kNotUsedJoint = 29
-
-class ArmSequence:
-    def __init__(self):
-        self.control_dt = 0.02
-        self.kp = 60.0
-        self.kd = 1.5
-        self.crc = CRC()
-        self.t = 0.0
-        self.T = 3.0
-        self.low_cmd = unitree_hg_msg_dds__LowCmd_()
-        self.low_state = None
-        self.first_update = False
-        self.target_pos = {}
-        self.q_init_override = None
-        self.arm_joints = [
-            G1JointIndex.LeftShoulderPitch, G1JointIndex.LeftShoulderRoll,
-            G1JointIndex.LeftShoulderYaw, G1JointIndex.LeftElbow,
-            G1JointIndex.LeftWristRoll, G1JointIndex.LeftWristPitch,
-            G1JointIndex.LeftWristYaw,
-            G1JointIndex.RightShoulderPitch, G1JointIndex.RightShoulderRoll,
-            G1JointIndex.RightShoulderYaw, G1JointIndex.RightElbow,
-            G1JointIndex.RightWristRoll, G1JointIndex.RightWristPitch,
-            G1JointIndex.RightWristYaw,
-            G1JointIndex.WaistYaw, G1JointIndex.WaistRoll, G1JointIndex.WaistPitch
-        ]
-
-    def Init(self):
-        self.publisher = ChannelPublisher("rt/arm_sdk", LowCmd_)
-        self.publisher.Init()
-        self.subscriber = ChannelSubscriber("rt/lowstate", LowState_)
-        self.subscriber.Init(self.LowStateHandler, 10)
-
-    def Start(self):
-        self.thread = RecurrentThread(interval=self.control_dt, target=self.LowCmdWrite, name="arm_control")
-        while not self.first_update:
-            time.sleep(0.1)
-        self.thread.Start()
-
-    def LowStateHandler(self, msg: LowState_):
-        self.low_state = msg
-        if not self.first_update:
-            self.first_update = True
-
-    def interpolate_position(self, q_init, q_target):
-        ratio = (1 - math.cos(math.pi * (self.t / self.T))) / 2 if self.t < self.T else 1.0
-        return q_init + (q_target - q_init) * ratio
-
-    def LowCmdWrite(self):
-        if self.low_state is None:
-            return
-
-        self.low_cmd.motor_cmd[G1JointIndex.kNotUsedJoint].q = 1
-
-        for joint in self.arm_joints:
-            q_init = self.q_init_override.get(joint, self.low_state.motor_state[joint].q) if self.q_init_override else self.low_state.motor_state[joint].q
-            q_target = self.target_pos.get(joint, q_init)
-            pos = self.interpolate_position(q_init, q_target)
-            self.low_cmd.motor_cmd[joint].q = pos
-            self.low_cmd.motor_cmd[joint].dq = 0.0
-            self.low_cmd.motor_cmd[joint].tau = 0.0
-            self.low_cmd.motor_cmd[joint].kp = self.kp
-            self.low_cmd.motor_cmd[joint].kd = self.kd
-
-        self.low_cmd.crc = self.crc.Crc(self.low_cmd)
-        self.publisher.Write(self.low_cmd)
-        self.t += self.control_dt
-
-    def move_to(self, updates: dict, duration=1.25, q_init_override=None):
-        self.target_pos.update(updates)
-        self.T = duration
-        self.t = 0.0
-        self.q_init_override = q_init_override
-        while self.t < self.T:
-            time.sleep(self.control_dt)
-            
-    def freeze_and_release(self):
-        for joint in self.arm_joints:
-            self.low_cmd.motor_cmd[joint].q = self.low_state.motor_state[joint].q
-            self.low_cmd.motor_cmd[joint].dq = 0.0
-            self.low_cmd.motor_cmd[joint].tau = 0.0
-            self.low_cmd.motor_cmd[joint].kp = 0.0
-            self.low_cmd.motor_cmd[joint].kd = 0.0
-        self.low_cmd.motor_cmd[G1JointIndex.kNotUsedJoint].q = 0
-        self.low_cmd.crc = self.crc.Crc(self.low_cmd)
-        self.publisher.Write(self.low_cmd)
-
-
-
-def main():
-    if len(sys.argv) < 2:
-        sys.exit()
-    ruta_archivo_txt = ruta
-
-    try:
-        with open(ruta_archivo_txt, 'r') as f:
-            data = json.load(f)
-    except:
-        sys.exit()
-
-    pasos = data.get("pasos", [])
-
-    ChannelFactoryInitialize(0, sys.argv[1])
-    seq = ArmSequence()
-    seq.Init()
-    seq.Start()
-
-    q_anterior = None
-    for paso in pasos:
-        posiciones = {int(k): v for k, v in paso.get("posiciones", {}).items()}
-        duracion = paso.get("duracion", 1.25)
-        seq.move_to(posiciones, duration=duracion, q_init_override=q_anterior)
-        q_anterior = posiciones
-        
-    seq.freeze_and_release()
-
-if __name__ == "__main__":
-    main()
+#RUTA DE LA RUTINA
+ruta="ymca.txt"
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from reproductor import ejecutar_rutina
+
+
+def main():
+    ejecutar_rutina(os.path.join(os.path.dirname(os.path.abspath(__file__)), ruta), liberar=True)
+
+if __name__ == "__main__":
+    main()
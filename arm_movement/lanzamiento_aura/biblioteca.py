@@ -0,0 +1,135 @@
+"""
+Biblioteca de rutinas en memoria.
+
+Todas las rutinas de las categorías se leen, validan y compilan una sola vez
+al arrancar. Después, cada consulta solo hace un os.stat: el archivo se
+vuelve a leer si cambió su mtime o su tamaño, y se recompila solo si además
+cambió su contenido (hash). Se aceptan rutinas JSON (.txt) y binarias
+(.rutb); el formato se reconoce por el contenido. Una ruta 'base.txt#ops'
+es una variante de la rutina base (ver transformaciones.py), que se compila
+y se guarda en caché junto a ella.
+"""
+import hashlib
+import os
+
+from rutinas import CONTROL_DT, EXTENSION_BINARIA, RutinaInvalida, compilar_rutina, leer_datos
+from transformaciones import compilar_variante, separar_variante
+
+BASE = os.path.dirname(os.path.abspath(__file__))
+CATEGORIAS = ["gestos", "bailes", "poses", "coordinacion", "entrevista"]
+EXTENSION_RUTINA = ".txt"
+EXTENSIONES_RUTINA = (EXTENSION_RUTINA, EXTENSION_BINARIA)
+
+
+class EntradaRutina:
+    def __init__(self, ruta, firma, hash_contenido, data):
+        self.ruta = ruta
+        self.firma = firma
+        self.hash_contenido = hash_contenido
+        self.data = data
+        # Una compilación por modo de reproducción (y variante), hecha la primera vez que se pide
+        self.compiladas = {}
+
+
+def firma_archivo(ruta):
+    st = os.stat(ruta)
+    return (st.st_mtime_ns, st.st_size)
+
+
+class ListadoDirectorio:
+    """listdir cacheado: solo se repite si cambia el mtime del directorio."""
+
+    def __init__(self):
+        self.cache = {}
+
+    def listar(self, directorio, extension):
+        clave = (os.path.abspath(directorio), extension)
+        mtime = os.stat(directorio).st_mtime_ns
+        guardado = self.cache.get(clave)
+        if guardado is None or guardado[0] != mtime:
+            archivos = sorted(a for a in os.listdir(directorio) if a.endswith(extension))
+            guardado = (mtime, archivos)
+            self.cache[clave] = guardado
+        return guardado[1]
+
+
+class BibliotecaRutinas:
+    def __init__(self, base=BASE, categorias=CATEGORIAS, control_dt=CONTROL_DT):
+        self.base = base
+        self.categorias = list(categorias)
+        self.control_dt = control_dt
+        self.entradas = {}
+        self.errores = {}
+        self.listados = ListadoDirectorio()
+
+    def directorio(self, categoria):
+        return os.path.join(self.base, categoria)
+
+    def listar(self, categoria):
+        """Archivos de rutina de una categoría (sin volver a leer el directorio)."""
+        return self.listados.listar(self.directorio(categoria), EXTENSIONES_RUTINA)
+
+    def cargar_todo(self):
+        """
+        Lee, valida y compila todas las rutinas (las de las categorías y las
+        sueltas en la base, como release_arm_sdk.txt). Devuelve cuántas
+        quedaron listas; las que fallan quedan en `errores`.
+        """
+        for directorio in [self.base] + [self.directorio(c) for c in self.categorias]:
+            if not os.path.isdir(directorio):
+                continue
+            for archivo in self.listados.listar(directorio, EXTENSIONES_RUTINA):
+                try:
+                    self.obtener(os.path.join(directorio, archivo))
+                except RutinaInvalida:
+                    pass
+        return len(self.entradas)
+
+    def obtener(self, ruta, modo="coseno"):
+        """RutinaCompilada para `ruta` (o 'ruta#ops'), recargada solo si el archivo cambió."""
+        ruta, operaciones = separar_variante(ruta)
+        entrada = self.entrada(ruta)
+        clave = modo if operaciones is None else (modo, operaciones)
+        rutina = entrada.compiladas.get(clave)
+        if rutina is None:
+            if operaciones is None:
+                rutina = compilar_rutina(entrada.data, self.control_dt, modo=modo)
+            else:
+                rutina = compilar_variante(entrada.data, operaciones, self.control_dt, modo)
+            entrada.compiladas[clave] = rutina
+        return rutina
+
+    def entrada(self, ruta):
+        """EntradaRutina vigente para `ruta` (datos ya validados)."""
+        ruta = os.path.abspath(ruta)
+        try:
+            firma = firma_archivo(ruta)
+        except OSError as e:
+            self.entradas.pop(ruta, None)
+            raise RutinaInvalida(f"No se pudo leer '{ruta}': {e}") from e
+
+        entrada = self.entradas.get(ruta)
+        if entrada is not None and entrada.firma == firma:
+            return entrada
+
+        try:
+            with open(ruta, 'rb') as f:
+                contenido = f.read()
+        except OSError as e:
+            raise RutinaInvalida(f"No se pudo leer '{ruta}': {e}") from e
+        hash_contenido = hashlib.sha1(contenido).hexdigest()
+
+        if entrada is not None and entrada.hash_contenido == hash_contenido:
+            entrada.firma = firma
+            return entrada
+
+        try:
+            nueva = EntradaRutina(ruta, firma, hash_contenido, leer_datos(contenido, ruta))
+            nueva.compiladas["coseno"] = compilar_rutina(nueva.data, self.control_dt)
+        except RutinaInvalida as e:
+            self.entradas.pop(ruta, None)
+            self.errores[ruta] = str(e)
+            raise
+        self.errores.pop(ruta, None)
+        self.entradas[ruta] = nueva
+        return nueva
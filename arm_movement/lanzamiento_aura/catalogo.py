@@ -0,0 +1,303 @@
+"""
+Catálogo de rutinas en SQLite.
+
+Guarda por rutina su nombre, categoría, número de pasos, duración total,
+articulaciones que mueve, mínimo y máximo de cada articulación y el hash del
+contenido, y por script de menú la rutina que reproduce. Así los menús y el
+teleoperador consultan la biblioteca sin abrir cada archivo, por ejemplo
+"poses de menos de 2 s que solo mueven el brazo derecho".
+
+`actualizar()` es incremental: solo relee los archivos cuyo mtime o tamaño
+cambió, y solo los vuelve a analizar si además cambió su hash. Una
+articulación se considera movida si su rango, contando la pose de reposo
+(última de bajar_brazos.txt), supera UMBRAL_MOVIMIENTO.
+
+Las variantes ('base.txt#ops') que usan los scripts de menú se catalogan como
+rutinas propias, analizando los destinos ya transformados: un offset en la
+cintura hace que la variante mueva la cintura aunque la base no lo haga. Se
+vuelven a analizar cuando cambia la base.
+
+Uso:
+    python3 catalogo.py [--categoria poses] [--max 2] [--solo BRAZO_DER] [--usa 25] [--nombre salu]
+"""
+import hashlib
+import os
+import sqlite3
+import sys
+
+import numpy as np
+
+from biblioteca import BASE, CATEGORIAS, EXTENSIONES_RUTINA
+from cliente_rutinas import leer_envoltorio
+from rutinas import (ARM_JOINTS, EXTENSION_BINARIA, GRUPOS, RutinaBinaria, RutinaInvalida, leer_datos,
+                     resolver_pasos)
+from transformaciones import SEPARADOR_VARIANTE, separar_variante, transformar
+
+RUTA_CATALOGO = os.path.join(BASE, "catalogo.sqlite3")
+RUTA_REPOSO = os.path.join(BASE, "bajar_brazos.txt")
+# Las rutinas se capturan a mano: el brazo que "no se usa" deriva hasta ~0.2 rad
+UMBRAL_MOVIMIENTO = 0.25
+VERSION_CATALOGO = 2
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT);
+CREATE TABLE IF NOT EXISTS rutinas (
+    ruta TEXT PRIMARY KEY, nombre TEXT, titulo TEXT, categoria TEXT, formato TEXT,
+    mtime_ns INTEGER, tamano INTEGER, hash TEXT,
+    pasos INTEGER, duracion REAL, articulaciones TEXT, grupos TEXT, error TEXT
+);
+CREATE TABLE IF NOT EXISTS rangos (
+    ruta TEXT, articulacion INTEGER, minimo REAL, maximo REAL, movida INTEGER,
+    PRIMARY KEY (ruta, articulacion)
+);
+CREATE TABLE IF NOT EXISTS scripts (
+    ruta TEXT PRIMARY KEY, nombre TEXT, categoria TEXT, mtime_ns INTEGER, tamano INTEGER,
+    rutina TEXT, liberar INTEGER
+);
+CREATE INDEX IF NOT EXISTS rutinas_categoria ON rutinas (categoria);
+CREATE INDEX IF NOT EXISTS scripts_categoria ON scripts (categoria);
+"""
+
+
+def analizar(data, reposo=None, operaciones=None):
+    """Metadatos de una rutina (o de su variante): (pasos, duracion, minimos, maximos, movidas)."""
+    destinos, duraciones = resolver_pasos(data)
+    if operaciones is not None:
+        destinos, duraciones, _ = transformar(destinos, duraciones, operaciones)
+    minimos, maximos = destinos.min(axis=0), destinos.max(axis=0)
+    con_reposo = destinos if reposo is None else np.vstack([destinos, reposo])
+    movidas = con_reposo.max(axis=0) - con_reposo.min(axis=0) > UMBRAL_MOVIMIENTO
+    return len(duraciones), float(sum(duraciones)), minimos, maximos, movidas
+
+
+class CatalogoRutinas:
+    def __init__(self, ruta=RUTA_CATALOGO, base=BASE, categorias=CATEGORIAS, ruta_reposo=RUTA_REPOSO):
+        self.base = base
+        self.categorias = list(categorias)
+        self.db = sqlite3.connect(ruta)
+        self.db.row_factory = sqlite3.Row
+        self.reposo, hash_reposo = self.leer_reposo(ruta_reposo)
+        with self.db:
+            self.db.executescript(ESQUEMA)
+            # Con otra versión o otra pose de reposo, todo lo guardado queda obsoleto
+            clave = f"{VERSION_CATALOGO}:{UMBRAL_MOVIMIENTO}:{hash_reposo}"
+            guardada = self.db.execute("SELECT valor FROM meta WHERE clave = 'version'").fetchone()
+            if guardada is None or guardada[0] != clave:
+                self.db.execute("DELETE FROM rutinas")
+                self.db.execute("DELETE FROM rangos")
+                self.db.execute("DELETE FROM scripts")
+                self.db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (clave,))
+
+    @staticmethod
+    def leer_reposo(ruta):
+        try:
+            with open(ruta, 'rb') as f:
+                contenido = f.read()
+            destinos, _ = resolver_pasos(leer_datos(contenido, ruta))
+        except (OSError, RutinaInvalida):
+            return None, ""
+        return destinos[-1], hashlib.sha1(contenido).hexdigest()
+
+    def directorios(self):
+        yield "", self.base
+        for categoria in self.categorias:
+            yield categoria, os.path.join(self.base, categoria)
+
+    def actualizar(self):
+        """Sincroniza el catálogo con el disco. Devuelve cuántos archivos se volvieron a analizar."""
+        guardadas = {r["ruta"]: r for r in self.db.execute("SELECT ruta, mtime_ns, tamano, hash FROM rutinas")
+                     if SEPARADOR_VARIANTE not in r["ruta"]}
+        scripts = {r["ruta"]: r for r in self.db.execute("SELECT ruta, mtime_ns, tamano FROM scripts")}
+        vistas = set()
+        analizados = 0
+        with self.db:
+            for categoria, directorio in self.directorios():
+                if not os.path.isdir(directorio):
+                    continue
+                for entrada in os.scandir(directorio):
+                    if not entrada.is_file():
+                        continue
+                    st = entrada.stat()
+                    firma = (st.st_mtime_ns, st.st_size)
+                    vistas.add(entrada.path)
+                    if entrada.name.endswith(EXTENSIONES_RUTINA):
+                        guardada = guardadas.get(entrada.path)
+                        if guardada is None or (guardada["mtime_ns"], guardada["tamano"]) != firma:
+                            analizados += self.guardar_rutina(entrada.path, categoria, firma, guardada)
+                    elif entrada.name.endswith(".py"):
+                        guardado = scripts.get(entrada.path)
+                        if guardado is None or (guardado["mtime_ns"], guardado["tamano"]) != firma:
+                            self.guardar_script(entrada.path, categoria, firma)
+                            analizados += 1
+            for ruta in set(guardadas) - vistas:
+                self.db.execute("DELETE FROM rutinas WHERE ruta = ?", (ruta,))
+                self.db.execute("DELETE FROM rangos WHERE ruta = ?", (ruta,))
+            for ruta in set(scripts) - vistas:
+                self.db.execute("DELETE FROM scripts WHERE ruta = ?", (ruta,))
+            analizados += self.actualizar_variantes()
+        return analizados
+
+    def actualizar_variantes(self):
+        """Cataloga las variantes que usan los scripts y borra las que ya no usa ninguno."""
+        usadas = {r["rutina"] for r in self.db.execute("SELECT DISTINCT rutina FROM scripts WHERE rutina LIKE ?",
+                                                       (f"%{SEPARADOR_VARIANTE}%",))}
+        guardadas = {r["ruta"]: r["hash"] for r in self.db.execute("SELECT ruta, hash FROM rutinas WHERE ruta LIKE ?",
+                                                                   (f"%{SEPARADOR_VARIANTE}%",))}
+        for ruta in set(guardadas) - usadas:
+            self.db.execute("DELETE FROM rutinas WHERE ruta = ?", (ruta,))
+            self.db.execute("DELETE FROM rangos WHERE ruta = ?", (ruta,))
+        analizadas = 0
+        for ruta in usadas:
+            base, operaciones = separar_variante(ruta)
+            fila = self.db.execute("SELECT * FROM rutinas WHERE ruta = ?", (base,)).fetchone()
+            if fila is None:
+                continue
+            # La variante depende del contenido de la base y de las operaciones
+            hash_variante = hashlib.sha1(f"{fila['hash']}{SEPARADOR_VARIANTE}{operaciones}".encode()).hexdigest()
+            if guardadas.get(ruta) == hash_variante:
+                continue
+            self.db.execute("DELETE FROM rangos WHERE ruta = ?", (ruta,))
+            nombre = f"{fila['nombre']}{SEPARADOR_VARIANTE}{operaciones}"
+            firma = (fila["mtime_ns"], fila["tamano"])
+            try:
+                if fila["error"] is not None:
+                    raise RutinaInvalida(fila["error"])
+                with open(base, 'rb') as f:
+                    data = leer_datos(f.read(), base)
+                analisis = analizar(data, self.reposo, operaciones)
+            except (OSError, RutinaInvalida) as e:
+                self.db.execute("INSERT OR REPLACE INTO rutinas (ruta, nombre, categoria, formato, mtime_ns, tamano, "
+                                "hash, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                (ruta, nombre, fila["categoria"], fila["formato"], *firma, hash_variante, str(e)))
+            else:
+                self.insertar(ruta, nombre, fila["titulo"], fila["categoria"], fila["formato"], firma,
+                              hash_variante, analisis)
+            analizadas += 1
+        return analizadas
+
+    def guardar_rutina(self, ruta, categoria, firma, guardada):
+        try:
+            with open(ruta, 'rb') as f:
+                contenido = f.read()
+        except OSError:
+            return 0
+        hash_contenido = hashlib.sha1(contenido).hexdigest()
+        if guardada is not None and guardada["hash"] == hash_contenido:
+            self.db.execute("UPDATE rutinas SET mtime_ns = ?, tamano = ? WHERE ruta = ?", (*firma, ruta))
+            return 0
+
+        self.db.execute("DELETE FROM rangos WHERE ruta = ?", (ruta,))
+        nombre = os.path.splitext(os.path.basename(ruta))[0]
+        formato = "binario" if ruta.endswith(EXTENSION_BINARIA) else "json"
+        try:
+            data = leer_datos(contenido, ruta)
+            pasos, duracion, minimos, maximos, movidas = analizar(data, self.reposo)
+        except RutinaInvalida as e:
+            self.db.execute("INSERT OR REPLACE INTO rutinas (ruta, nombre, categoria, formato, mtime_ns, tamano, "
+                            "hash, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            (ruta, nombre, categoria, formato, *firma, hash_contenido, str(e)))
+            return 1
+
+        # nombre_rutina suele venir repetido de la captura: el nombre es el del archivo
+        titulo = (data.meta if isinstance(data, RutinaBinaria) else data).get("nombre_rutina")
+        self.insertar(ruta, nombre, str(titulo) if titulo is not None else None, categoria, formato, firma,
+                      hash_contenido, (pasos, duracion, minimos, maximos, movidas))
+        return 1
+
+    def insertar(self, ruta, nombre, titulo, categoria, formato, firma, hash_contenido, analisis):
+        """Fila de rutinas y sus rangos; los grupos salen de las articulaciones que se mueven."""
+        pasos, duracion, minimos, maximos, movidas = analisis
+        articulaciones = [j for j, m in zip(ARM_JOINTS, movidas) if m]
+        grupos = [g for g, joints in GRUPOS.items() if set(joints) & set(articulaciones)]
+        self.db.execute("INSERT OR REPLACE INTO rutinas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NULL)",
+                        (ruta, nombre, titulo, categoria, formato, *firma, hash_contenido, pasos, duracion,
+                         ",".join(map(str, articulaciones)), ",".join(grupos)))
+        self.db.executemany("INSERT INTO rangos VALUES (?, ?, ?, ?, ?)",
+                            [(ruta, j, float(lo), float(hi), int(m))
+                             for j, lo, hi, m in zip(ARM_JOINTS, minimos, maximos, movidas)])
+
+    def guardar_script(self, ruta, categoria, firma):
+        envoltorio = leer_envoltorio(ruta)
+        rutina, liberar = envoltorio if envoltorio is not None else (None, None)
+        self.db.execute("INSERT OR REPLACE INTO scripts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (ruta, os.path.basename(ruta), categoria, *firma, rutina,
+                         None if liberar is None else int(liberar)))
+
+    def buscar(self, categoria=None, duracion_max=None, duracion_min=None, solo=None, usa=None, nombre=None):
+        """
+        Rutinas válidas que cumplen todos los filtros dados: categoría,
+        duración total, `solo` (grupos de GRUPOS o ids: no mueve nada más),
+        `usa` (id de articulación que mueve) y parte del nombre.
+        """
+        condiciones = ["error IS NULL"]
+        parametros = []
+        if categoria is not None:
+            condiciones.append("categoria = ?")
+            parametros.append(categoria)
+        if duracion_max is not None:
+            condiciones.append("duracion <= ?")
+            parametros.append(duracion_max)
+        if duracion_min is not None:
+            condiciones.append("duracion >= ?")
+            parametros.append(duracion_min)
+        if solo is not None:
+            permitidas = articulaciones_de(solo)
+            condiciones.append("NOT EXISTS (SELECT 1 FROM rangos WHERE rangos.ruta = rutinas.ruta AND movida "
+                               f"AND articulacion NOT IN ({','.join('?' * len(permitidas))}))")
+            parametros.extend(permitidas)
+        if usa is not None:
+            condiciones.append("EXISTS (SELECT 1 FROM rangos WHERE rangos.ruta = rutinas.ruta AND movida "
+                               "AND articulacion = ?)")
+            parametros.append(usa)
+        if nombre is not None:
+            condiciones.append("(nombre LIKE ? OR titulo LIKE ?)")
+            parametros.extend([f"%{nombre}%"] * 2)
+        consulta = f"SELECT * FROM rutinas WHERE {' AND '.join(condiciones)} ORDER BY categoria, nombre"
+        return self.db.execute(consulta, parametros).fetchall()
+
+    def rangos(self, ruta):
+        """{articulacion: (minimo, maximo)} de una rutina."""
+        filas = self.db.execute("SELECT articulacion, minimo, maximo FROM rangos WHERE ruta = ?",
+                                (os.path.abspath(ruta),))
+        return {r["articulacion"]: (r["minimo"], r["maximo"]) for r in filas}
+
+    def scripts(self, categoria):
+        """Scripts de menú de una categoría, con la duración de su rutina si se conoce."""
+        return self.db.execute(
+            "SELECT scripts.ruta, scripts.nombre, rutinas.duracion, rutinas.grupos FROM scripts "
+            "LEFT JOIN rutinas ON rutinas.ruta = scripts.rutina AND rutinas.error IS NULL "
+            "WHERE scripts.categoria = ? ORDER BY scripts.nombre", (categoria,)).fetchall()
+
+    def cerrar(self):
+        self.db.close()
+
+
+def articulaciones_de(nombres):
+    """Ids de articulación de una lista de grupos (BRAZO_DER, ...) y/o ids."""
+    articulaciones = []
+    for nombre in nombres:
+        if nombre in GRUPOS:
+            articulaciones.extend(GRUPOS[nombre])
+        else:
+            articulaciones.append(int(nombre))
+    return articulaciones
+
+
+def main():
+    def opcion(nombre, tipo=str):
+        return tipo(sys.argv[sys.argv.index(nombre) + 1]) if nombre in sys.argv else None
+
+    catalogo = CatalogoRutinas()
+    analizados = catalogo.actualizar()
+    solo = opcion("--solo")
+    filas = catalogo.buscar(opcion("--categoria"), opcion("--max", float), opcion("--min", float),
+                            solo.split(",") if solo else None, opcion("--usa", int), opcion("--nombre"))
+    print(f"{len(filas)} rutinas ({analizados} archivos analizados de nuevo)")
+    for fila in filas:
+        print(f"  {fila['categoria'] or '.':13} {fila['nombre']:22} {fila['pasos']:4d} pasos {fila['duracion']:7.2f} s"
+              f"  {fila['grupos'] or '-'}")
+    catalogo.cerrar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Cliente del reproductor de rutinas persistente (servidor_rutinas.py).
+
+Los menús y el teleoperador lo usan para lanzar gestos sin crear un proceso
+nuevo por gesto. Si el reproductor no está corriendo, o el script no es un
+envoltorio estándar de rutina, se ejecuta el script como antes.
+
+Cada orden va con un identificador de cliente y una prioridad para el
+árbitro del reproductor (ver arbitro.py).
+
+Uso:
+    python3 cliente_rutinas.py play <rutina.txt|script.py> [--liberar] [--esperar] [--fluido] [--prioridad N]
+                                    [--grupo BRAZO_IZQ|BRAZO_DER|CINTURA [--peso P] [--mantener]]
+    python3 cliente_rutinas.py quitar [BRAZO_IZQ|BRAZO_DER|CINTURA]
+    python3 cliente_rutinas.py stop | release | estado | seguimiento | soltar [--prioridad N]
+    python3 cliente_rutinas.py adquirir <segundos> [--prioridad N]
+"""
+import ast
+import json
+import os
+import socket
+import subprocess
+import sys
+
+from arbitro import DURACION_CONCESION, PRIORIDAD_GESTO
+
+RUTA_SOCKET = "/tmp/g1_rutinas.sock"
+TIMEOUT = 5.0
+# Un cliente por proceso: las órdenes del mismo proceso se reemplazan entre sí
+CLIENTE = f"{os.path.basename(sys.argv[0]) or 'python'}:{os.getpid()}"
+
+
+def enviar(orden, ruta_socket=RUTA_SOCKET, timeout=TIMEOUT):
+    """Envía una orden al reproductor y devuelve su respuesta."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout)
+        s.connect(ruta_socket)
+        s.sendall((json.dumps(orden) + "\n").encode())
+        with s.makefile('r') as f:
+            linea = f.readline()
+    if not linea:
+        raise ConnectionError("El reproductor cerró la conexión sin responder.")
+    return json.loads(linea)
+
+
+def disponible(ruta_socket=RUTA_SOCKET):
+    try:
+        return enviar({"cmd": "estado"}, ruta_socket, timeout=0.5).get("ok", False)
+    except (OSError, ValueError):
+        return False
+
+
+def leer_envoltorio(ruta_script):
+    """
+    Devuelve (ruta_rutina, liberar) de un script generado como envoltorio de
+    ejecutar_rutina, o None si el script hace algo más (audio, etc.).
+    """
+    try:
+        with open(ruta_script, 'r') as f:
+            arbol = ast.parse(f.read())
+    except (OSError, SyntaxError):
+        return None
+
+    ruta = None
+    liberar = None
+    for nodo in arbol.body:
+        if isinstance(nodo, ast.FunctionDef) and nodo.name != "main":
+            return None
+        if isinstance(nodo, ast.Assign) and len(nodo.targets) == 1 \
+                and isinstance(nodo.targets[0], ast.Name) and nodo.targets[0].id == "ruta" \
+                and isinstance(nodo.value, ast.Constant) and isinstance(nodo.value.value, str):
+            ruta = nodo.value.value
+    for nodo in ast.walk(arbol):
+        if isinstance(nodo, ast.Call) and getattr(nodo.func, "id", None) == "ejecutar_rutina":
+            liberar = True
+            for kw in nodo.keywords:
+                if kw.arg == "liberar" and isinstance(kw.value, ast.Constant):
+                    liberar = bool(kw.value.value)
+    if ruta is None or liberar is None:
+        return None
+    return os.path.join(os.path.dirname(os.path.abspath(ruta_script)), ruta), liberar
+
+
+def reproducir(ruta_rutina, liberar=False, esperar=False, modo="coseno", ruta_socket=RUTA_SOCKET,
+               prioridad=PRIORIDAD_GESTO, grupo=None, peso=1.0, mantener=False):
+    """Con `grupo`, la rutina es una capa que solo mueve ese grupo sobre la rutina principal."""
+    orden = {"cmd": "play", "ruta": os.path.abspath(ruta_rutina), "liberar": liberar, "esperar": esperar,
+             "modo": modo, "cliente": CLIENTE, "prioridad": prioridad}
+    if grupo is not None:
+        orden.update(grupo=grupo, peso=peso, mantener=mantener)
+    return enviar(orden, ruta_socket, timeout=None if esperar else TIMEOUT)
+
+
+def quitar_capa(grupo=None, ruta_socket=RUTA_SOCKET, prioridad=PRIORIDAD_GESTO):
+    return enviar({"cmd": "quitar", "grupo": grupo, "cliente": CLIENTE, "prioridad": prioridad}, ruta_socket)
+
+
+def detener(ruta_socket=RUTA_SOCKET, prioridad=PRIORIDAD_GESTO):
+    return enviar({"cmd": "stop", "cliente": CLIENTE, "prioridad": prioridad}, ruta_socket)
+
+
+def liberar_brazos(ruta_socket=RUTA_SOCKET, prioridad=PRIORIDAD_GESTO):
+    return enviar({"cmd": "release", "cliente": CLIENTE, "prioridad": prioridad}, ruta_socket)
+
+
+def adquirir(duracion=DURACION_CONCESION, prioridad=PRIORIDAD_GESTO, ruta_socket=RUTA_SOCKET):
+    """Reserva los brazos para este proceso; repetirlo antes de que venza la renueva."""
+    return enviar({"cmd": "adquirir", "duracion": duracion, "cliente": CLIENTE, "prioridad": prioridad},
+                  ruta_socket)
+
+
+def soltar(ruta_socket=RUTA_SOCKET):
+    return enviar({"cmd": "soltar", "cliente": CLIENTE}, ruta_socket)
+
+
+def ejecutar_script(ruta_script, interfaz, esperar=True, modo="coseno", ruta_socket=RUTA_SOCKET,
+                    prioridad=PRIORIDAD_GESTO):
+    """Lanza un script de gesto por el reproductor o, si no se puede, como proceso."""
+    envoltorio = leer_envoltorio(ruta_script)
+    if envoltorio is not None:
+        ruta_rutina, liberar = envoltorio
+        try:
+            respuesta = reproducir(ruta_rutina, liberar, esperar, modo, ruta_socket, prioridad)
+        except (OSError, ValueError):
+            respuesta = None
+        if respuesta is not None:
+            if not respuesta.get("ok"):
+                print(f"Error del reproductor: {respuesta.get('error')}")
+            return respuesta
+
+    comando = ["python3", ruta_script, interfaz] + (["--fluido"] if modo == "fluido" else [])
+    if esperar:
+        subprocess.run(comando)
+    else:
+        subprocess.Popen(comando)
+    return None
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(f"Uso: python3 {sys.argv[0]} play <rutina.txt|script.py> [--liberar] [--esperar] [--fluido]"
+              " [--prioridad N]")
+        print("         [--grupo BRAZO_IZQ|BRAZO_DER|CINTURA [--peso P] [--mantener]]")
+        print(f"     python3 {sys.argv[0]} quitar [BRAZO_IZQ|BRAZO_DER|CINTURA]")
+        print(f"     python3 {sys.argv[0]} stop | release | estado | seguimiento | soltar [--prioridad N]")
+        print(f"     python3 {sys.argv[0]} adquirir <segundos> [--prioridad N]")
+        sys.exit(1)
+
+    cmd = sys.argv[1]
+    prioridad = PRIORIDAD_GESTO
+    if "--prioridad" in sys.argv:
+        prioridad = int(sys.argv[sys.argv.index("--prioridad") + 1])
+    if cmd == "play" and len(sys.argv) > 2:
+        ruta = sys.argv[2]
+        liberar = "--liberar" in sys.argv
+        if ruta.endswith(".py"):
+            envoltorio = leer_envoltorio(ruta)
+            if envoltorio is None:
+                sys.exit(f"'{ruta}' no es un envoltorio de rutina.")
+            ruta, liberar = envoltorio
+        modo = "fluido" if "--fluido" in sys.argv else "coseno"
+        grupo = sys.argv[sys.argv.index("--grupo") + 1] if "--grupo" in sys.argv else None
+        peso = float(sys.argv[sys.argv.index("--peso") + 1]) if "--peso" in sys.argv else 1.0
+        respuesta = reproducir(ruta, liberar, "--esperar" in sys.argv, modo, prioridad=prioridad,
+                               grupo=grupo, peso=peso, mantener="--mantener" in sys.argv)
+    elif cmd == "quitar":
+        grupo = sys.argv[2] if len(sys.argv) > 2 and not sys.argv[2].startswith("--") else None
+        respuesta = quitar_capa(grupo, prioridad=prioridad)
+    elif cmd == "adquirir" and len(sys.argv) > 2:
+        respuesta = adquirir(float(sys.argv[2]), prioridad)
+    elif cmd in ("stop", "release", "estado", "seguimiento", "soltar"):
+        respuesta = enviar({"cmd": cmd, "cliente": CLIENTE, "prioridad": prioridad})
+    else:
+        sys.exit(f"Orden no reconocida: {cmd}")
+    print(json.dumps(respuesta, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
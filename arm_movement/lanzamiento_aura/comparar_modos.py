@@ -0,0 +1,60 @@
+"""
+Compara el modo por pasos (coseno) con el modo fluido (cúbica monótona) de una o
+varias rutinas: velocidad articular pico y duración total.
+
+La última columna es la duración que tendría la rutina en modo fluido si se
+acelerara hasta igualar la velocidad pico del modo por pasos.
+
+Uso:
+    python3 comparar_modos.py [rutina.txt ...]     (sin argumentos: toda la biblioteca)
+"""
+import os
+import sys
+
+import numpy as np
+
+from biblioteca import BibliotecaRutinas
+from rutinas import RutinaInvalida
+
+
+def velocidad_pico(rutina):
+    """Velocidad articular máxima (rad/s) fuera del primer paso, que es igual en ambos modos."""
+    if len(rutina.tabla) < 2:
+        return 0.0
+    dq = np.diff(rutina.tabla.astype(np.float64), axis=0) / rutina.control_dt
+    return float(np.abs(dq).max())
+
+
+def comparar(biblioteca, ruta):
+    coseno = biblioteca.obtener(ruta, "coseno")
+    fluido = biblioteca.obtener(ruta, "fluido")
+    v_coseno = velocidad_pico(coseno)
+    v_fluido = velocidad_pico(fluido)
+    t_inicio = coseno.ticks_por_paso[0] * coseno.control_dt
+    t_resto = coseno.duracion - t_inicio
+    t_mismo_pico = t_inicio + t_resto * (v_fluido / v_coseno if v_coseno > 0 else 1.0)
+    return v_coseno, v_fluido, coseno.duracion, t_mismo_pico
+
+
+def main():
+    biblioteca = BibliotecaRutinas()
+    if len(sys.argv) > 1:
+        rutas = sys.argv[1:]
+    else:
+        biblioteca.cargar_todo()
+        rutas = sorted(biblioteca.entradas)
+
+    print(f"{'rutina':32} {'pasos':>5} {'vpico coseno':>13} {'vpico fluido':>13} {'duración':>9} {'fluido mismo pico':>18}")
+    for ruta in rutas:
+        try:
+            v_coseno, v_fluido, duracion, t_mismo_pico = comparar(biblioteca, ruta)
+        except RutinaInvalida as e:
+            print(f"{os.path.relpath(ruta, biblioteca.base):32} error: {e}")
+            continue
+        pasos = len(biblioteca.obtener(ruta).ticks_por_paso)
+        print(f"{os.path.relpath(ruta, biblioteca.base):32} {pasos:5d} {v_coseno:9.2f} rad/s {v_fluido:9.2f} rad/s"
+              f" {duracion:7.2f} s {t_mismo_pico:16.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,22 +4,30 @@ import time
 from unitree_sdk2py.core.channel import ChannelFactoryInitialize
 from unitree_sdk2py.g1.loco.g1_loco_client import LocoClient
 
+import cliente_rutinas
+from arbitro import PRIORIDAD_GESTO, PRIORIDAD_SEGURIDAD
+from catalogo import CatalogoRutinas
+
+# El menú se redibuja tras cada gesto: el catálogo solo relee lo que cambió
+catalogo = CatalogoRutinas()
+
 def listar_scripts(directorio):
-    scripts = []
-    for archivo in sorted(os.listdir(directorio)):
-        if archivo.endswith(".py") and not archivo.startswith("release"):
-            scripts.append(archivo)
-    return scripts
+    """(nombre, duración o None) de los scripts de una categoría, sin abrir las rutinas."""
+    catalogo.actualizar()
+    categoria = os.path.basename(os.path.normpath(directorio))
+    return [(s["nombre"], s["duracion"]) for s in catalogo.scripts(categoria)
+            if not s["nombre"].startswith("release")]
 
-def ejecutar_script(ruta_script, interfaz):
-    os.system(f"python3 {ruta_script} {interfaz}")
+def ejecutar_script(ruta_script, interfaz, prioridad=PRIORIDAD_GESTO):
+    # Usa el reproductor persistente si está corriendo; si no, lanza el script
+    cliente_rutinas.ejecutar_script(ruta_script, interfaz, esperar=True, prioridad=prioridad)
 
 def menu_categoria(nombre, path_categoria, interfaz):
     while True:
         print(f"\n--- {nombre.upper()} ---")
         scripts = listar_scripts(path_categoria)
-        for i, script in enumerate(scripts):
-            print(f"  {i+1}. {script}")
+        for i, (script, duracion) in enumerate(scripts):
+            print(f"  {i+1}. {script}" + (f"  ({duracion:.1f} s)" if duracion is not None else ""))
         print("  B. Volver al menú principal")
         print("  R. Release control de los brazos")
 
@@ -28,9 +36,9 @@ def menu_categoria(nombre, path_categoria, interfaz):
         if eleccion == 'b':
             break
         elif eleccion == 'r':
-            ejecutar_script(os.path.join(path_categoria, "../release_arm_sdk.py"), interfaz)
+            ejecutar_script(os.path.join(path_categoria, "../release_arm_sdk.py"), interfaz, PRIORIDAD_SEGURIDAD)
         elif eleccion.isdigit() and 1 <= int(eleccion) <= len(scripts):
-            ejecutar_script(os.path.join(path_categoria, scripts[int(eleccion)-1]), interfaz)
+            ejecutar_script(os.path.join(path_categoria, scripts[int(eleccion)-1][0]), interfaz)
         else:
             print("Opción no válida.")
 
@@ -56,7 +64,7 @@ def menu_principal(interfaz):
         if opcion == 's':
             break
         elif opcion == 'r':
-            ejecutar_script(os.path.join(base_path, "release_arm_sdk.py"), interfaz)
+            ejecutar_script(os.path.join(base_path, "release_arm_sdk.py"), interfaz, PRIORIDAD_SEGURIDAD)
         elif opcion in categorias:
             nombre, path = categorias[opcion]
             menu_categoria(nombre, path, interfaz)
@@ -111,6 +119,11 @@ def main():
         print("Opción no válida. Saliendo...")
         return
 
+    if cliente_rutinas.disponible():
+        print("Reproductor de rutinas detectado: los gestos se ejecutarán sin relanzar procesos.")
+    else:
+        print("Reproductor de rutinas no disponible: cada gesto se lanzará como proceso.")
+
     menu_principal(interfaz)
 
 if __name__ == "__main__":
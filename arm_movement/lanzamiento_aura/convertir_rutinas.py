@@ -0,0 +1,96 @@
+"""
+Convierte rutinas entre JSON (.txt) y binario (.rutb), en los dos sentidos.
+
+El sentido sale del contenido de cada archivo: un JSON se guarda como .rutb
+y un binario como .txt, junto al original. Con un directorio se convierten
+todas sus rutinas. Con --medir se compara además el tiempo de carga de los
+dos formatos (la carga binaria no compila, solo abre la matriz con memmap).
+
+Uso:
+    python3 convertir_rutinas.py <rutina|directorio> [...] [--sobrescribir] [--medir]
+"""
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from biblioteca import EXTENSIONES_RUTINA
+from rutinas import (EXTENSION_BINARIA, RutinaBinaria, RutinaInvalida, cargar_rutina, compilar_rutina,
+                     escribir_binaria)
+
+
+def destino_de(ruta, data):
+    base = os.path.splitext(ruta)[0]
+    return base + (".txt" if isinstance(data, RutinaBinaria) else EXTENSION_BINARIA)
+
+
+def convertir(ruta, sobrescribir=False):
+    """Convierte un archivo y devuelve la ruta escrita (o None si ya existía)."""
+    data = cargar_rutina(ruta)
+    destino = destino_de(ruta, data)
+    if os.path.exists(destino) and not sobrescribir:
+        return None
+    if isinstance(data, RutinaBinaria):
+        data.validar()
+        with open(destino, "w") as f:
+            json.dump(data.a_json(), f, indent=2, ensure_ascii=False)
+    else:
+        escribir_binaria(data, destino)
+    # La conversión tiene que dar la misma rutina, salvo el redondeo a float32
+    original = compilar_rutina(data)
+    convertida = compilar_rutina(cargar_rutina(destino))
+    if original.tabla.shape != convertida.tabla.shape \
+            or not np.allclose(original.tabla, convertida.tabla, atol=1e-6):
+        os.remove(destino)
+        raise RutinaInvalida(f"La conversión de '{ruta}' no reproduce la rutina.")
+    return destino
+
+
+def medir_carga(ruta, repeticiones=200):
+    """Microsegundos por carga (sin compilar)."""
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        cargar_rutina(ruta)
+    return (time.perf_counter() - t0) / repeticiones * 1e6
+
+
+def archivos(argumentos):
+    for arg in argumentos:
+        if os.path.isdir(arg):
+            for archivo in sorted(os.listdir(arg)):
+                if archivo.endswith(EXTENSIONES_RUTINA):
+                    yield os.path.join(arg, archivo)
+        else:
+            yield arg
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if not args:
+        print(f"Uso: python3 {sys.argv[0]} <rutina|directorio> [...] [--sobrescribir] [--medir]")
+        sys.exit(1)
+    sobrescribir = "--sobrescribir" in sys.argv
+    medir = "--medir" in sys.argv
+
+    fallos = 0
+    for ruta in archivos(args):
+        try:
+            destino = convertir(ruta, sobrescribir)
+        except RutinaInvalida as e:
+            print(f"{ruta}: error: {e}")
+            fallos += 1
+            continue
+        if destino is None:
+            print(f"{ruta}: ya existe {destino_de(ruta, cargar_rutina(ruta))} (usar --sobrescribir)")
+            continue
+        linea = f"{ruta} -> {destino}  ({os.path.getsize(ruta)} -> {os.path.getsize(destino)} bytes)"
+        if medir:
+            linea += f"  carga {medir_carga(ruta):.1f} -> {medir_carga(destino):.1f} us"
+        print(linea)
+    sys.exit(1 if fallos else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+LowCmd_ (unitree_hg) empaquetado en un buffer fijo.
+
+El comando se guarda en un array estructurado de numpy con la misma
+disposición de bytes que usa CRC().Crc ('<2B2x' + 'B3x5fI' * 35 + '5I',
+1004 bytes). Así q/dq/tau/kp/kd se escriben para todas las articulaciones de
+una vez y el CRC se calcula sobre el buffer sin volver a serializar los 35
+motores desde objetos Python en cada tick.
+
+El CRC del robot es CRC-32/MPEG-2 (polinomio 0x04C11DB7, inicio 0xFFFFFFFF,
+sin reflejar) sobre las 250 primeras palabras de 32 bits, bit más
+significativo primero. Se calcula con binascii.crc32 (en C): la variante
+sin reflejar equivale a la reflejada con cada byte invertido bit a bit y el
+resultado invertido.
+"""
+import binascii
+
+import numpy as np
+
+MOTORES = 35
+CAMPOS = ("q", "dq", "tau", "kp", "kd")
+
+MOTOR_DTYPE = np.dtype({
+    "names": ["mode", "q", "dq", "tau", "kp", "kd", "reserve"],
+    "formats": ["u1", "<f4", "<f4", "<f4", "<f4", "<f4", "<u4"],
+    "offsets": [0, 4, 8, 12, 16, 20, 24],
+    "itemsize": 28,
+})
+
+LOWCMD_DTYPE = np.dtype({
+    "names": ["mode_pr", "mode_machine", "motor_cmd", "reserve", "crc"],
+    "formats": ["u1", "u1", (MOTOR_DTYPE, MOTORES), ("<u4", 4), "<u4"],
+    "offsets": [0, 1, 4, 4 + 28 * MOTORES, 4 + 28 * MOTORES + 16],
+    "itemsize": 4 + 28 * MOTORES + 20,
+})
+
+# Palabras que entran en el CRC: todas menos la del propio crc
+PALABRAS_CRC = LOWCMD_DTYPE.itemsize // 4 - 1
+
+_INVERTIR_BITS = bytes(int(f"{b:08b}"[::-1], 2) for b in range(256))
+
+
+def crc32_mpeg2(palabras):
+    """CRC de unitree sobre un array de uint32 (equivale a CRC()._crc_py)."""
+    datos = np.asarray(palabras, dtype="<u4").astype(">u4").tobytes()
+    r = binascii.crc32(datos.translate(_INVERTIR_BITS)) ^ 0xFFFFFFFF
+    return int(f"{r:032b}"[::-1], 2)
+
+
+class ComandoEmpaquetado:
+    """
+    Buffer de un LowCmd_ con escritura por bloques y CRC rápido.
+
+    `articulaciones` son los índices de motor que se escriben con escribir();
+    los valores se pasan en ese orden. volcar() copia al LowCmd_ de DDS solo
+    los campos pedidos, redondeados a float32 igual que en el buffer.
+    """
+
+    def __init__(self, low_cmd, articulaciones):
+        self.low_cmd = low_cmd
+        self.articulaciones = np.asarray(articulaciones, dtype=np.intp)
+        self.buffer = np.zeros((), dtype=LOWCMD_DTYPE)
+        self.motores = self.buffer["motor_cmd"]
+        self.palabras = self.buffer.reshape(1).view("<u4")[:PALABRAS_CRC]
+        self.cmds = [low_cmd.motor_cmd[j] for j in self.articulaciones.tolist()]
+        self.cargar()
+
+    def cargar(self):
+        """Lee el LowCmd_ completo al buffer (solo al crearlo)."""
+        cmd = self.low_cmd
+        self.buffer["mode_pr"] = cmd.mode_pr
+        self.buffer["mode_machine"] = cmd.mode_machine
+        for i, m in enumerate(cmd.motor_cmd):
+            self.motores[i] = (m.mode, m.q, m.dq, m.tau, m.kp, m.kd, m.reserve)
+        self.buffer["reserve"] = cmd.reserve
+
+    def escribir(self, **campos):
+        """escribir(q=..., kp=...): escalar o un valor por articulación."""
+        for campo, valores in campos.items():
+            self.motores[campo][self.articulaciones] = valores
+
+    def asignar(self, motor, campo, valor):
+        """Un campo de un motor cualquiera (p. ej. kNotUsedJoint), también en el LowCmd_."""
+        self.motores[campo][motor] = valor
+        setattr(self.low_cmd.motor_cmd[motor], campo, self.motores[campo][motor].item())
+
+    def crc(self):
+        return crc32_mpeg2(self.palabras)
+
+    def volcar(self, campos=("q",)):
+        """Copia `campos` de las articulaciones al LowCmd_ y le pone el CRC."""
+        for campo in campos:
+            for cmd, valor in zip(self.cmds, self.motores[campo][self.articulaciones].tolist()):
+                setattr(cmd, campo, valor)
+        crc = self.crc()
+        self.buffer["crc"] = crc
+        self.low_cmd.crc = crc
+        return crc
@@ -0,0 +1,273 @@
+"""
+Grabación continua por demostración (enseñanza kinestésica).
+
+En lugar de capturar una pose por Enter, se guarda cada mensaje de
+rt/lowstate (~500 Hz) en un buffer circular preasignado mientras el operador
+mueve los brazos pasivos. Al terminar se extraen los pasos automáticamente:
+Ramer-Douglas-Peucker en el espacio articular da las poses iniciales y se
+agregan poses hasta que la trayectoria que generaría el reproductor (con su
+interpolación, fluida por defecto o coseno con --coseno) no se aparta más de
+`tolerancia` rad de la grabación en ninguna articulación. La grabación se
+remuestrea antes a la grilla de ticks del reproductor, así que cada pose cae
+en un tick y las duraciones son múltiplos exactos de CONTROL_DT: el
+redondeo a ticks no estira la rutina. El resultado se guarda
+con el mismo formato de pasos que captura_tuneada2.py; como los pasos no
+paran en cada pose, conviene reproducirlo con --fluido.
+
+Uso:
+    python3 grabacion.py <interfaz_red> [--tolerancia 0.05] [--coseno] [--cintura] [--crudo]
+
+Sin --cintura la cintura se guarda en 0.0, como en las capturas por pasos.
+--crudo guarda también todas las muestras como rutina binaria (.rutb).
+"""
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from rutinas import ARM_JOINTS, CINTURA, COLUMNA, CONTROL_DT, escribir_binaria
+from trayectorias import evaluar_hermite, pendientes_monotonas
+
+FRECUENCIA_LOWSTATE = 500
+DURACION_MAXIMA = 300.0
+TOLERANCIA = 0.05
+# Muestras para el promedio móvil previo (ruido de los encoders, ~10 ms)
+VENTANA_SUAVIZADO = 5
+# Por debajo de esta velocidad (rad/s) el brazo se considera quieto al inicio y al final
+VELOCIDAD_QUIETO = 0.05
+# El primer paso parte de la pose del robot, que no se conoce al grabar
+DURACION_PRIMER_PASO = 2.0
+# Carpeta de bus_estado.py
+RUTA_BUS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        "g1_pcColiVRi", "Robotics4p0", "100425")
+
+
+class GrabadorLowState:
+    """
+    Buffer circular (muestras, articulaciones) alimentado desde el callback de
+    rt/lowstate. Un solo escritor y sin lock: el callback escribe la fila y
+    después avanza el contador.
+    """
+
+    def __init__(self, duracion_maxima=DURACION_MAXIMA, frecuencia=FRECUENCIA_LOWSTATE, articulaciones=ARM_JOINTS):
+        self.capacidad = int(duracion_maxima * frecuencia)
+        self.articulaciones = list(articulaciones)
+        self.posiciones = np.zeros((self.capacidad, len(self.articulaciones)), dtype=np.float32)
+        self.tiempos = np.zeros(self.capacidad, dtype=np.float64)
+        self.escritas = 0
+        self.grabando = False
+        self.ultimo = None
+
+    def init(self):
+        from unitree_sdk2py.idl.unitree_hg.msg.dds_ import LowState_
+        sys.path.insert(0, RUTA_BUS)
+        from bus_estado import suscribir
+        # Del bus local si bus_estado.py está corriendo; si no, por DDS
+        self.subscriber = suscribir("rt/lowstate", LowState_, self.lowstate_callback)
+
+    def lowstate_callback(self, msg):
+        self.ultimo = msg
+        if not self.grabando:
+            return
+        i = self.escritas % self.capacidad
+        motores = msg.motor_state
+        self.posiciones[i] = [motores[j].q for j in self.articulaciones]
+        # Los mensajes del bus traen el instante de la muestra (llegan por lotes); los de DDS no
+        t = getattr(msg, "t", None)
+        self.tiempos[i] = time.monotonic() if t is None else t
+        self.escritas += 1
+
+    def empezar(self):
+        self.escritas = 0
+        self.grabando = True
+
+    def terminar(self):
+        self.grabando = False
+        return self.muestras()
+
+    @property
+    def desbordado(self):
+        return self.escritas > self.capacidad
+
+    def muestras(self):
+        """(tiempos desde la primera muestra, posiciones) en orden, copiados del buffer."""
+        n = self.escritas
+        if n <= self.capacidad:
+            t, q = self.tiempos[:n].copy(), self.posiciones[:n].copy()
+        else:
+            orden = np.roll(np.arange(self.capacidad), -(n % self.capacidad))
+            t, q = self.tiempos[orden], self.posiciones[orden]
+        return (t - t[0] if len(t) else t), q
+
+
+def suavizar(q, ventana=VENTANA_SUAVIZADO):
+    """Promedio móvil centrado por columna; los extremos usan la ventana que cabe."""
+    if ventana <= 1 or len(q) < ventana:
+        return np.asarray(q, dtype=np.float64)
+    acumulado = np.cumsum(np.vstack([np.zeros(q.shape[1]), q]), axis=0, dtype=np.float64)
+    mitad = ventana // 2
+    inicio = np.clip(np.arange(len(q)) - mitad, 0, len(q))
+    fin = np.clip(np.arange(len(q)) + ventana - mitad, 0, len(q))
+    return (acumulado[fin] - acumulado[inicio]) / (fin - inicio)[:, None]
+
+
+def recortar_quietud(t, q, velocidad=VELOCIDAD_QUIETO):
+    """Índices (inicio, fin) sin el tiempo quieto del principio y del final de la grabación."""
+    if len(t) < 3:
+        return 0, len(t)
+    v = np.abs(np.diff(q, axis=0)).max(axis=1) / np.maximum(np.diff(t), 1e-6)
+    movimiento = np.flatnonzero(v > velocidad)
+    if not len(movimiento):
+        return 0, 1
+    return int(movimiento[0]), int(movimiento[-1]) + 2
+
+
+def rdp(t, q, tolerancia=TOLERANCIA):
+    """
+    Índices de las poses clave (Ramer-Douglas-Peucker): entre dos poses
+    consecutivas, la interpolación lineal en el tiempo se desvía como mucho
+    `tolerancia` rad de la trayectoria en cualquier articulación.
+    """
+    n = len(t)
+    if n <= 2:
+        return list(range(n))
+    conservar = np.zeros(n, dtype=bool)
+    conservar[[0, -1]] = True
+    pendientes = [(0, n - 1)]
+    while pendientes:
+        a, b = pendientes.pop()
+        if b - a < 2:
+            continue
+        s = ((t[a + 1:b] - t[a]) / (t[b] - t[a]))[:, None] if t[b] > t[a] else \
+            np.linspace(0, 1, b - a + 1)[1:-1, None]
+        desvio = np.abs(q[a + 1:b] - (q[a] + s * (q[b] - q[a]))).max(axis=1)
+        peor = int(desvio.argmax())
+        if desvio[peor] > tolerancia:
+            medio = a + 1 + peor
+            conservar[medio] = True
+            pendientes += [(a, medio), (medio, b)]
+    return np.flatnonzero(conservar).tolist()
+
+
+def remuestrear(t, q, control_dt=CONTROL_DT):
+    """(t, q) interpolados a la grilla de ticks t[0], t[0] + control_dt, ..."""
+    grilla = t[0] + np.arange(int(np.floor((t[-1] - t[0]) / control_dt + 1e-9)) + 1) * control_dt
+    return grilla, np.column_stack([np.interp(grilla, t, columna) for columna in q.T])
+
+
+def reproducida(t, instantes, destinos, modo="fluido"):
+    """Posiciones que manda el reproductor en `t` al pasar por `destinos` en `instantes`."""
+    if modo == "fluido":
+        return evaluar_hermite(instantes, destinos, pendientes_monotonas(instantes, destinos), t)
+    i = np.clip(np.searchsorted(instantes, t, side="right") - 1, 0, len(instantes) - 2)
+    s = np.clip((t - instantes[i]) / (instantes[i + 1] - instantes[i]), 0.0, 1.0)
+    return destinos[i] + (destinos[i + 1] - destinos[i]) * ((1.0 - np.cos(np.pi * s)) / 2.0)[:, None]
+
+
+def ajustar_claves(t, q, claves, tolerancia=TOLERANCIA, modo="fluido"):
+    """
+    Agrega poses a `claves` hasta que la reproducción se aparta como mucho
+    `tolerancia` rad de (t, q) en todas las muestras. En cada vuelta se
+    agrega la peor muestra de cada tramo fuera de tolerancia.
+    """
+    claves = list(claves)
+    while len(claves) > 1:
+        indices = np.array(claves)
+        desvio = np.abs(reproducida(t, t[indices], q[indices], modo) - q).max(axis=1)
+        nuevas = []
+        for a, b in zip(claves, claves[1:]):
+            if b - a < 2:
+                continue
+            peor = a + 1 + int(desvio[a + 1:b].argmax())
+            if desvio[peor] > tolerancia:
+                nuevas.append(peor)
+        if not nuevas:
+            break
+        claves = sorted(claves + nuevas)
+    return claves
+
+
+def extraer_pasos(t, q, tolerancia=TOLERANCIA, cintura=False, articulaciones=ARM_JOINTS, modo="fluido",
+                  control_dt=CONTROL_DT):
+    """Lista de pasos (formato de las rutinas) a partir de una grabación (t, q)."""
+    suave = suavizar(q)
+    inicio, fin = recortar_quietud(t, suave)
+    t, suave = remuestrear(t[inicio:fin], suave[inicio:fin], control_dt)
+    claves = ajustar_claves(t, suave, rdp(t, suave, tolerancia), tolerancia, modo)
+    pasos = []
+    for i, k in enumerate(claves):
+        posiciones = {j: round(float(v), 6) for j, v in zip(articulaciones, suave[k])}
+        if not cintura:
+            posiciones.update({j: 0.0 for j in CINTURA})
+        duracion = DURACION_PRIMER_PASO if i == 0 else round((k - claves[i - 1]) * control_dt, 6)
+        pasos.append({"nombre": f"Paso {i + 1}", "posiciones": posiciones, "duracion": duracion})
+    return pasos
+
+
+def rutina_de(nombre, pasos):
+    return {
+        "nombre_rutina": nombre,
+        "fecha_creacion": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "numero_pasos": len(pasos),
+        "pasos": pasos,
+    }
+
+
+def guardar_crudo(nombre, t, q, cintura=False):
+    """Todas las muestras como rutina binaria, un paso por muestra."""
+    q = np.array(q, dtype=np.float64)
+    if not cintura:
+        q[:, [COLUMNA[j] for j in CINTURA]] = 0.0
+    duraciones = np.diff(t, prepend=t[0] - DURACION_PRIMER_PASO)
+    pasos = [{"posiciones": dict(zip(ARM_JOINTS, fila)), "duracion": max(float(d), 1e-3)}
+             for fila, d in zip(q.tolist(), duraciones)]
+    ruta = nombre + "_crudo.rutb"
+    escribir_binaria(rutina_de(nombre, pasos), ruta)
+    return ruta
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(f"Uso: python3 {sys.argv[0]} <interfaz_red> [--tolerancia 0.05] [--coseno] [--cintura] [--crudo]")
+        sys.exit(1)
+    tolerancia = float(sys.argv[sys.argv.index("--tolerancia") + 1]) if "--tolerancia" in sys.argv else TOLERANCIA
+    cintura = "--cintura" in sys.argv
+    modo = "coseno" if "--coseno" in sys.argv else "fluido"
+
+    from unitree_sdk2py.core.channel import ChannelFactoryInitialize
+    ChannelFactoryInitialize(0, sys.argv[1])
+    grabador = GrabadorLowState()
+    grabador.init()
+
+    print("Esperando conexión con el robot...")
+    while grabador.ultimo is None:
+        time.sleep(0.1)
+    print("Conexión establecida.")
+
+    input("Coloque los brazos en la pose inicial y presione Enter para empezar a grabar...")
+    grabador.empezar()
+    input("Grabando. Mueva los brazos y presione Enter para terminar...")
+    t, q = grabador.terminar()
+    if grabador.desbordado:
+        print(f"Aviso: la grabación superó {DURACION_MAXIMA:.0f} s; se conservan los últimos.")
+    if len(t) < 2:
+        print("No se recibieron muestras.")
+        return
+    print(f"{len(t)} muestras en {t[-1]:.1f} s ({(len(t) - 1) / max(t[-1], 1e-6):.0f} Hz)")
+
+    pasos = extraer_pasos(t, q, tolerancia, cintura, modo=modo)
+    print(f"{len(pasos)} pasos con tolerancia {tolerancia} rad (modo {modo}).")
+
+    nombre = input("Ingrese el nombre de la rutina: ").strip() or "rutina_sin_nombre"
+    with open(nombre + ".txt", 'w') as f:
+        json.dump(rutina_de(nombre, pasos), f, indent=2)
+    print(f"\nArchivo guardado exitosamente como '{nombre}.txt'.")
+    if "--crudo" in sys.argv:
+        print(f"Muestras completas en '{guardar_crudo(nombre, t, q, cintura)}'.")
+
+
+if __name__ == "__main__":
+    main()
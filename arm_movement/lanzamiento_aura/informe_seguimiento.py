@@ -0,0 +1,99 @@
+"""
+Error de seguimiento simulado con y sin feed-forward.
+
+Cada articulación se simula como una inercia con el PD del motor
+(kp = 60, kd = 1.5), la consigna mantenida durante cada tick de control y
+la gravedad del modelo del URDF como perturbación. Se comparan tres
+configuraciones: dq = 0 (original), dq analítico y dq analítico + tau de
+gravedad. La inercia de cada articulación se estima con el modelo en la
+pose inicial de la rutina más una inercia de rotor fija, así que los valores
+absolutos son aproximados; la comparación entre configuraciones es lo que
+importa.
+
+Uso:
+    python3 informe_seguimiento.py [rutina.txt ...] [--fluido] [--rapido]
+"""
+import os
+import sys
+
+import numpy as np
+
+from biblioteca import BibliotecaRutinas
+from modelo_g1 import ModeloG1
+from rutinas import ARM_JOINTS, CONTROL_DT, CONTROL_DT_RAPIDO, RutinaInvalida
+
+KP = 60.0
+KD = 1.5
+INERCIA_ROTOR = 0.01
+DT_SIMULACION = 0.0005
+CONFIGURACIONES = [
+    ("dq = 0", False, False),
+    ("dq", True, False),
+    ("dq + gravedad", True, True),
+]
+
+
+def simular(rutina, inercias, feedforward, gravedad, kp=KP, kd=KD, dt_sim=DT_SIMULACION):
+    """Error de seguimiento (rad) al inicio de cada tick -> (ticks, articulaciones)."""
+    subpasos = max(1, round(rutina.control_dt / dt_sim))
+    dt = rutina.control_dt / subpasos
+    q = rutina.tabla[0].astype(np.float64)
+    dq = np.zeros_like(q)
+    errores = np.empty(rutina.tabla.shape)
+    for i in range(len(rutina.tabla)):
+        q_d = rutina.tabla[i]
+        dq_d = rutina.velocidades[i] if feedforward else 0.0
+        perturbacion = -rutina.pares[i]
+        tau_ff = rutina.pares[i] if gravedad else 0.0
+        errores[i] = q_d - q
+        for _ in range(subpasos):
+            ddq = (kp * (q_d - q) + kd * (dq_d - dq) + tau_ff + perturbacion) / inercias
+            dq += ddq * dt
+            q += dq * dt
+    return errores
+
+
+def informe(biblioteca, modelo, ruta, modo):
+    rutina = biblioteca.obtener(ruta, modo)
+    rutina.preparar_gravedad(modelo)
+    # Se parte ya en la primera pose para que el primer paso no dependa del robot
+    rutina = rutina.desde(rutina.destino_inicio, modelo)
+    inercias = modelo.inercias_efectivas(rutina.tabla[0]) + INERCIA_ROTOR
+    resultados = []
+    for _, feedforward, gravedad in CONFIGURACIONES:
+        errores = np.degrees(simular(rutina, inercias, feedforward, gravedad))
+        rms = float(np.sqrt(np.mean(errores ** 2)))
+        peor = int(np.abs(errores).max(axis=0).argmax())
+        resultados.append((rms, float(np.abs(errores).max()), ARM_JOINTS[peor]))
+    return resultados
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    modo = "fluido" if "--fluido" in sys.argv else "coseno"
+    control_dt = CONTROL_DT_RAPIDO if "--rapido" in sys.argv else CONTROL_DT
+
+    biblioteca = BibliotecaRutinas(control_dt=control_dt)
+    modelo = ModeloG1()
+    if args:
+        rutas = args
+    else:
+        biblioteca.cargar_todo()
+        rutas = sorted(biblioteca.entradas)
+
+    print(f"Error de seguimiento simulado (grados), modo {modo}, {1 / control_dt:.0f} Hz")
+    cabecera = "".join(f" {nombre + ' rms/máx':>21}" for nombre, _, _ in CONFIGURACIONES)
+    print(f"{'rutina':32}{cabecera}  peor articulación")
+    for ruta in rutas:
+        try:
+            resultados = informe(biblioteca, modelo, ruta, modo)
+        except RutinaInvalida as e:
+            print(f"{os.path.relpath(ruta, biblioteca.base):32} error: {e}")
+            continue
+        columnas = "".join(f" {rms:10.2f} / {maximo:8.2f}" for rms, maximo, _ in resultados)
+        print(f"{os.path.relpath(os.path.abspath(ruta), biblioteca.base):32}{columnas}"
+              f"  {resultados[0][2]} -> {resultados[-1][2]}")
+
+
+if __name__ == "__main__":
+    main()
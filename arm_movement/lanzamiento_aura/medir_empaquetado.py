@@ -0,0 +1,80 @@
+"""
+Microsegundos por tick para escribir las consignas de brazos y calcular el
+CRC del LowCmd_: camino original (un atributo por articulación y
+CRC().Crc) frente a ComandoEmpaquetado. Comprueba además que ambos CRC
+coinciden. No necesita robot ni red.
+
+Uso:
+    python3 medir_empaquetado.py [ticks]
+"""
+import sys
+import time
+
+import numpy as np
+
+from unitree_sdk2py.idl.default import unitree_hg_msg_dds__LowCmd_
+from unitree_sdk2py.utils.crc import CRC
+
+from empaquetado import ComandoEmpaquetado
+from rutinas import ARM_JOINTS, G1JointIndex
+
+
+def tabla_aleatoria(ticks):
+    rng = np.random.default_rng(0)
+    return rng.uniform(-1.5, 1.5, size=(ticks, len(ARM_JOINTS))).astype(np.float32)
+
+
+def comando_base():
+    low_cmd = unitree_hg_msg_dds__LowCmd_()
+    for joint in ARM_JOINTS:
+        low_cmd.motor_cmd[joint].kp = 60.0
+        low_cmd.motor_cmd[joint].kd = 1.5
+    low_cmd.motor_cmd[G1JointIndex.kNotUsedJoint].q = 1
+    return low_cmd
+
+
+def por_tick(funcion, tabla):
+    t0 = time.perf_counter()
+    for fila in tabla:
+        funcion(fila)
+    return (time.perf_counter() - t0) / len(tabla) * 1e6
+
+
+def main():
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    tabla = tabla_aleatoria(ticks)
+    crc = CRC()
+
+    original = comando_base()
+    motor_cmds = [original.motor_cmd[joint] for joint in ARM_JOINTS]
+
+    def tick_original(fila):
+        for cmd, q in zip(motor_cmds, fila.tolist()):
+            cmd.q = q
+        original.crc = crc.Crc(original)
+
+    empaquetado = ComandoEmpaquetado(comando_base(), ARM_JOINTS)
+
+    def tick_empaquetado(fila):
+        empaquetado.escribir(q=fila)
+        empaquetado.volcar()
+
+    for fila in tabla[:50]:
+        tick_original(fila)
+        tick_empaquetado(fila)
+        if original.crc != empaquetado.low_cmd.crc:
+            sys.exit(f"CRC distinto: {original.crc:#010x} != {empaquetado.low_cmd.crc:#010x}")
+
+    us_original = por_tick(tick_original, tabla)
+    us_empaquetado = por_tick(tick_empaquetado, tabla)
+    print(f"{ticks} ticks, {len(ARM_JOINTS)} articulaciones (CRC verificado)")
+    print(f"CRC().Crc          : {us_original:8.1f} us/tick")
+    print(f"ComandoEmpaquetado : {us_empaquetado:8.1f} us/tick  ({us_original / us_empaquetado:.1f}x)")
+    for hz in (50, 500):
+        presupuesto = 1e6 / hz
+        print(f"  a {hz:3d} Hz: {100 * us_original / presupuesto:5.1f} % -> "
+              f"{100 * us_empaquetado / presupuesto:5.1f} % del periodo")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Mide la latencia orden -> primer movimiento de un gesto.
+
+Escucha `rt/arm_sdk` y toma el tiempo desde que se lanza el gesto hasta el
+primer LowCmd_ con el control de brazos activado, comparando el lanzamiento
+como proceso (python3 script.py) con el reproductor persistente.
+
+Uso:
+    python3 medir_latencia.py <interfaz_red> <script_gesto.py> [repeticiones]
+"""
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from unitree_sdk2py.core.channel import ChannelFactoryInitialize, ChannelSubscriber
+from unitree_sdk2py.idl.unitree_hg.msg.dds_ import LowCmd_
+
+import cliente_rutinas
+from rutinas import G1JointIndex, cargar_y_compilar
+
+ESPERA_MAXIMA = 30.0
+
+
+class DetectorMovimiento:
+    def __init__(self):
+        self.evento = threading.Event()
+        self.t_primer_cmd = None
+
+    def Init(self):
+        self.subscriber = ChannelSubscriber("rt/arm_sdk", LowCmd_)
+        self.subscriber.Init(self.ArmSdkHandler, 10)
+
+    def ArmSdkHandler(self, msg: LowCmd_):
+        if msg.motor_cmd[G1JointIndex.kNotUsedJoint].q > 0.5 and not self.evento.is_set():
+            self.t_primer_cmd = time.monotonic()
+            self.evento.set()
+
+    def armar(self):
+        self.t_primer_cmd = None
+        self.evento.clear()
+
+    def esperar(self):
+        if not self.evento.wait(ESPERA_MAXIMA):
+            return None
+        return self.t_primer_cmd
+
+
+def medir_proceso(detector, script, interfaz):
+    detector.armar()
+    t0 = time.monotonic()
+    proceso = subprocess.Popen(["python3", script, interfaz, "--directo"])
+    t1 = detector.esperar()
+    proceso.wait()
+    return None if t1 is None else t1 - t0
+
+
+def medir_servidor(detector, ruta_rutina, liberar):
+    detector.armar()
+    t0 = time.monotonic()
+    cliente_rutinas.reproducir(ruta_rutina, liberar)
+    t1 = detector.esperar()
+    return None if t1 is None else t1 - t0
+
+
+def resumen(nombre, muestras):
+    validas = [m for m in muestras if m is not None]
+    if not validas:
+        print(f"{nombre:12}: sin muestras válidas")
+        return
+    print(f"{nombre:12}: mediana {statistics.median(validas) * 1000:8.1f} ms  "
+          f"mín {min(validas) * 1000:8.1f} ms  máx {max(validas) * 1000:8.1f} ms  "
+          f"({len(validas)}/{len(muestras)})")
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(f"Uso: python3 {sys.argv[0]} <interfaz_red> <script_gesto.py> [repeticiones]")
+        sys.exit(1)
+    interfaz, script = sys.argv[1], sys.argv[2]
+    repeticiones = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    envoltorio = cliente_rutinas.leer_envoltorio(script)
+    if envoltorio is None:
+        sys.exit(f"'{script}' no es un envoltorio de rutina.")
+    ruta_rutina, liberar = envoltorio
+    pausa = cargar_y_compilar(ruta_rutina).duracion + 1.0
+
+    ChannelFactoryInitialize(0, interfaz)
+    detector = DetectorMovimiento()
+    detector.Init()
+
+    print(f"Midiendo {script} ({repeticiones} repeticiones)...")
+    por_proceso = []
+    for _ in range(repeticiones):
+        por_proceso.append(medir_proceso(detector, script, interfaz))
+        time.sleep(1.0)
+
+    por_servidor = []
+    if cliente_rutinas.disponible():
+        for _ in range(repeticiones):
+            por_servidor.append(medir_servidor(detector, ruta_rutina, liberar))
+            time.sleep(pausa)
+    else:
+        print("Reproductor de rutinas no disponible: solo se mide el lanzamiento por proceso.")
+
+    print("\nLatencia tecla -> primer comando en rt/arm_sdk")
+    resumen("proceso", por_proceso)
+    if por_servidor:
+        resumen("reproductor", por_servidor)
+
+
+if __name__ == "__main__":
+    main()
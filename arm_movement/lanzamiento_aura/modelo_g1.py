@@ -0,0 +1,198 @@
+"""
+Modelo cinemático del G1 leído del URDF (g1_29dof.urdf de Cinematica).
+
+Da los límites articulares, el par de gravedad y una inercia efectiva de
+brazos y cintura para un lote de posiciones. Se supone la pelvis vertical (robot de pie); la
+inclinación del IMU no se tiene en cuenta.
+"""
+import os
+from xml.etree import ElementTree as ET
+
+import numpy as np
+
+from rutinas import ARM_JOINTS
+
+RUTA_URDF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         "g1_pcColiVRi", "Cinematica", "g1_29dof.urdf")
+GRAVEDAD = np.array([0.0, 0.0, -9.81])
+
+# Nombre en el URDF de cada columna de ARM_JOINTS
+NOMBRES_URDF = {
+    12: "waist_yaw_joint", 13: "waist_roll_joint", 14: "waist_pitch_joint",
+    15: "left_shoulder_pitch_joint", 16: "left_shoulder_roll_joint", 17: "left_shoulder_yaw_joint",
+    18: "left_elbow_joint", 19: "left_wrist_roll_joint", 20: "left_wrist_pitch_joint",
+    21: "left_wrist_yaw_joint",
+    22: "right_shoulder_pitch_joint", 23: "right_shoulder_roll_joint", 24: "right_shoulder_yaw_joint",
+    25: "right_elbow_joint", 26: "right_wrist_roll_joint", 27: "right_wrist_pitch_joint",
+    28: "right_wrist_yaw_joint",
+}
+# Raíz de la parte superior: todo lo que cuelga de ella carga a brazos y cintura
+RAIZ = "waist_yaw_joint"
+
+_limites = None
+
+
+def _vector(texto, defecto="0 0 0"):
+    return np.array([float(v) for v in (texto or defecto).split()])
+
+
+def _rpy(r, p, y):
+    """Matriz de rotación de un origin rpy del URDF (Rz(y) Ry(p) Rx(r))."""
+    cr, sr, cp, sp, cy, sy = np.cos(r), np.sin(r), np.cos(p), np.sin(p), np.cos(y), np.sin(y)
+    return np.array([
+        [cy * cp, cy * sp * sr - sy * cr, cy * sp * cr + sy * sr],
+        [sy * cp, sy * sp * sr + cy * cr, sy * sp * cr - cy * sr],
+        [-sp, cp * sr, cp * cr],
+    ])
+
+
+def _rotaciones(eje, angulos):
+    """Rodrigues para un lote de ángulos alrededor de un eje fijo -> (N, 3, 3)."""
+    k = np.array([[0, -eje[2], eje[1]], [eje[2], 0, -eje[0]], [-eje[1], eje[0], 0]])
+    s = np.sin(angulos)[:, None, None]
+    c = np.cos(angulos)[:, None, None]
+    return np.eye(3) + s * k + (1 - c) * (k @ k)
+
+
+def limites_urdf():
+    """(inferior, superior) por columna de ARM_JOINTS, leídos del URDF una sola vez."""
+    global _limites
+    if _limites is None:
+        _limites = ModeloG1().limites()
+    return _limites
+
+
+class Articulacion:
+    def __init__(self, nodo):
+        self.nombre = nodo.get("name")
+        self.tipo = nodo.get("type")
+        self.padre = nodo.find("parent").get("link")
+        self.hijo = nodo.find("child").get("link")
+        origen = nodo.find("origin")
+        self.xyz = _vector(origen.get("xyz") if origen is not None else None)
+        self.rot = _rpy(*_vector(origen.get("rpy") if origen is not None else None))
+        eje = nodo.find("axis")
+        self.eje = _vector(eje.get("xyz") if eje is not None else None, "1 0 0")
+        limite = nodo.find("limit")
+        self.inferior = float(limite.get("lower", "-inf")) if limite is not None else -np.inf
+        self.superior = float(limite.get("upper", "inf")) if limite is not None else np.inf
+        self.velocidad = float(limite.get("velocity", "inf")) if limite is not None else np.inf
+        self.esfuerzo = float(limite.get("effort", "inf")) if limite is not None else np.inf
+
+
+class ModeloG1:
+    def __init__(self, ruta=RUTA_URDF):
+        raiz = ET.parse(ruta).getroot()
+        self.masas = {}
+        self.centros = {}
+        for link in raiz.findall("link"):
+            inercial = link.find("inertial")
+            if inercial is None:
+                continue
+            self.masas[link.get("name")] = float(inercial.find("mass").get("value"))
+            origen = inercial.find("origin")
+            self.centros[link.get("name")] = _vector(origen.get("xyz") if origen is not None else None)
+
+        self.articulaciones = {a.nombre: a for a in map(Articulacion, raiz.findall("joint"))
+                               if a.tipo != "floating"}
+        faltan = [n for n in NOMBRES_URDF.values() if n not in self.articulaciones]
+        if faltan:
+            raise ValueError(f"El URDF no tiene las articulaciones {faltan}.")
+
+        # Articulaciones desde RAIZ hacia las puntas, padres antes que hijos
+        self.hijos = {}
+        for a in self.articulaciones.values():
+            self.hijos.setdefault(a.padre, []).append(a)
+        self.orden = []
+        pendientes = [self.articulaciones[RAIZ]]
+        while pendientes:
+            a = pendientes.pop()
+            self.orden.append(a)
+            pendientes.extend(self.hijos.get(a.hijo, []))
+        self.columna = {NOMBRES_URDF[j]: i for i, j in enumerate(ARM_JOINTS)}
+        # Links que mueve cada articulación de las columnas
+        self.descendientes = {}
+        for nombre in self.columna:
+            links = []
+            pendientes = [self.articulaciones[nombre]]
+            while pendientes:
+                a = pendientes.pop()
+                links.append(a.hijo)
+                pendientes.extend(self.hijos.get(a.hijo, []))
+            self.descendientes[nombre] = links
+
+    def articulacion(self, joint):
+        """Articulacion del URDF para un índice de motor (12-28)."""
+        return self.articulaciones[NOMBRES_URDF[joint]]
+
+    def limites(self):
+        """(inferior, superior) de cada columna de ARM_JOINTS."""
+        inferior = np.array([self.articulacion(j).inferior for j in ARM_JOINTS])
+        superior = np.array([self.articulacion(j).superior for j in ARM_JOINTS])
+        return inferior, superior
+
+    def cinematica(self, q):
+        """
+        Cinemática directa para q (N, 17): rotación y posición de cada link y
+        eje y origen de cada articulación móvil, en el marco de la pelvis.
+        """
+        q = np.atleast_2d(np.asarray(q, dtype=np.float64))
+        n = len(q)
+        rot = {self.orden[0].padre: np.broadcast_to(np.eye(3), (n, 3, 3))}
+        pos = {self.orden[0].padre: np.zeros((n, 3))}
+        ejes = {}
+        origenes = {}
+        for a in self.orden:
+            r_padre, p_padre = rot[a.padre], pos[a.padre]
+            r = r_padre @ a.rot
+            p = p_padre + r_padre @ a.xyz
+            if a.tipo != "fixed":
+                ejes[a.nombre] = r @ a.eje
+                origenes[a.nombre] = p
+                columna = self.columna.get(a.nombre)
+                if columna is not None:
+                    r = r @ _rotaciones(a.eje, q[:, columna])
+            rot[a.hijo], pos[a.hijo] = r, p
+        return rot, pos, ejes, origenes
+
+    def centro_masa(self, link, rot, pos):
+        return pos[link] + rot[link] @ self.centros.get(link, np.zeros(3))
+
+    def pares_gravedad(self, q):
+        """
+        Par que compensa la gravedad en cada columna para las posiciones
+        q (N, 17) -> (N, 17), en Nm y con el signo del eje del motor.
+        """
+        rot, pos, ejes, origenes = self.cinematica(q)
+        n = len(np.atleast_2d(q))
+
+        # Masa y momento de masa acumulados de cada subárbol (de las puntas a la raíz)
+        masa = {}
+        momento = {}
+        for a in reversed(self.orden):
+            m = self.masas.get(a.hijo, 0.0)
+            mc = m * self.centro_masa(a.hijo, rot, pos)
+            for h in self.hijos.get(a.hijo, []):
+                m += masa[h.nombre]
+                mc = mc + momento[h.nombre]
+            masa[a.nombre], momento[a.nombre] = m, mc
+
+        tau = np.zeros((n, len(ARM_JOINTS)))
+        for nombre, columna in self.columna.items():
+            brazo = momento[nombre] - masa[nombre] * origenes[nombre]
+            tau[:, columna] = -np.einsum("ij,ij->i", np.cross(brazo, GRAVEDAD), ejes[nombre])
+        return tau
+
+    def inercias_efectivas(self, q):
+        """
+        Inercia (kg m^2) que ve cada columna en la pose q (17,), con cada
+        link como masa puntual en su centro de masa y el resto quieto.
+        """
+        rot, pos, ejes, origenes = self.cinematica(q)
+        inercias = np.zeros(len(ARM_JOINTS))
+        for nombre, columna in self.columna.items():
+            eje, origen = ejes[nombre][0], origenes[nombre][0]
+            for link in self.descendientes[nombre]:
+                r = np.cross(eje, self.centro_masa(link, rot, pos)[0] - origen)
+                inercias[columna] += self.masas.get(link, 0.0) * r @ r
+        return inercias
@@ -0,0 +1,542 @@
+"""
+Motor de reproducción de rutinas de brazos por `rt/arm_sdk`.
+
+La rutina se compila al cargarla (ver rutinas.py) y el hilo de control solo
+copia una fila de la tabla en LowCmd_ por tick. La fila se elige por el
+tiempo transcurrido desde el inicio (reloj monótono), no contando ticks: si
+RecurrentThread se atrasa, la rutina no se estira.
+
+Con control_dt = CONTROL_DT_RAPIDO (--rapido) la tabla se compila a 2 ms y
+se publica a 500 Hz. Si el tick no cabe en su presupuesto de CPU, se publica
+solo en una de cada N activaciones (4, 10 o 20 ms); la fila se sigue
+eligiendo por tiempo, así que la trayectoria no cambia.
+
+Sobre la rutina principal se pueden reproducir capas: rutinas que solo
+mandan sobre un grupo (BRAZO_IZQ, BRAZO_DER, CINTURA) y se mezclan con la
+principal con un peso, todo en un único LowCmd_ por tick. Así una mano
+sostiene el micrófono mientras la otra saluda.
+
+Cada tick envía también la velocidad analítica de la trayectoria como dq
+(--sin-dq lo desactiva) y, con --gravedad, el par de gravedad del modelo
+del URDF como tau.
+
+Cada tick publicado se registra junto con la medida (ver seguimiento.py):
+error de seguimiento, retraso y asentamiento de cada paso de la última
+rutina pedida. Los scripts de gestos lo muestran al terminar con --seguimiento.
+
+Con --perfil los callbacks de control y de rt/lowstate se miden con
+perfilador.py (retraso, intervalo y duración de cada tick); el informe se
+vuelca con SIGUSR1 y al salir.
+"""
+import os
+import sys
+import time
+import threading
+
+import numpy as np
+
+from unitree_sdk2py.core.channel import ChannelFactoryInitialize, ChannelPublisher
+from unitree_sdk2py.idl.unitree_hg.msg.dds_ import LowCmd_, LowState_
+from unitree_sdk2py.idl.default import unitree_hg_msg_dds__LowCmd_
+from unitree_sdk2py.utils.thread import RecurrentThread
+
+import cliente_rutinas
+from empaquetado import ComandoEmpaquetado
+from modelo_g1 import ModeloG1
+from perfilador import Perfilador
+from rutinas import (ARM_JOINTS, COLUMNA, CONTROL_DT, CONTROL_DT_RAPIDO, DURACION_FRENADO, GRUPOS, G1JointIndex,
+                     RutinaInvalida, rutina_fija, rutina_frenado)
+from seguimiento import ESPERA_FINAL, RegistroSeguimiento, imprimir_resumen, resumir
+from transformaciones import cargar_variante
+
+# rt/lowstate se lee del bus local de estado si el puente está corriendo (ver bus_estado.py)
+RUTA_BUS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        "g1_pcColiVRi", "Robotics4p0", "100425")
+sys.path.insert(0, RUTA_BUS)
+from bus_estado import suscribir  # noqa: E402
+
+# Opciones de ejecutar_rutina que fija el proceso que publica: no se pueden pedir al reproductor persistente
+OPCIONES_DIRECTAS = ("--rapido", "--sin-dq", "--gravedad", "--perfil")
+
+
+class RelojControl:
+    """
+    Fase de reproducción a partir de un instante de inicio monótono, con
+    contadores de jitter, de ticks perdidos (overruns) y de la latencia con
+    que una rutina nueva reemplaza a la que estaba en marcha.
+    """
+
+    def __init__(self, control_dt):
+        self.control_dt = control_dt
+        # Fases que avanza cada tick publicado (ver PresupuestoTick)
+        self.divisor = 1
+        self.t_inicio = None
+        self.fase = -1
+        self.t_ultimo = None
+        self.ticks = 0
+        self.ticks_perdidos = 0
+        self.ticks_largos = 0
+        self.jitter_max = 0.0
+        self.suma_jitter = 0.0
+        self.ejecucion_max = 0.0
+        self.reemplazos = 0
+        self.suma_latencia_reemplazo = 0.0
+        self.latencia_reemplazo_max = 0.0
+
+    def reiniciar(self):
+        """La próxima llamada a avanzar() será la fase 0."""
+        self.t_inicio = None
+        self.fase = -1
+
+    def continuar(self):
+        """
+        Nueva rutina que arranca donde se publicó el último tick: ese tick es
+        su fase 0 (la consigna ya enviada) y la próxima llamada avanza desde él.
+        """
+        self.t_inicio = self.t_ultimo
+        self.fase = 0
+
+    @property
+    def periodo(self):
+        """Periodo esperado entre ticks publicados."""
+        return self.control_dt * self.divisor
+
+    def avanzar(self, ahora):
+        """Fase (índice de fila) que corresponde al instante `ahora`."""
+        if self.t_ultimo is not None:
+            jitter = abs(ahora - self.t_ultimo - self.periodo)
+            self.suma_jitter += jitter
+            self.jitter_max = max(self.jitter_max, jitter)
+        self.t_ultimo = ahora
+        self.ticks += 1
+
+        if self.t_inicio is None:
+            self.t_inicio = ahora
+            fase = 0
+        else:
+            fase = max(int((ahora - self.t_inicio) / self.control_dt + 0.5), self.fase + 1)
+            self.ticks_perdidos += max(fase - self.fase - self.divisor, 0)
+        self.fase = fase
+        return fase
+
+    def terminar_tick(self, duracion):
+        """Registra cuánto tardó el tick; más del periodo es un overrun."""
+        self.ejecucion_max = max(self.ejecucion_max, duracion)
+        if duracion > self.periodo:
+            self.ticks_largos += 1
+
+    def registrar_reemplazo(self, latencia):
+        """Latencia (s) desde la orden hasta el primer tick de la rutina que reemplaza a otra."""
+        ticks = latencia / self.periodo
+        self.reemplazos += 1
+        self.suma_latencia_reemplazo += ticks
+        self.latencia_reemplazo_max = max(self.latencia_reemplazo_max, ticks)
+
+    def estadisticas(self):
+        return {
+            "periodo_ms": 1000 * self.periodo,
+            "ticks": self.ticks,
+            "ticks_perdidos": self.ticks_perdidos,
+            "ticks_largos": self.ticks_largos,
+            "jitter_medio_ms": 1000 * self.suma_jitter / max(self.ticks - 1, 1),
+            "jitter_max_ms": 1000 * self.jitter_max,
+            "ejecucion_max_ms": 1000 * self.ejecucion_max,
+            "reemplazos": self.reemplazos,
+            "latencia_reemplazo_media_ticks": self.suma_latencia_reemplazo / max(self.reemplazos, 1),
+            "latencia_reemplazo_max_ticks": self.latencia_reemplazo_max,
+        }
+
+
+class PresupuestoTick:
+    """
+    Comprueba el tiempo de CPU de cada tick publicado. Si en una ventana más
+    de `tolerancia` de los ticks supera `fraccion` del periodo, se pasa al
+    siguiente divisor (menos publicaciones por segundo). Nunca se baja de la
+    frecuencia normal (CONTROL_DT).
+    """
+
+    DIVISORES = (1, 2, 5, 10)
+
+    def __init__(self, control_dt, fraccion=0.5, ventana=250, tolerancia=0.05):
+        self.control_dt = control_dt
+        self.fraccion = fraccion
+        self.ventana = ventana
+        self.tolerancia = tolerancia
+        self.divisores = [d for d in self.DIVISORES if control_dt * d <= CONTROL_DT + 1e-9]
+        self.nivel = 0
+        self.n = 0
+        self.excedidos = 0
+
+    @property
+    def divisor(self):
+        return self.divisores[self.nivel]
+
+    def registrar(self, duracion):
+        """Cuenta un tick; devuelve True si hay que publicar con otro divisor."""
+        self.n += 1
+        if duracion > self.fraccion * self.control_dt * self.divisor:
+            self.excedidos += 1
+        if self.n < self.ventana:
+            return False
+        excedido = self.excedidos > self.tolerancia * self.n
+        self.n = 0
+        self.excedidos = 0
+        if excedido and self.nivel + 1 < len(self.divisores):
+            self.nivel += 1
+            return True
+        return False
+
+
+class Capa:
+    """
+    Rutina que solo manda sobre las columnas de un grupo. Su consigna se
+    mezcla con la de la rutina principal: (1 - peso) * principal + peso * capa.
+    Al terminar (o al quitarla) el peso baja a 0 en DURACION_FRENADO, salvo
+    con `mantener`, que deja la capa en su pose final.
+    """
+
+    def __init__(self, rutina, grupo, peso, mantener, control_dt):
+        self.rutina = rutina
+        self.grupo = grupo
+        self.columnas = np.array([COLUMNA[j] for j in GRUPOS[grupo]], dtype=np.intp)
+        self.peso = peso
+        self.mantener = mantener
+        self.retirando = False
+        self.reloj = RelojControl(control_dt)
+        self.fin = threading.Event()
+
+    def mezclar(self, ahora, periodo, q, dq, tau):
+        """Aplica la capa sobre q/dq/tau (se modifican). Devuelve False cuando ya no pesa."""
+        tick = self.reloj.avanzar(ahora)
+        i = self.rutina.indice(tick)
+        if tick + 1 >= self.rutina.ticks:
+            self.fin.set()
+            if not self.mantener:
+                self.retirando = True
+        if self.retirando:
+            self.peso = max(self.peso - periodo / DURACION_FRENADO, 0.0)
+            if self.peso <= 0.0:
+                return False
+        c, w = self.columnas, self.peso
+        q[c] = (1 - w) * q[c] + w * self.rutina.tabla[i, c]
+        dq[c] = (1 - w) * dq[c] + w * self.rutina.velocidades[i, c]
+        if self.rutina.pares is not None:
+            tau[c] = (1 - w) * tau[c] + w * self.rutina.pares[i, c]
+        return True
+
+
+class ArmSequence:
+    def __init__(self, control_dt=CONTROL_DT, feedforward=True, modelo=None, seguimiento=True, perfil=None):
+        self.control_dt = control_dt
+        self.feedforward = feedforward
+        # ModeloG1 para compensar la gravedad con tau; None la desactiva
+        self.modelo = modelo
+        self.kp = 60.0
+        self.kd = 1.5
+        self.low_cmd = unitree_hg_msg_dds__LowCmd_()
+        self.low_state = None
+        self.first_update = False
+        self.lock = threading.Lock()
+        self.rutina = None
+        self.reloj = RelojControl(self.control_dt)
+        self.presupuesto = PresupuestoTick(self.control_dt)
+        self.activaciones = 0
+        self.q_cmd = None
+        self.dq_cmd = None
+        # Instante de la orden si la rutina actual reemplazó a otra en marcha
+        self.t_reemplazo = None
+        self.primer_tick = threading.Event()
+        self.fin = threading.Event()
+        # Capas por grupo, aplicadas en orden de inserción sobre la rutina principal
+        self.capas = {}
+        self.arm_joints = list(ARM_JOINTS)
+        # Consigna contra medida de la rutina en curso; None lo desactiva
+        self.seguimiento = RegistroSeguimiento(control_dt, articulaciones=self.arm_joints) if seguimiento else None
+        self.comando = ComandoEmpaquetado(self.low_cmd, self.arm_joints)
+        # Perfilador de los callbacks; None no los envuelve
+        self.perfil = perfil
+        self.preparar_comando()
+
+    def Init(self):
+        self.publisher = ChannelPublisher("rt/arm_sdk", LowCmd_)
+        self.publisher.Init()
+        handler = self.LowStateHandler
+        if self.perfil is not None:
+            handler = self.perfil.envolver(handler, "lowstate")
+        # Del bus local si bus_estado.py está corriendo; si no, por DDS
+        self.subscriber = suscribir("rt/lowstate", LowState_, handler)
+
+    def Start(self):
+        target = self.LowCmdWrite
+        if self.perfil is not None:
+            target = self.perfil.envolver(target, "arm_control", periodo=self.control_dt)
+        self.thread = RecurrentThread(interval=self.control_dt, target=target, name="arm_control")
+        while not self.first_update:
+            time.sleep(0.1)
+        self.thread.Start()
+
+    def LowStateHandler(self, msg: LowState_):
+        self.low_state = msg
+        if not self.first_update:
+            self.first_update = True
+
+    def preparar_comando(self):
+        """Ganancias fijas: se escriben una vez, no en cada tick."""
+        self.comando.escribir(dq=0.0, tau=0.0, kp=self.kp, kd=self.kd)
+        self.comando.volcar(("dq", "tau", "kp", "kd"))
+
+    def posiciones_actuales(self):
+        """Posición medida de las articulaciones de brazos y cintura."""
+        estado = self.low_state.motor_state
+        return np.array([estado[joint].q for joint in self.arm_joints], dtype=np.float32)
+
+    def LowCmdWrite(self):
+        if self.low_state is None:
+            return
+        # El hilo sigue despertando cada control_dt; con divisor > 1 solo publica una de cada N
+        self.activaciones += 1
+        if self.activaciones % self.reloj.divisor:
+            return
+
+        with self.lock:
+            rutina = self.rutina
+            if rutina is None:
+                return
+            ahora = time.monotonic()
+            tick = self.reloj.avanzar(ahora)
+
+            i = rutina.indice(tick)
+            q = rutina.tabla[i]
+            dq = rutina.velocidades[i]
+            tau = rutina.pares[i] if rutina.pares is not None else 0.0
+            if self.capas:
+                q, dq = q.copy(), dq.copy()
+                tau = np.zeros_like(q) + tau
+                for grupo, capa in list(self.capas.items()):
+                    if not capa.mezclar(ahora, self.reloj.periodo, q, dq, tau):
+                        del self.capas[grupo]
+            self.q_cmd = q
+            self.dq_cmd = dq
+
+            self.comando.asignar(G1JointIndex.kNotUsedJoint, "q", 1)
+            self.comando.escribir(
+                q=self.q_cmd,
+                dq=self.dq_cmd if self.feedforward else 0.0,
+                tau=tau,
+            )
+            self.comando.volcar(("q", "dq", "tau"))
+            self.publisher.Write(self.low_cmd)
+            if self.seguimiento is not None:
+                self.seguimiento.registrar(ahora, tick, self.q_cmd, self.dq_cmd, self.low_state)
+            if not self.primer_tick.is_set():
+                self.primer_tick.set()
+                if self.t_reemplazo is not None:
+                    self.reloj.registrar_reemplazo(ahora - self.t_reemplazo)
+            if tick + 1 >= rutina.ticks:
+                self.fin.set()
+            duracion = time.monotonic() - ahora
+            self.reloj.terminar_tick(duracion)
+            if self.presupuesto.registrar(duracion):
+                self.reloj.divisor = self.presupuesto.divisor
+                print(f"Tick fuera de presupuesto: se publica cada {self.reloj.periodo * 1000:.0f} ms")
+
+    def iniciar(self, rutina, seguir=True):
+        """
+        Empieza a reproducir una RutinaCompilada sin esperar a que termine.
+
+        Si hay otra rutina en marcha, la reemplaza en el próximo tick: el
+        primer paso parte de la última consigna y velocidad enviadas, así que
+        no hay salto. Si no, parte de la pose medida, tomada una sola vez.
+        Devuelve la rutina ya resuelta, que es la que queda en reproducción.
+        Las rutinas internas (mantener, frenar) van con seguir=False: el
+        seguimiento conserva la última rutina pedida.
+        """
+        if self.modelo is not None:
+            rutina.preparar_gravedad(self.modelo)
+        with self.lock:
+            t_orden = time.monotonic()
+            en_marcha = self.rutina is not None and self.q_cmd is not None
+            if en_marcha:
+                rutina = rutina.desde(self.q_cmd, self.modelo, self.dq_cmd)
+            elif not rutina.resuelta:
+                rutina = rutina.desde(self.posiciones_actuales(), self.modelo)
+            # Quien esperaba la rutina anterior se despierta: fue reemplazada
+            self.fin.set()
+            self.fin = threading.Event()
+            self.primer_tick.set()
+            self.primer_tick = threading.Event()
+            if en_marcha:
+                self.reloj.continuar()
+                self.t_reemplazo = t_orden
+            else:
+                self.reloj.reiniciar()
+                self.t_reemplazo = None
+            self.rutina = rutina
+            if self.seguimiento is not None:
+                if seguir:
+                    self.seguimiento.empezar(rutina)
+                else:
+                    self.seguimiento.terminar()
+        return rutina
+
+    def iniciar_capa(self, grupo, rutina, peso=1.0, mantener=False):
+        """
+        Reproduce `rutina` solo en las articulaciones de `grupo`, encima de la
+        rutina principal, y la devuelve resuelta. Parte de la consigna actual,
+        así que entra sin salto; si no hay rutina principal, se mantiene la
+        pose medida como principal.
+        """
+        if grupo not in GRUPOS:
+            raise RutinaInvalida(f"Grupo de articulaciones desconocido: {grupo!r}.")
+        if self.rutina is None:
+            self.iniciar(rutina_fija(self.posiciones_actuales(), self.control_dt), seguir=False)
+        if self.modelo is not None:
+            rutina.preparar_gravedad(self.modelo)
+        with self.lock:
+            # Como en iniciar(): la consigna solo vale si la principal ya publicó desde que empezó
+            en_marcha = self.rutina is not None and self.q_cmd is not None
+            if en_marcha:
+                rutina = rutina.desde(self.q_cmd, self.modelo, self.dq_cmd)
+            else:
+                rutina = rutina.desde(self.posiciones_actuales(), self.modelo)
+            capa = Capa(rutina, grupo, min(max(peso, 0.0), 1.0), mantener, self.control_dt)
+            capa.reloj.divisor = self.reloj.divisor
+            if en_marcha:
+                capa.reloj.t_ultimo = self.reloj.t_ultimo
+                capa.reloj.continuar()
+            anterior = self.capas.pop(grupo, None)
+            if anterior is not None:
+                anterior.fin.set()
+            self.capas[grupo] = capa
+        return rutina
+
+    def quitar_capa(self, grupo=None):
+        """Devuelve el grupo (o todos) a la rutina principal, bajando el peso sin salto."""
+        with self.lock:
+            for g, capa in self.capas.items():
+                if grupo is None or g == grupo:
+                    capa.retirando = True
+                    capa.fin.set()
+
+    def buscar_fin(self, rutina):
+        """Evento de fin de la rutina principal o de una capa; None si ya no está en reproducción."""
+        if rutina is None or rutina is self.rutina:
+            return self.fin if self.rutina is not None else None
+        for capa in self.capas.values():
+            if capa.rutina is rutina:
+                return capa.fin
+        return None
+
+    def en_curso(self, rutina=None):
+        """True mientras la rutina (o la actual) no haya completado su último paso."""
+        with self.lock:
+            fin = self.buscar_fin(rutina)
+        return fin is not None and not fin.is_set()
+
+    def esperar(self, rutina=None, timeout=None):
+        """Bloquea hasta que la rutina termine o sea reemplazada."""
+        with self.lock:
+            fin = self.buscar_fin(rutina)
+        return True if fin is None else fin.wait(timeout)
+
+    def reproducir(self, rutina):
+        """Reproduce una RutinaCompilada y espera a que termine el último paso."""
+        self.esperar(self.iniciar(rutina))
+
+    def resumen_seguimiento(self, esperar_asentamiento=False):
+        """
+        Resumen del seguimiento de la rutina principal en curso o de la última
+        (ver seguimiento.resumir), o None si no hay datos. Con
+        `esperar_asentamiento` espera el tiempo que se sigue registrando
+        después del último paso.
+        """
+        if self.seguimiento is None:
+            return None
+        if esperar_asentamiento:
+            time.sleep(ESPERA_FINAL)
+        with self.lock:
+            datos = self.seguimiento.datos()
+        # El análisis se hace fuera del lock, sin frenar al hilo de control
+        return resumir(datos, self.arm_joints) if datos is not None else None
+
+    def detener(self):
+        """Frena la rutina en curso en DURACION_FRENADO y mantiene donde se detuvo."""
+        self.quitar_capa()
+        with self.lock:
+            en_marcha = self.rutina is not None and self.q_cmd is not None
+            q, dq = self.q_cmd, self.dq_cmd
+        if not en_marcha:
+            self.iniciar(rutina_fija(self.posiciones_actuales(), self.control_dt), seguir=False)
+            return
+        self.iniciar(rutina_frenado(q, dq, self.control_dt), seguir=False)
+
+    def freeze_and_release(self):
+        with self.lock:
+            self.rutina = None
+            # Sin control los brazos se mueven libres: la próxima rutina o capa parte de la pose medida
+            self.q_cmd = None
+            self.dq_cmd = None
+            self.fin.set()
+            for capa in self.capas.values():
+                capa.fin.set()
+            self.capas.clear()
+            self.comando.escribir(q=self.posiciones_actuales(), dq=0.0, tau=0.0, kp=0.0, kd=0.0)
+            self.comando.asignar(G1JointIndex.kNotUsedJoint, "q", 0)
+            self.comando.volcar(("q", "dq", "tau", "kp", "kd"))
+            self.publisher.Write(self.low_cmd)
+            self.preparar_comando()
+
+
+def ejecutar_rutina(ruta, liberar=True):
+    """
+    Punto de entrada de los scripts de gestos:
+    <script> <interfaz_red> [--fluido] [--rapido] [--sin-dq] [--gravedad] [--directo] [--seguimiento]
+    [--perfil]
+
+    Si el reproductor persistente está corriendo, la rutina se le pide a él
+    para que nunca haya dos procesos publicando en rt/arm_sdk; la frecuencia,
+    el feed-forward y el perfil son los del reproductor, así que esas
+    opciones solo valen con --directo, que publica desde este proceso.
+    --seguimiento muestra al final el resumen de seguimiento; en modo directo
+    espera antes ESPERA_FINAL para medir el asentamiento del último paso.
+    """
+    if len(sys.argv) < 2:
+        sys.exit()
+    opciones = sys.argv[2:]
+    modo = "fluido" if "--fluido" in opciones else "coseno"
+
+    if "--directo" not in opciones and cliente_rutinas.disponible():
+        propias = [o for o in OPCIONES_DIRECTAS if o in opciones]
+        if propias:
+            sys.exit(f"El reproductor persistente está corriendo y usa sus propias opciones; "
+                     f"para {' '.join(propias)} hace falta --directo.")
+        respuesta = cliente_rutinas.reproducir(ruta, liberar, esperar=True, modo=modo)
+        if not respuesta.get("ok"):
+            sys.exit(f"El reproductor rechazó la rutina: {respuesta.get('error')}")
+        if "--seguimiento" in opciones:
+            resumen = cliente_rutinas.enviar({"cmd": "seguimiento"}).get("seguimiento")
+            if resumen is not None:
+                imprimir_resumen(resumen)
+        return
+
+    control_dt = CONTROL_DT_RAPIDO if "--rapido" in opciones else CONTROL_DT
+    try:
+        rutina = cargar_variante(ruta, control_dt, modo=modo)
+    except RutinaInvalida as e:
+        sys.exit(f"Rutina no válida ({os.path.basename(ruta)}): {e}")
+
+    ChannelFactoryInitialize(0, sys.argv[1])
+    modelo = ModeloG1() if "--gravedad" in opciones else None
+    perfil = Perfilador().instalar() if "--perfil" in opciones else None
+    seq = ArmSequence(control_dt, feedforward="--sin-dq" not in opciones, modelo=modelo,
+                      seguimiento="--seguimiento" in opciones, perfil=perfil)
+    seq.Init()
+    seq.Start()
+
+    seq.reproducir(rutina)
+    resumen = seq.resumen_seguimiento(esperar_asentamiento=True)
+    if resumen is not None:
+        imprimir_resumen(resumen)
+
+    if liberar:
+        seq.freeze_and_release()
@@ -0,0 +1,524 @@
+"""
+Carga, validación y compilación de rutinas de brazos del G1.
+
+Una rutina es un archivo JSON (.txt) con el formato que genera la herramienta
+de captura: nombre_rutina, fecha_creacion, numero_pasos y una lista de pasos,
+cada uno con sus "posiciones" (id de articulación -> rad) y su "duracion" (s).
+
+La rutina se compila una sola vez al cargarla en una tabla contigua float32
+de forma (ticks, articulaciones). El hilo de control solo tiene que copiar
+una fila por tick, y cualquier error de la rutina se detecta antes de que el
+robot se mueva. Junto a la posición se guarda su velocidad analítica, que se
+envía como dq (feed-forward), y opcionalmente el par de gravedad. Las
+posiciones compiladas se recortan a los límites articulares del URDF.
+
+También hay un formato binario (.rutb) con los mismos datos, pensado para
+trayectorias grabadas de miles de muestras: una cabecera con los ids de las
+articulaciones, las duraciones (float64) y los metadatos en JSON, seguida de la matriz
+float32 (pasos, articulaciones) de posiciones, con NaN donde un paso no
+define la articulación. Se lee con np.memmap, sin parsear texto. cargar_rutina
+reconoce el formato por los primeros bytes, no por la extensión.
+"""
+import json
+import math
+import struct
+
+import numpy as np
+
+from trayectorias import interpolar_fluido
+
+
+class G1JointIndex:
+    LeftHipPitch = 0
+    LeftHipRoll = 1
+    LeftHipYaw = 2
+    LeftKnee = 3
+    LeftAnklePitch = 4
+    LeftAnkleRoll = 5
+    RightHipPitch = 6
+    RightHipRoll = 7
+    RightHipYaw = 8
+    RightKnee = 9
+    RightAnklePitch = 10
+    RightAnkleRoll = 11
+    WaistYaw = 12
+    WaistRoll = 13
+    WaistPitch = 14
+    LeftShoulderPitch = 15
+    LeftShoulderRoll = 16
+    LeftShoulderYaw = 17
+    LeftElbow = 18
+    LeftWristRoll = 19
+    LeftWristPitch = 20
+    LeftWristYaw = 21
+    RightShoulderPitch = 22
+    RightShoulderRoll = 23
+    RightShoulderYaw = 24
+    RightElbow = 25
+    RightWristRoll = 26
+    RightWristPitch = 27
+    RightWristYaw = 28
+    kNotUsedJoint = 29
+
+
+BRAZO_IZQ = [15, 16, 17, 18, 19, 20, 21]
+BRAZO_DER = [22, 23, 24, 25, 26, 27, 28]
+CINTURA = [12, 13, 14]
+
+# Mismo orden que ArmSequence.arm_joints: columnas de las tablas compiladas
+ARM_JOINTS = BRAZO_IZQ + BRAZO_DER + CINTURA
+COLUMNA = {joint: i for i, joint in enumerate(ARM_JOINTS)}
+# Cadenas que pueden llevar una rutina propia encima de la principal (capas)
+GRUPOS = {"BRAZO_IZQ": BRAZO_IZQ, "BRAZO_DER": BRAZO_DER, "CINTURA": CINTURA}
+
+CONTROL_DT = 0.02
+# Modo de alta frecuencia: rt/arm_sdk a 500 Hz, al ritmo de rt/lowstate
+CONTROL_DT_RAPIDO = 0.002
+DURACION_POR_DEFECTO = 1.25
+# Frenado suave al detener una rutina en marcha
+DURACION_FRENADO = 0.3
+
+# "coseno": cada paso arranca y termina en reposo (comportamiento original).
+# "fluido": cúbica monótona por todos los puntos, sin detenerse en cada paso.
+MODOS = ("coseno", "fluido")
+
+
+# Formato binario: magia, versión, articulaciones, pasos, largo de los metadatos, offset de la matriz
+MAGIA_BINARIA = b"RUTB"
+VERSION_BINARIA = 1
+EXTENSION_BINARIA = ".rutb"
+CABECERA_BINARIA = struct.Struct("<4sHHIII")
+ALINEACION_BINARIA = 16
+
+
+class RutinaInvalida(ValueError):
+    """Error de formato o de contenido en un archivo de rutina."""
+
+
+class RutinaCompilada:
+    """
+    Rutina lista para reproducir.
+
+    El primer paso parte de la posición medida del robot, que solo se conoce
+    al ejecutar: se guarda como una rampa (ratio por tick) y un destino. El
+    resto de los pasos ya queda resuelto en `tabla`, cuya última fila es la
+    posición final que se mantiene al terminar. `desde(q0)` fija el origen y
+    devuelve la rutina con el primer paso también precalculado.
+
+    `velocidades` tiene la misma forma que `tabla` (rad/s); `derivada_inicio`
+    es la derivada de la rampa del primer paso (1/s) y `duracion_inicio` su
+    duración. `pares` es el par de gravedad por fila, o None si no se calculó.
+    """
+
+    def __init__(self, nombre, rampa_inicio, destino_inicio, tabla, ticks_por_paso, control_dt,
+                 velocidades=None, derivada_inicio=None, pares=None, duracion_inicio=0.0):
+        self.nombre = nombre
+        self.rampa_inicio = rampa_inicio
+        self.destino_inicio = destino_inicio
+        self.tabla = tabla
+        self.ticks_por_paso = ticks_por_paso
+        self.control_dt = control_dt
+        self.velocidades = np.zeros_like(tabla) if velocidades is None else velocidades
+        self.derivada_inicio = np.zeros_like(rampa_inicio) if derivada_inicio is None else derivada_inicio
+        self.pares = pares
+        self.duracion_inicio = duracion_inicio
+
+    @property
+    def ticks(self):
+        """Ticks de control hasta completar el último paso."""
+        return int(sum(self.ticks_por_paso))
+
+    @property
+    def duracion(self):
+        return self.ticks * self.control_dt
+
+    @property
+    def resuelta(self):
+        """True si la tabla ya cubre todos los ticks (origen conocido)."""
+        return len(self.rampa_inicio) == 0
+
+    def desde(self, q0, modelo=None, v0=None):
+        """
+        Copia de la rutina con el primer paso interpolado desde la pose fija
+        q0. Con `v0` (rutina que reemplaza a otra en marcha) el primer paso
+        arranca a esa velocidad y la va perdiendo hasta llegar en reposo, sin
+        salto de velocidad. Si ya se preparó la gravedad, `modelo` calcula la
+        del primer paso.
+        """
+        if self.resuelta:
+            return self
+        q0 = np.asarray(q0, dtype=np.float32)
+        delta = self.destino_inicio - q0
+        inicio = q0 + delta * self.rampa_inicio[:, None]
+        velocidades_inicio = delta * self.derivada_inicio[:, None]
+        if v0 is not None:
+            desplazamiento, factor = mezcla_velocidad(len(self.rampa_inicio), self.duracion_inicio,
+                                                      self.control_dt)
+            v0 = np.asarray(v0, dtype=np.float32)
+            inicio = inicio + desplazamiento[:, None] * v0
+            velocidades_inicio = velocidades_inicio + factor[:, None] * v0
+        tabla = np.ascontiguousarray(np.concatenate([inicio, self.tabla]), dtype=np.float32)
+        velocidades = np.ascontiguousarray(
+            np.concatenate([velocidades_inicio, self.velocidades]), dtype=np.float32)
+        pares = None
+        if self.pares is not None and modelo is not None:
+            pares = np.ascontiguousarray(
+                np.concatenate([modelo.pares_gravedad(inicio), self.pares]), dtype=np.float32)
+        return RutinaCompilada(
+            self.nombre,
+            np.empty(0, dtype=np.float32),
+            self.destino_inicio,
+            tabla,
+            self.ticks_por_paso,
+            self.control_dt,
+            velocidades,
+            pares=pares,
+        )
+
+    def preparar_gravedad(self, modelo):
+        """Calcula una sola vez el par de gravedad de las filas ya resueltas."""
+        if self.pares is None:
+            self.pares = np.ascontiguousarray(modelo.pares_gravedad(self.tabla), dtype=np.float32)
+
+    def indice(self, tick):
+        """Fila de un tick de una rutina resuelta; al terminar, la pose final."""
+        return min(tick, len(self.tabla) - 1)
+
+    def fila(self, tick):
+        """Consigna de posición para un tick de una rutina resuelta."""
+        return self.tabla[self.indice(tick)]
+
+
+class RutinaBinaria:
+    """
+    Rutina leída del formato binario. `posiciones` es una vista (memmap o
+    buffer) de forma (pasos, articulaciones), con NaN donde el paso no define
+    la articulación; `meta` guarda el resto del JSON original.
+    """
+
+    def __init__(self, articulaciones, duraciones, posiciones, meta):
+        self.articulaciones = articulaciones
+        self.duraciones = duraciones
+        self.posiciones = posiciones
+        self.meta = meta
+
+    @property
+    def nombre(self):
+        return self.meta.get("nombre_rutina", "rutina")
+
+    def validar(self):
+        """Mismas comprobaciones que validar_rutina -> (destinos (pasos, 17), duraciones)."""
+        n_pasos = len(self.duraciones)
+        if n_pasos == 0:
+            raise RutinaInvalida("La rutina no tiene pasos.")
+        articulaciones = [int(j) for j in self.articulaciones]
+        ajenas = [j for j in articulaciones if j not in COLUMNA]
+        if ajenas:
+            raise RutinaInvalida(f"Las articulaciones {ajenas} no son de brazos ni cintura.")
+        if len(set(articulaciones)) != len(articulaciones):
+            raise RutinaInvalida("Articulaciones repetidas en la cabecera.")
+        duraciones = np.asarray(self.duraciones, dtype=np.float64)
+        malas = np.flatnonzero(~np.isfinite(duraciones) | (duraciones <= 0))
+        if len(malas):
+            raise RutinaInvalida(f"Paso {malas[0] + 1}: duración no válida: {duraciones[malas[0]]!r}.")
+        posiciones = np.asarray(self.posiciones, dtype=np.float64)
+        if np.isinf(posiciones).any():
+            paso, columna = np.argwhere(np.isinf(posiciones))[0]
+            raise RutinaInvalida(f"Paso {paso + 1}: posición no válida para la articulación "
+                                 f"{articulaciones[columna]}.")
+        definidas = ~np.isnan(posiciones)
+        if not definidas.any(axis=1).all():
+            raise RutinaInvalida(f"Paso {np.flatnonzero(~definidas.any(axis=1))[0] + 1}: no tiene 'posiciones'.")
+        faltantes = sorted(set(ARM_JOINTS) - {j for j, d in zip(articulaciones, definidas[0]) if d})
+        if faltantes:
+            raise RutinaInvalida(f"Paso 1: faltan las articulaciones {faltantes}.")
+
+        # Las articulaciones que un paso no define conservan el valor anterior
+        ultima = np.maximum.accumulate(np.where(definidas, np.arange(n_pasos)[:, None], 0), axis=0)
+        destinos = np.empty((n_pasos, len(ARM_JOINTS)), dtype=np.float64)
+        destinos[:, [COLUMNA[j] for j in articulaciones]] = \
+            np.take_along_axis(posiciones, ultima, axis=0)
+        return destinos, duraciones
+
+    def a_json(self):
+        """Diccionario con el formato de los .txt (posiciones en float32)."""
+        data = {k: v for k, v in self.meta.items() if k != "nombres_pasos"}
+        nombres = self.meta.get("nombres_pasos") or [f"Paso {i + 1}" for i in range(len(self.duraciones))]
+        data["pasos"] = [
+            {
+                "nombre": nombre,
+                "posiciones": {str(int(j)): float(q) for j, q in zip(self.articulaciones, fila) if q == q},
+                "duracion": float(duracion),
+            }
+            for nombre, fila, duracion in zip(nombres, self.posiciones.tolist(), self.duraciones.tolist())
+        ]
+        return data
+
+
+def es_binaria(contenido):
+    return bytes(contenido[:len(MAGIA_BINARIA)]) == MAGIA_BINARIA
+
+
+def leer_binaria(fuente, ruta=None):
+    """
+    RutinaBinaria desde un buffer (bytes, mmap) o desde una ruta, que se
+    abre con np.memmap: la matriz no se copia ni se parsea.
+    """
+    ruta = ruta or fuente
+    try:
+        buffer = np.memmap(fuente, dtype=np.uint8, mode="r") if isinstance(fuente, str) else fuente
+        magia, version, n_art, n_pasos, largo_meta, offset = CABECERA_BINARIA.unpack_from(buffer)
+        if magia != MAGIA_BINARIA:
+            raise ValueError("no es una rutina binaria")
+        if version != VERSION_BINARIA:
+            raise ValueError(f"versión {version} no soportada")
+        pos = CABECERA_BINARIA.size
+        articulaciones = np.frombuffer(buffer, np.int16, n_art, pos)
+        pos += articulaciones.nbytes
+        duraciones = np.frombuffer(buffer, np.float64, n_pasos, pos)
+        pos += duraciones.nbytes
+        meta = json.loads(bytes(buffer[pos:pos + largo_meta]))
+        posiciones = np.frombuffer(buffer, np.float32, n_pasos * n_art, offset).reshape(n_pasos, n_art)
+    except (OSError, ValueError, struct.error) as e:
+        raise RutinaInvalida(f"No se pudo leer '{ruta}': {e}") from e
+    return RutinaBinaria(articulaciones, duraciones, posiciones, meta)
+
+
+def escribir_binaria(data, ruta):
+    """Guarda una rutina JSON (ya validada) en el formato binario."""
+    pasos = validar_rutina(data)
+    articulaciones = list(ARM_JOINTS)
+    for posiciones, _ in pasos:
+        articulaciones += [j for j in posiciones if j not in articulaciones]
+    columna = {j: i for i, j in enumerate(articulaciones)}
+    matriz = np.full((len(pasos), len(articulaciones)), np.nan, dtype=np.float32)
+    for i, (posiciones, _) in enumerate(pasos):
+        for joint, q in posiciones.items():
+            matriz[i, columna[joint]] = q
+
+    meta = {k: v for k, v in data.items() if k != "pasos"}
+    nombres = [paso.get("nombre", f"Paso {i + 1}") for i, paso in enumerate(data["pasos"])]
+    # Los nombres por defecto no se guardan: en una grabación larga serían casi todo el JSON
+    if nombres != [f"Paso {i + 1}" for i in range(len(nombres))]:
+        meta["nombres_pasos"] = nombres
+    meta = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+    cabeza = (np.array(articulaciones, dtype=np.int16).tobytes()
+              + np.array([d for _, d in pasos], dtype=np.float64).tobytes() + meta)
+    offset = -(-(CABECERA_BINARIA.size + len(cabeza)) // ALINEACION_BINARIA) * ALINEACION_BINARIA
+    with open(ruta, "wb") as f:
+        f.write(CABECERA_BINARIA.pack(MAGIA_BINARIA, VERSION_BINARIA, len(articulaciones), len(pasos),
+                                      len(meta), offset))
+        f.write(cabeza)
+        f.write(bytes(offset - CABECERA_BINARIA.size - len(cabeza)))
+        f.write(matriz.tobytes())
+
+
+def leer_datos(contenido, ruta):
+    """Datos de rutina (dict JSON o RutinaBinaria) desde el contenido del archivo."""
+    if es_binaria(contenido):
+        return leer_binaria(contenido, ruta)
+    try:
+        return json.loads(contenido)
+    except ValueError as e:
+        raise RutinaInvalida(f"No se pudo leer '{ruta}': {e}") from e
+
+
+def cargar_rutina(ruta):
+    """Lee un archivo de rutina: dict JSON, o RutinaBinaria si es binario."""
+    try:
+        with open(ruta, 'rb') as f:
+            cabeza = f.read(len(MAGIA_BINARIA))
+            if es_binaria(cabeza):
+                return leer_binaria(ruta)
+            return json.loads(cabeza + f.read())
+    except RutinaInvalida:
+        raise
+    except (OSError, ValueError) as e:
+        raise RutinaInvalida(f"No se pudo leer '{ruta}': {e}") from e
+
+
+def validar_rutina(data):
+    """
+    Revisa la rutina completa y devuelve la lista de pasos normalizada como
+    (posiciones {id: rad}, duracion). Lanza RutinaInvalida con el paso exacto
+    que falla.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get("pasos"), list):
+        raise RutinaInvalida("La rutina no tiene una lista de 'pasos'.")
+    if not data["pasos"]:
+        raise RutinaInvalida("La rutina no tiene pasos.")
+
+    pasos = []
+    for i, paso in enumerate(data["pasos"]):
+        etiqueta = f"Paso {i + 1}"
+        posiciones_txt = paso.get("posiciones") if isinstance(paso, dict) else None
+        if not isinstance(posiciones_txt, dict) or not posiciones_txt:
+            raise RutinaInvalida(f"{etiqueta}: no tiene 'posiciones'.")
+
+        posiciones = {}
+        for k, v in posiciones_txt.items():
+            try:
+                joint = int(k)
+            except (TypeError, ValueError):
+                raise RutinaInvalida(f"{etiqueta}: articulación no válida '{k}'.")
+            if joint not in COLUMNA:
+                raise RutinaInvalida(f"{etiqueta}: la articulación {joint} no es de brazos ni cintura.")
+            if isinstance(v, bool) or not isinstance(v, (int, float)) or not math.isfinite(v):
+                raise RutinaInvalida(f"{etiqueta}: posición no válida para la articulación {joint}: {v!r}.")
+            posiciones[joint] = float(v)
+
+        duracion = paso.get("duracion", DURACION_POR_DEFECTO)
+        if isinstance(duracion, bool) or not isinstance(duracion, (int, float)) \
+                or not math.isfinite(duracion) or duracion <= 0:
+            raise RutinaInvalida(f"{etiqueta}: duración no válida: {duracion!r}.")
+
+        pasos.append((posiciones, float(duracion)))
+
+    faltantes = [j for j in ARM_JOINTS if j not in pasos[0][0]]
+    if faltantes:
+        raise RutinaInvalida(f"Paso 1: faltan las articulaciones {faltantes}.")
+    return pasos
+
+
+def ticks_de(duracion, control_dt=CONTROL_DT):
+    """Ticks que dura un paso (t = 0, dt, 2dt, ... mientras t < duracion)."""
+    return max(1, math.ceil(duracion / control_dt - 1e-9))
+
+
+def rampa_coseno(n, duracion, control_dt=CONTROL_DT):
+    """Ratio (1 - cos(pi t/T)) / 2 evaluado en los n ticks de un paso."""
+    t = np.arange(n, dtype=np.float64) * control_dt
+    return (1.0 - np.cos(np.pi * np.minimum(t / duracion, 1.0))) / 2.0
+
+
+def derivada_coseno(n, duracion, control_dt=CONTROL_DT):
+    """Derivada temporal (1/s) de rampa_coseno en los mismos ticks."""
+    t = np.arange(n, dtype=np.float64) * control_dt
+    return np.pi / (2.0 * duracion) * np.sin(np.pi * np.minimum(t / duracion, 1.0))
+
+
+def mezcla_velocidad(n, duracion, control_dt=CONTROL_DT):
+    """
+    Término de Hermite T s (1 - s)^2 (s = t/T) y su derivada: sumado con peso
+    v0 a un paso, le da velocidad inicial v0 sin cambiar sus extremos.
+    """
+    s = np.minimum(np.arange(n, dtype=np.float64) * control_dt / duracion, 1.0)
+    return duracion * s * (1.0 - s) ** 2, (1.0 - s) * (1.0 - 3.0 * s)
+
+
+def compilar_rutina(data, control_dt=CONTROL_DT, nombre=None, modo="coseno"):
+    """Valida la rutina (dict JSON o RutinaBinaria) y la convierte en una RutinaCompilada."""
+    if modo not in MODOS:
+        raise RutinaInvalida(f"Modo de reproducción desconocido: {modo!r}.")
+    destinos, duraciones = resolver_pasos(data)
+    if nombre is None:
+        nombre = data.nombre if isinstance(data, RutinaBinaria) else data.get("nombre_rutina", "rutina")
+    return compilar_destinos(destinos, duraciones, control_dt, nombre, modo)
+
+
+def resolver_pasos(data):
+    """
+    Valida la rutina (dict JSON o RutinaBinaria) y devuelve los destinos
+    completos (pasos, 17) y la lista de duraciones.
+    """
+    if isinstance(data, RutinaBinaria):
+        destinos, duraciones = data.validar()
+        return destinos, duraciones.tolist()
+
+    pasos = validar_rutina(data)
+    # Las articulaciones que un paso no define conservan el valor anterior
+    destinos = np.empty((len(pasos), len(ARM_JOINTS)), dtype=np.float64)
+    for i, (posiciones, _) in enumerate(pasos):
+        if i > 0:
+            destinos[i] = destinos[i - 1]
+        for joint, q in posiciones.items():
+            destinos[i, COLUMNA[joint]] = q
+    return destinos, [duracion for _, duracion in pasos]
+
+
+def compilar_destinos(destinos, duraciones, control_dt, nombre, modo="coseno"):
+    """RutinaCompilada desde los destinos completos (pasos, 17) y la duración de cada paso."""
+    from modelo_g1 import limites_urdf  # modelo_g1 importa este módulo
+    inferior, superior = limites_urdf()
+    destinos = np.clip(destinos, inferior, superior)
+    ticks_por_paso = [ticks_de(duracion, control_dt) for duracion in duraciones]
+    rampa_inicio = rampa_coseno(ticks_por_paso[0], duraciones[0], control_dt).astype(np.float32)
+    derivada_inicio = derivada_coseno(ticks_por_paso[0], duraciones[0], control_dt).astype(np.float32)
+
+    bloques = []
+    bloques_dq = []
+    if modo == "fluido" and len(duraciones) > 1:
+        q, dq = interpolar_fluido(destinos, ticks_por_paso[1:], control_dt)
+        bloques.append(q)
+        bloques_dq.append(dq)
+    elif len(duraciones) > 1:
+        # Todos los pasos de una vez (las grabaciones tienen miles de pasos de un tick)
+        ticks = np.array(ticks_por_paso[1:])
+        paso = np.repeat(np.arange(1, len(duraciones)), ticks)
+        t = (np.arange(len(paso)) - np.repeat(np.cumsum(ticks) - ticks, ticks)) * control_dt
+        duracion = np.asarray(duraciones, dtype=np.float64)[paso]
+        fase = np.pi * np.minimum(t / duracion, 1.0)
+        q0 = destinos[paso - 1]
+        delta = destinos[paso] - q0
+        bloques.append(q0 + delta * ((1.0 - np.cos(fase)) / 2.0)[:, None])
+        bloques_dq.append(delta * (np.pi / (2.0 * duracion) * np.sin(fase))[:, None])
+    bloques.append(destinos[-1][None, :])
+    bloques_dq.append(np.zeros((1, len(ARM_JOINTS))))
+    tabla = np.concatenate(bloques)
+    velocidades = np.concatenate(bloques_dq)
+    # Con los destinos dentro de los límites ninguno de los dos modos debería
+    # salirse; el recorte final es la garantía de lo que llega al robot
+    recortada = np.clip(tabla, inferior, superior)
+    velocidades[recortada != tabla] = 0.0
+    tabla = np.ascontiguousarray(recortada, dtype=np.float32)
+    velocidades = np.ascontiguousarray(velocidades, dtype=np.float32)
+
+    return RutinaCompilada(
+        nombre,
+        rampa_inicio,
+        destinos[0].astype(np.float32),
+        tabla,
+        ticks_por_paso,
+        control_dt,
+        velocidades,
+        derivada_inicio,
+        duracion_inicio=duraciones[0],
+    )
+
+
+def rutina_frenado(q, v, control_dt=CONTROL_DT, duracion=DURACION_FRENADO, nombre="frenar"):
+    """
+    Rutina de un paso que, reproducida desde (q, v), frena sin invertir el
+    sentido y se queda quieta: el destino está a medio camino de lo que se
+    recorrería a velocidad constante.
+    """
+    q = np.asarray(q, dtype=np.float32)
+    destino = (q + np.asarray(v, dtype=np.float32) * (duracion / 2)).astype(np.float32)
+    n = ticks_de(duracion, control_dt)
+    return RutinaCompilada(
+        nombre,
+        rampa_coseno(n, duracion, control_dt).astype(np.float32),
+        destino,
+        destino.reshape(1, -1).copy(),
+        [n],
+        control_dt,
+        derivada_inicio=derivada_coseno(n, duracion, control_dt).astype(np.float32),
+        duracion_inicio=duracion,
+    )
+
+
+def rutina_fija(q, control_dt=CONTROL_DT, nombre="mantener"):
+    """Rutina sin pasos que solo mantiene la posición q (17 valores)."""
+    return RutinaCompilada(
+        nombre,
+        np.empty(0, dtype=np.float32),
+        np.asarray(q, dtype=np.float32),
+        np.asarray(q, dtype=np.float32).reshape(1, -1).copy(),
+        [],
+        control_dt,
+    )
+
+
+def cargar_y_compilar(ruta, control_dt=CONTROL_DT, modo="coseno"):
+    """Atajo: lee el archivo y devuelve la rutina compilada."""
+    return compilar_rutina(cargar_rutina(ruta), control_dt, modo=modo)
@@ -0,0 +1,185 @@
+"""
+Seguimiento de consigna contra medida durante la reproducción.
+
+El hilo de control guarda en cada tick publicado la consigna (q, dq) y la
+medida de rt/lowstate en ese momento en un buffer circular preasignado: dos
+copias de fila y una lectura de 17 motores, sin reservar memoria. Todo el
+análisis se hace fuera del hilo de control, al pedir el resumen:
+
+    - error de seguimiento (medida - consigna) por articulación: RMS, máximo,
+      percentil 95 e histograma con BORDES_HISTOGRAMA;
+    - retraso estimado: desplazamiento (en ticks) que maximiza la correlación
+      cruzada entre consigna y medida, solo en articulaciones que se movieron;
+    - tiempo de asentamiento de cada paso: desde que la consigna llega al
+      destino del paso hasta que todas las articulaciones quedan a menos de
+      TOLERANCIA_ASENTAMIENTO de él (None si no llega antes de que termine
+      el paso siguiente).
+
+La medida de un tick es el último LowState recibido, así que el retraso
+incluye el de la comunicación (al menos un tick).
+"""
+import numpy as np
+
+from rutinas import ARM_JOINTS
+
+DURACION_MAXIMA = 120.0
+# Después del último paso se sigue registrando este tiempo (s), para ver cómo se asienta
+ESPERA_FINAL = 1.0
+BORDES_HISTOGRAMA = (0.0, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, np.inf)
+TOLERANCIA_ASENTAMIENTO = 0.02
+RETRASO_MAXIMO = 0.3
+# Articulaciones con menos recorrido (rad) no se usan para estimar el retraso
+RECORRIDO_MINIMO = 0.05
+
+
+class RegistroSeguimiento:
+    """
+    Buffer circular de ticks de la rutina en curso. Lo escribe solo el hilo de
+    control (con el lock del reproductor); `datos()` se llama con el mismo lock.
+    """
+
+    def __init__(self, control_dt, duracion_maxima=DURACION_MAXIMA, articulaciones=ARM_JOINTS):
+        self.control_dt = control_dt
+        self.articulaciones = list(articulaciones)
+        self.capacidad = int(duracion_maxima / control_dt)
+        forma = (self.capacidad, len(self.articulaciones))
+        self.t = np.zeros(self.capacidad, dtype=np.float64)
+        self.fase = np.zeros(self.capacidad, dtype=np.int64)
+        self.q_cmd = np.zeros(forma, dtype=np.float32)
+        self.dq_cmd = np.zeros(forma, dtype=np.float32)
+        self.q_med = np.zeros(forma, dtype=np.float32)
+        self.dq_med = np.zeros(forma, dtype=np.float32)
+        self.escritas = 0
+        self.rutina = None
+        self.ultima_fase = -1
+
+    def empezar(self, rutina):
+        """Nueva rutina: lo registrado de la anterior se descarta."""
+        self.rutina = rutina
+        self.escritas = 0
+        self.ultima_fase = rutina.ticks + int(ESPERA_FINAL / self.control_dt)
+
+    def terminar(self):
+        """Deja de registrar sin descartar nada (otra rutina, interna, tomó el control)."""
+        self.ultima_fase = -1
+
+    def registrar(self, ahora, fase, q_cmd, dq_cmd, estado):
+        # Terminada la rutina, mantener la pose no se registra: no pisa lo anterior
+        if fase > self.ultima_fase:
+            return
+        i = self.escritas % self.capacidad
+        motores = estado.motor_state
+        self.t[i] = ahora
+        self.fase[i] = fase
+        self.q_cmd[i] = q_cmd
+        self.dq_cmd[i] = dq_cmd
+        self.q_med[i] = [motores[j].q for j in self.articulaciones]
+        self.dq_med[i] = [motores[j].dq for j in self.articulaciones]
+        self.escritas += 1
+
+    def datos(self):
+        """Copia en orden de lo registrado de la rutina actual, o None si no hay nada."""
+        n = self.escritas
+        if n == 0 or self.rutina is None:
+            return None
+        if n <= self.capacidad:
+            orden = slice(0, n)
+        else:
+            orden = np.roll(np.arange(self.capacidad), -(n % self.capacidad))
+        datos = {nombre: getattr(self, nombre)[orden].copy()
+                 for nombre in ("t", "fase", "q_cmd", "dq_cmd", "q_med", "dq_med")}
+        datos["rutina"] = self.rutina.nombre
+        datos["ticks_por_paso"] = list(self.rutina.ticks_por_paso)
+        datos["control_dt"] = self.control_dt
+        datos["incompleto"] = n > self.capacidad
+        return datos
+
+
+def retrasos(q_cmd, q_med, max_desplazamiento):
+    """
+    Desplazamiento (filas) que maximiza la correlación cruzada normalizada
+    entre consigna y medida de cada columna; -1 si la columna casi no se movió.
+    """
+    n, columnas = q_cmd.shape
+    resultado = np.full(columnas, -1, dtype=np.int64)
+    movidas = np.flatnonzero(np.ptp(q_cmd, axis=0) >= RECORRIDO_MINIMO)
+    max_desplazamiento = min(max_desplazamiento, n // 2)
+    if not len(movidas) or max_desplazamiento < 1:
+        return resultado
+    a = q_cmd[:, movidas] - q_cmd[:, movidas].mean(axis=0)
+    b = q_med[:, movidas] - q_med[:, movidas].mean(axis=0)
+    correlaciones = np.empty((max_desplazamiento + 1, len(movidas)))
+    for k in range(max_desplazamiento + 1):
+        x, y = a[:n - k], b[k:]
+        norma = np.sqrt((x * x).sum(axis=0) * (y * y).sum(axis=0))
+        correlaciones[k] = (x * y).sum(axis=0) / np.maximum(norma, 1e-12)
+    resultado[movidas] = correlaciones.argmax(axis=0)
+    return resultado
+
+
+def asentamientos(datos, tolerancia=TOLERANCIA_ASENTAMIENTO):
+    """
+    Por paso: (segundos desde que la consigna llega al destino hasta quedar en
+    tolerancia, error máximo en ese momento). La consigna llega al destino del
+    paso en la fase en que empieza el siguiente.
+    """
+    fase, q_cmd, q_med, t = datos["fase"], datos["q_cmd"], datos["q_med"], datos["t"]
+    fines = np.cumsum(datos["ticks_por_paso"])
+    resultado = []
+    for k, fin in enumerate(fines):
+        siguiente = fines[k + 1] if k + 1 < len(fines) else np.inf
+        # Filas desde la llegada hasta que termina el paso siguiente
+        a = np.searchsorted(fase, fin)
+        b = np.searchsorted(fase, siguiente, side="right") if np.isfinite(siguiente) else len(fase)
+        if a >= len(fase):
+            break
+        error = np.abs(q_med[a:b] - q_cmd[a]).max(axis=1)
+        dentro = np.flatnonzero(error < tolerancia)
+        tiempo = float(t[a + dentro[0]] - t[a]) if len(dentro) else None
+        resultado.append((tiempo, float(error[0])))
+    return resultado
+
+
+def resumir(datos, articulaciones=ARM_JOINTS, bordes=BORDES_HISTOGRAMA):
+    """Resumen (dict serializable a JSON) de lo registrado durante una rutina."""
+    error = np.abs(datos["q_med"].astype(np.float64) - datos["q_cmd"])
+    periodo = float(np.median(np.diff(datos["t"]))) if len(datos["t"]) > 1 else datos["control_dt"]
+    desplazamientos = retrasos(datos["q_cmd"], datos["q_med"], int(RETRASO_MAXIMO / max(periodo, 1e-6)))
+    por_articulacion = {}
+    for k, joint in enumerate(articulaciones):
+        por_articulacion[str(joint)] = {
+            "error_rms": round(float(np.sqrt((error[:, k] ** 2).mean())), 5),
+            "error_max": round(float(error[:, k].max()), 5),
+            "error_p95": round(float(np.percentile(error[:, k], 95)), 5),
+            "retraso_s": round(desplazamientos[k] * periodo, 4) if desplazamientos[k] >= 0 else None,
+            "histograma": np.histogram(error[:, k], bins=bordes)[0].tolist(),
+        }
+    pasos = [{"paso": k + 1, "asentamiento_s": None if tiempo is None else round(tiempo, 4),
+              "error_al_llegar": round(error_llegada, 5)}
+             for k, (tiempo, error_llegada) in enumerate(asentamientos(datos))]
+    return {
+        "rutina": datos["rutina"],
+        "ticks": len(datos["t"]),
+        "periodo_ms": round(periodo * 1000, 3),
+        "incompleto": datos["incompleto"],
+        "bordes_histograma": [b if np.isfinite(b) else None for b in bordes],
+        "articulaciones": por_articulacion,
+        "pasos": pasos,
+    }
+
+
+def imprimir_resumen(resumen):
+    print(f"\nSeguimiento de '{resumen['rutina']}' ({resumen['ticks']} ticks de {resumen['periodo_ms']:.1f} ms)")
+    bordes = resumen["bordes_histograma"]
+    etiquetas = [f"<{b * 1000:g}" if b is not None else f">={bordes[-2] * 1000:g}" for b in bordes[1:]]
+    print(f"  {'joint':>5} {'rms':>7} {'max':>7} {'retraso':>8}   histograma |error| (mrad: "
+          + " ".join(etiquetas) + ")")
+    for joint, d in resumen["articulaciones"].items():
+        retraso = f"{d['retraso_s'] * 1000:6.0f}ms" if d["retraso_s"] is not None else "       -"
+        print(f"  {joint:>5} {d['error_rms']:7.4f} {d['error_max']:7.4f} {retraso:>8}   "
+              + " ".join(f"{c:5d}" for c in d["histograma"]))
+    asentados = [p["asentamiento_s"] for p in resumen["pasos"] if p["asentamiento_s"] is not None]
+    if resumen["pasos"]:
+        print(f"  Pasos asentados: {len(asentados)}/{len(resumen['pasos'])}"
+              + (f", asentamiento medio {np.mean(asentados) * 1000:.0f} ms, máximo {max(asentados) * 1000:.0f} ms"
+                 if asentados else ""))
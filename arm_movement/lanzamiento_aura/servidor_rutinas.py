@@ -0,0 +1,302 @@
+"""
+Reproductor de rutinas persistente.
+
+Mantiene vivos un único publicador de `rt/arm_sdk` y un suscriptor de
+`rt/lowstate`, y recibe órdenes por un socket Unix local. Así cada gesto no
+tiene que volver a importar la SDK, inicializar DDS y esperar el primer
+LowState antes de moverse.
+
+Un "play" con otra rutina en marcha la reemplaza en el próximo tick,
+mezclando desde la consigna y velocidad actuales (ver ArmSequence.iniciar).
+Quién puede mandar lo decide el árbitro (arbitro.py): cada orden lleva un
+"cliente" y una "prioridad"; un "play" toma una concesión que dura lo que la
+rutina, y las órdenes de clientes con menos prioridad se rechazan mientras
+esté vigente.
+
+Protocolo: una línea JSON por orden y una línea JSON de respuesta.
+    {"cmd": "play", "ruta": "gestos/saludoR.txt", "liberar": true, "esperar": false, "modo": "coseno",
+     "cliente": "wasd", "prioridad": 1}
+    {"cmd": "play", "ruta": "gestos/saludoR.txt", "grupo": "BRAZO_DER", "peso": 1.0, "mantener": false}
+                         capa: solo mueve ese grupo, encima de la rutina principal
+    {"cmd": "quitar", "grupo": "BRAZO_DER"}   devuelve el grupo (o todos) a la rutina principal
+    {"cmd": "stop"}      frena la rutina en curso y mantiene la pose
+    {"cmd": "release"}   congela y libera el control de los brazos
+    {"cmd": "adquirir", "duracion": 10.0}   reserva los brazos sin mover nada
+    {"cmd": "soltar"}    devuelve la concesión antes de que venza
+    {"cmd": "estado"}    rutina actual, dueño de los brazos y temporización del hilo de control
+    {"cmd": "seguimiento"}   error de seguimiento, retraso y asentamiento de la rutina actual o la última
+
+Con --rapido las rutinas se compilan y publican a 500 Hz; --sin-dq y
+--gravedad cambian el feed-forward (ver reproductor.py); --sin-seguimiento
+desactiva el registro de consigna contra medida. Con --perfil los callbacks
+se miden (ver perfilador.py), "estado" incluye el informe y se vuelca con
+SIGUSR1 y al salir.
+
+Uso:
+    python3 servidor_rutinas.py <interfaz_red> [ruta_socket] [--rapido] [--sin-dq] [--gravedad] [--sin-seguimiento]
+                               [--perfil]
+"""
+import json
+import math
+import os
+import socketserver
+import sys
+import threading
+import time
+
+from unitree_sdk2py.core.channel import ChannelFactoryInitialize
+
+from arbitro import DURACION_CONCESION, PRIORIDAD_GESTO, ArbitroBrazos
+from biblioteca import BibliotecaRutinas
+from modelo_g1 import ModeloG1
+from perfilador import Perfilador
+from cliente_rutinas import RUTA_SOCKET
+from reproductor import ArmSequence
+from rutinas import CONTROL_DT, CONTROL_DT_RAPIDO, GRUPOS, RutinaInvalida
+
+ESPERA_PRIMER_TICK = 1.0
+# La concesión de un play dura la rutina más este margen
+MARGEN_CONCESION = 1.0
+# Defecto de los campos sin valor por defecto
+OBLIGATORIO = object()
+
+
+class CampoFaltante(ValueError):
+    """A una orden le falta un campo obligatorio."""
+
+
+def campo_de(orden, campo, defecto):
+    if defecto is OBLIGATORIO and campo not in orden:
+        raise CampoFaltante(f"Falta el campo '{campo}'.")
+    return orden.get(campo, defecto)
+
+
+def numero(orden, campo, defecto, entero=False):
+    """Campo numérico de una orden; ValueError si no es un número finito (o entero, si se pide)."""
+    valor = campo_de(orden, campo, defecto)
+    valido = int if entero else (int, float)
+    if isinstance(valor, bool) or not isinstance(valor, valido) or not math.isfinite(valor):
+        raise ValueError(f"'{campo}' tiene que ser un número{' entero' if entero else ''}: {valor!r}")
+    return valor
+
+
+def texto(orden, campo, defecto=None):
+    """Campo de texto de una orden (o `defecto` si falta); ValueError si no es texto."""
+    valor = campo_de(orden, campo, defecto)
+    if valor is not defecto and not isinstance(valor, str):
+        raise ValueError(f"'{campo}' tiene que ser texto: {valor!r}")
+    return valor
+
+
+class ServidorRutinas:
+    def __init__(self, seq, biblioteca, arbitro=None):
+        self.seq = seq
+        self.biblioteca = biblioteca
+        self.arbitro = arbitro if arbitro is not None else ArbitroBrazos()
+        self.lock = threading.Lock()
+        self.actual = None
+
+    def rechazo(self):
+        return {"ok": False, "error": "Los brazos los controla otro cliente con más prioridad.",
+                "propietario": self.arbitro.estado()}
+
+    def play(self, ruta, liberar=False, esperar=False, modo="coseno", cliente=None, prioridad=PRIORIDAD_GESTO,
+             grupo=None, peso=1.0, mantener=False):
+        t_orden = time.monotonic()
+        # Antes de pedir la concesión: una orden rechazada no debe quedarse con los brazos
+        if grupo is not None and grupo not in GRUPOS:
+            raise RutinaInvalida(f"Grupo de articulaciones desconocido: {grupo!r}.")
+        rutina = self.biblioteca.obtener(ruta, modo)
+        with self.lock:
+            if self.arbitro.solicitar(cliente, prioridad, rutina.duracion + MARGEN_CONCESION) is None:
+                return self.rechazo()
+            if grupo is not None:
+                rutina, respuesta = self.play_capa(rutina, grupo, peso, mantener, t_orden)
+            else:
+                rutina = self.seq.iniciar(rutina)
+                self.actual = rutina
+                # El evento de esta rutina: otro play lo reemplaza en seq, no lo reinicia
+                primer_tick = self.seq.primer_tick
+        if grupo is not None:
+            # Se espera fuera del lock: mientras tanto los demás clientes pueden frenar o quitar la capa
+            if esperar:
+                self.seq.esperar(rutina)
+            return respuesta
+        if not primer_tick.wait(ESPERA_PRIMER_TICK):
+            return {"ok": False, "error": "El hilo de control no publicó el primer tick."}
+        respuesta = {
+            "ok": True,
+            "rutina": rutina.nombre,
+            "duracion": rutina.duracion,
+            "latencia_primer_tick": time.monotonic() - t_orden,
+        }
+
+        if liberar:
+            hilo = threading.Thread(target=self.liberar_al_terminar, args=(rutina, cliente), daemon=True)
+            hilo.start()
+            if esperar:
+                hilo.join()
+        elif esperar:
+            self.seq.esperar(rutina)
+        return respuesta
+
+    def play_capa(self, rutina, grupo, peso, mantener, t_orden):
+        """
+        Capa sobre un grupo: no cambia la rutina principal ni libera los brazos
+        al terminar. Se llama con el lock -> (rutina resuelta, respuesta).
+        """
+        rutina = self.seq.iniciar_capa(grupo, rutina, peso, mantener)
+        if self.actual is None:
+            self.actual = self.seq.rutina
+        respuesta = {
+            "ok": True,
+            "rutina": rutina.nombre,
+            "grupo": grupo,
+            "duracion": rutina.duracion,
+            "latencia_orden": time.monotonic() - t_orden,
+        }
+        return rutina, respuesta
+
+    def quitar(self, grupo=None, cliente=None, prioridad=PRIORIDAD_GESTO):
+        with self.lock:
+            if not self.arbitro.permite(cliente, prioridad):
+                return self.rechazo()
+            self.seq.quitar_capa(grupo)
+        return {"ok": True}
+
+    def liberar_al_terminar(self, rutina, cliente):
+        self.seq.esperar(rutina)
+        with self.lock:
+            # Si otra orden reemplazó la rutina, ya no nos toca liberar
+            if self.actual is rutina:
+                self.seq.freeze_and_release()
+                self.actual = None
+                self.arbitro.soltar(cliente)
+
+    def stop(self, cliente=None, prioridad=PRIORIDAD_GESTO):
+        with self.lock:
+            if not self.arbitro.permite(cliente, prioridad):
+                return self.rechazo()
+            self.seq.detener()
+            self.actual = self.seq.rutina
+        return {"ok": True}
+
+    def release(self, cliente=None, prioridad=PRIORIDAD_GESTO):
+        with self.lock:
+            if not self.arbitro.permite(cliente, prioridad):
+                return self.rechazo()
+            self.seq.freeze_and_release()
+            self.actual = None
+            self.arbitro.anular()
+        return {"ok": True}
+
+    def adquirir(self, cliente, prioridad, duracion):
+        concesion = self.arbitro.solicitar(cliente, prioridad, duracion)
+        if concesion is None:
+            return self.rechazo()
+        return {"ok": True, "token": concesion.token, "propietario": self.arbitro.estado()}
+
+    def soltar(self, cliente):
+        return {"ok": self.arbitro.soltar(cliente), "propietario": self.arbitro.estado()}
+
+    def estado(self):
+        rutina = self.actual
+        return {
+            "ok": True,
+            "rutina": rutina.nombre if rutina is not None else None,
+            "en_curso": rutina is not None and self.seq.en_curso(rutina),
+            "capas": {g: {"rutina": c.rutina.nombre, "peso": c.peso} for g, c in list(self.seq.capas.items())},
+            "propietario": self.arbitro.estado(),
+            "reloj": self.seq.reloj.estadisticas(),
+            "perfil": self.seq.perfil.informe() if self.seq.perfil is not None else None,
+        }
+
+    def atender(self, orden):
+        if not isinstance(orden, dict):
+            return {"ok": False, "error": "La orden tiene que ser un objeto JSON."}
+        try:
+            cmd = orden.get("cmd")
+            cliente = orden.get("cliente")
+            prioridad = numero(orden, "prioridad", PRIORIDAD_GESTO, entero=True)
+            if cmd == "play":
+                return self.play(texto(orden, "ruta", OBLIGATORIO), orden.get("liberar", False),
+                                 orden.get("esperar", False), texto(orden, "modo", "coseno"), cliente, prioridad,
+                                 texto(orden, "grupo"), numero(orden, "peso", 1.0), orden.get("mantener", False))
+            elif cmd == "quitar":
+                return self.quitar(texto(orden, "grupo"), cliente, prioridad)
+            elif cmd == "stop":
+                return self.stop(cliente, prioridad)
+            elif cmd == "release":
+                return self.release(cliente, prioridad)
+            elif cmd == "adquirir":
+                return self.adquirir(cliente, prioridad, numero(orden, "duracion", DURACION_CONCESION))
+            elif cmd == "soltar":
+                return self.soltar(cliente)
+            elif cmd == "estado":
+                return self.estado()
+            elif cmd == "seguimiento":
+                return {"ok": True, "seguimiento": self.seq.resumen_seguimiento()}
+            return {"ok": False, "error": f"Orden no reconocida: {cmd!r}"}
+        except (RutinaInvalida, ValueError, TypeError) as e:
+            return {"ok": False, "error": str(e)}
+
+
+class ManejadorConexion(socketserver.StreamRequestHandler):
+    def handle(self):
+        for linea in self.rfile:
+            try:
+                orden = json.loads(linea)
+            except ValueError:
+                respuesta = {"ok": False, "error": "JSON no válido."}
+            else:
+                respuesta = self.server.rutinas.atender(orden)
+            self.wfile.write((json.dumps(respuesta) + "\n").encode())
+            self.wfile.flush()
+
+
+class ServidorUnix(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if not args:
+        print(f"Uso: python3 {sys.argv[0]} <interfaz_red> [ruta_socket] [--rapido] [--sin-dq] [--gravedad]"
+              " [--sin-seguimiento] [--perfil]")
+        sys.exit(1)
+    ruta_socket = args[1] if len(args) > 1 else RUTA_SOCKET
+    control_dt = CONTROL_DT_RAPIDO if "--rapido" in sys.argv else CONTROL_DT
+
+    biblioteca = BibliotecaRutinas(control_dt=control_dt)
+    t0 = time.monotonic()
+    n = biblioteca.cargar_todo()
+    print(f"{n} rutinas compiladas en {(time.monotonic() - t0) * 1000:.0f} ms")
+    for ruta, error in biblioteca.errores.items():
+        print(f"  Rutina con errores: {os.path.relpath(ruta, biblioteca.base)}: {error}")
+
+    ChannelFactoryInitialize(0, args[0])
+    modelo = ModeloG1() if "--gravedad" in sys.argv else None
+    perfil = Perfilador().instalar() if "--perfil" in sys.argv else None
+    seq = ArmSequence(control_dt, feedforward="--sin-dq" not in sys.argv, modelo=modelo,
+                      seguimiento="--sin-seguimiento" not in sys.argv, perfil=perfil)
+    seq.Init()
+    print("Esperando conexión con el robot...")
+    seq.Start()
+
+    if os.path.exists(ruta_socket):
+        os.unlink(ruta_socket)
+    servidor = ServidorUnix(ruta_socket, ManejadorConexion)
+    servidor.rutinas = ServidorRutinas(seq, biblioteca)
+    print(f"Reproductor de rutinas escuchando en {ruta_socket} ({1 / control_dt:.0f} Hz)")
+
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\nCerrando reproductor de rutinas...")
+    finally:
+        servidor.server_close()
+        os.unlink(ruta_socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Simplificación de rutinas con error acotado.
+
+Quita pasos redundantes (repetidos, casi iguales o alineados con sus vecinos)
+sin que la trayectoria reproducida se aparte más de `tolerancia` rad en
+ninguna articulación. El error se mide con el modelo de interpolación del
+reproductor y siempre contra la rutina original, así que no se acumula:
+
+- coseno: al quitar un paso, su vecino lleva directamente del paso anterior
+  al siguiente en la suma de las dos duraciones; solo cambia ese tramo, que
+  se compara con el original muestreado cada MUESTREO s. Como cada paso
+  termina en reposo, aquí solo sobran pasos que repiten una pausa.
+- fluido: la interpolación se vuelve a calcular sin el paso y se compara entera,
+  cada CONTROL_DT. Es O(pasos^2) ajustes; pensado para rutinas de decenas
+  de pasos o grabaciones ya reducidas con grabacion.py.
+
+Se quita cada vez el paso cuyo retiro cuesta menos, mientras quepa en la
+tolerancia. El primer paso (el que parte de la pose del robot) se conserva.
+Los pasos que quedan se guardan con todas las articulaciones resueltas.
+
+Uso:
+    python3 simplificar_rutinas.py [rutina|directorio ...] [--tolerancia 0.01] [--fluido] [--escribir]
+Sin rutas se revisa toda la biblioteca. Sin --escribir solo se informa.
+"""
+import json
+import os
+import sys
+
+import numpy as np
+
+from biblioteca import BibliotecaRutinas, EXTENSIONES_RUTINA
+from rutinas import (ARM_JOINTS, CONTROL_DT, RutinaBinaria, RutinaInvalida, cargar_rutina, compilar_rutina,
+                     escribir_binaria, resolver_pasos, ticks_de)
+from trayectorias import evaluar_hermite, pendientes_monotonas
+
+TOLERANCIA = 0.01
+MUESTREO = 0.002
+
+
+def instantes_de(duraciones, control_dt=CONTROL_DT):
+    """
+    Instante en que el reproductor alcanza cada paso (cada duración se
+    redondea a ticks, como al compilar). El tiempo 0 es el final del primer paso.
+    """
+    return np.concatenate([[0.0], np.cumsum([ticks_de(d, control_dt) for d in duraciones[1:]])]) * control_dt
+
+
+def muestrear(destinos, duraciones, dt=MUESTREO):
+    """Trayectoria original (coseno) muestreada -> (tiempos, posiciones, instantes de cada paso)."""
+    instantes = instantes_de(duraciones)
+    tiempos = np.arange(0.0, instantes[-1], dt)
+    paso = np.clip(np.searchsorted(instantes, tiempos, side="right"), 1, len(instantes) - 1)
+    # Dentro del paso la rampa usa la duración real; el redondeo a ticks es una pausa al final
+    fase = np.pi * np.clip((tiempos - instantes[paso - 1]) / np.asarray(duraciones)[paso], 0.0, 1.0)
+    q0 = destinos[paso - 1]
+    posiciones = q0 + (destinos[paso] - q0) * ((1.0 - np.cos(fase)) / 2.0)[:, None]
+    # Los instantes de los pasos también son muestras (ahí la original pasa exacta)
+    tiempos = np.concatenate([tiempos, instantes])
+    posiciones = np.vstack([posiciones, destinos])
+    orden = np.argsort(tiempos, kind="stable")
+    return tiempos[orden], posiciones[orden], instantes
+
+
+def error_tramo(tiempos, posiciones, instantes, destinos, a, b):
+    """Máxima desviación (rad) si se va directo del paso a al paso b."""
+    i = np.searchsorted(tiempos, instantes[a], side="left")
+    j = np.searchsorted(tiempos, instantes[b], side="right")
+    t = tiempos[i:j]
+    ratio = (1.0 - np.cos(np.pi * (t - instantes[a]) / (instantes[b] - instantes[a]))) / 2.0
+    modelo = destinos[a] + (destinos[b] - destinos[a]) * ratio[:, None]
+    return float(np.abs(posiciones[i:j] - modelo).max(initial=0.0))
+
+
+def simplificar(destinos, duraciones, tolerancia=TOLERANCIA, modo="coseno"):
+    """
+    Índices de los pasos que se conservan y sus nuevas duraciones. Al quitar
+    un paso, su duración pasa al siguiente que queda; ese paso dura entonces
+    un número exacto de ticks, para que el resto de la rutina no se desplace.
+    """
+    n = len(duraciones)
+    if n <= 2:
+        return list(range(n)), list(duraciones)
+    if modo == "fluido":
+        conservados, instantes = simplificar_fluido(destinos, duraciones, tolerancia)
+    else:
+        conservados, instantes = simplificar_coseno(destinos, duraciones, tolerancia)
+    nuevas = [duraciones[0]] + [duraciones[b] if b == a + 1 else round(float(instantes[b] - instantes[a]), 6)
+                                for a, b in zip(conservados[:-1], conservados[1:])]
+    return conservados, nuevas
+
+
+def simplificar_coseno(destinos, duraciones, tolerancia):
+    n = len(duraciones)
+    tiempos, posiciones, instantes = muestrear(destinos, duraciones)
+
+    anterior = np.arange(-1, n - 1)
+    siguiente = np.arange(1, n + 1)
+    vivo = np.ones(n, dtype=bool)
+    coste = np.full(n, np.inf)
+
+    def evaluar(k):
+        if 0 < k < n - 1 and vivo[k]:
+            coste[k] = error_tramo(tiempos, posiciones, instantes, destinos, anterior[k], siguiente[k])
+
+    for k in range(1, n - 1):
+        evaluar(k)
+    while True:
+        k = int(coste.argmin())
+        if coste[k] > tolerancia:
+            break
+        vivo[k] = False
+        coste[k] = np.inf
+        a, b = anterior[k], siguiente[k]
+        siguiente[a], anterior[b] = b, a
+        evaluar(a)
+        evaluar(b)
+
+    return np.flatnonzero(vivo).tolist(), instantes
+
+
+def simplificar_fluido(destinos, duraciones, tolerancia, dt=CONTROL_DT):
+    instantes = instantes_de(duraciones)
+    t_eval = np.arange(0.0, instantes[-1], dt)
+    original = evaluar_hermite(instantes, destinos, pendientes_monotonas(instantes, destinos), t_eval)
+
+    def error(indices):
+        t, q = instantes[indices], destinos[indices]
+        return np.abs(evaluar_hermite(t, q, pendientes_monotonas(t, q), t_eval) - original).max()
+
+    conservados = list(range(len(duraciones)))
+    while len(conservados) > 2:
+        costes = [error(conservados[:i] + conservados[i + 1:]) for i in range(1, len(conservados) - 1)]
+        i = int(np.argmin(costes))
+        if costes[i] > tolerancia:
+            break
+        del conservados[i + 1]
+    return conservados, instantes
+
+
+def desviacion(original, nueva, control_dt=CONTROL_DT, modo="coseno"):
+    """Máxima diferencia (rad) entre las tablas compiladas, alineadas en el tiempo."""
+    a = compilar_rutina(original, control_dt, modo=modo).tabla
+    b = compilar_rutina(nueva, control_dt, modo=modo).tabla
+    n = min(len(a), len(b))
+    return float(np.abs(a[:n] - b[:n]).max())
+
+
+def rutina_simplificada(data, tolerancia=TOLERANCIA, modo="coseno"):
+    """Diccionario de rutina con los pasos simplificados (o None si no se quita nada)."""
+    destinos, duraciones = resolver_pasos(data)
+    conservados, nuevas = simplificar(destinos, duraciones, tolerancia, modo)
+    if len(conservados) == len(duraciones):
+        return None
+    meta = data.meta if isinstance(data, RutinaBinaria) else data
+    nueva = {k: v for k, v in meta.items() if k not in ("pasos", "nombres_pasos")}
+    nueva["pasos"] = [
+        {
+            "nombre": f"Paso {i + 1}",
+            "posiciones": {str(j): float(q) for j, q in zip(ARM_JOINTS, destinos[k])},
+            "duracion": duracion,
+        }
+        for i, (k, duracion) in enumerate(zip(conservados, nuevas))
+    ]
+    if "numero_pasos" in nueva:
+        nueva["numero_pasos"] = len(nueva["pasos"])
+    return nueva
+
+
+def guardar(ruta, data, binaria):
+    if binaria:
+        escribir_binaria(data, ruta)
+    else:
+        with open(ruta, 'w') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def rutas_de(argumentos):
+    if not argumentos:
+        biblioteca = BibliotecaRutinas()
+        biblioteca.cargar_todo()
+        return sorted(biblioteca.entradas)
+    rutas = []
+    for arg in argumentos:
+        if os.path.isdir(arg):
+            rutas += [os.path.join(arg, a) for a in sorted(os.listdir(arg)) if a.endswith(EXTENSIONES_RUTINA)]
+        else:
+            rutas.append(arg)
+    return rutas
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    tolerancia = TOLERANCIA
+    if "--tolerancia" in sys.argv:
+        tolerancia = float(sys.argv[sys.argv.index("--tolerancia") + 1])
+        args.remove(sys.argv[sys.argv.index("--tolerancia") + 1])
+    escribir = "--escribir" in sys.argv
+    modo = "fluido" if "--fluido" in sys.argv else "coseno"
+
+    total_antes = total_despues = 0
+    print(f"Tolerancia {tolerancia} rad, modo {modo}" + ("" if escribir else " (solo informe, usar --escribir)"))
+    for ruta in rutas_de(args):
+        try:
+            data = cargar_rutina(ruta)
+            nueva = rutina_simplificada(data, tolerancia, modo)
+        except RutinaInvalida as e:
+            print(f"  {ruta}: error: {e}")
+            continue
+        antes = len(resolver_pasos(data)[1])
+        despues = antes if nueva is None else len(nueva["pasos"])
+        total_antes += antes
+        total_despues += despues
+        if nueva is None:
+            continue
+        print(f"  {os.path.relpath(ruta):40} {antes:4d} -> {despues:4d} pasos"
+              f"  error {desviacion(data, nueva, modo=modo):.4f} rad")
+        if escribir:
+            guardar(ruta, nueva, isinstance(data, RutinaBinaria))
+    print(f"Total: {total_antes} -> {total_despues} pasos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Transformaciones de rutinas completas: espejo, inversión temporal, cambio de
+velocidad, desplazamiento por articulación y recorte de pasos.
+
+Todas trabajan sobre los destinos resueltos (pasos, 17) y las duraciones, y
+el resultado se limita a los rangos articulares del URDF. Una variante se
+escribe como la ruta de la rutina base seguida de '#' y las operaciones
+separadas por comas, y se genera al cargarla en lugar de guardarse como
+archivo aparte:
+
+    entrevista/micpecho_C.txt#offset:12=0.5     (girar la cintura a la izquierda)
+    coordinacion/contorcion.txt#pasos=0:4,invertir
+    gestos/saludoR.txt#espejo,velocidad=1.5
+
+Operaciones:
+    espejo          intercambia los brazos (y refleja cintura yaw y roll)
+    espejo_izq      el brazo izquierdo copia en espejo al derecho
+    espejo_der      el brazo derecho copia en espejo al izquierdo (modo 3 de la captura)
+    invertir        recorre los pasos al revés
+    velocidad=F     divide las duraciones por F
+    offset:J=V      suma V rad a la articulación J (id o grupo de GRUPOS)
+    pasos=A:B       solo los pasos A..B-1 (como un slice de Python)
+
+Uso:
+    python3 transformaciones.py <rutina.txt#operaciones> [salida.txt]
+"""
+import json
+import sys
+
+import numpy as np
+
+from modelo_g1 import limites_urdf
+from rutinas import (ARM_JOINTS, BRAZO_IZQ, COLUMNA, CONTROL_DT, GRUPOS, RutinaBinaria, RutinaInvalida,
+                     cargar_rutina, compilar_destinos, compilar_rutina, resolver_pasos)
+
+SEPARADOR_VARIANTE = "#"
+
+# Brazo izquierdo -> (brazo derecho, signo); el mismo que MIRROR_MAP de captura_tuneada2.py
+ESPEJO_BRAZOS = {
+    15: (22, 1), 16: (23, -1), 17: (24, -1), 18: (25, 1),
+    19: (26, -1), 20: (27, 1), 21: (28, -1),
+}
+# Al reflejar izquierda/derecha la cintura gira y se inclina al otro lado
+ESPEJO_CINTURA = {12: -1, 13: -1, 14: 1}
+
+
+def columnas(joints):
+    return [COLUMNA[j] for j in joints]
+
+
+IZQ = columnas(BRAZO_IZQ)
+DER = columnas([ESPEJO_BRAZOS[j][0] for j in BRAZO_IZQ])
+SIGNOS = np.array([ESPEJO_BRAZOS[j][1] for j in BRAZO_IZQ], dtype=np.float64)
+
+
+def espejo(destinos):
+    q = destinos.copy()
+    q[:, IZQ], q[:, DER] = destinos[:, DER] * SIGNOS, destinos[:, IZQ] * SIGNOS
+    for joint, signo in ESPEJO_CINTURA.items():
+        q[:, COLUMNA[joint]] *= signo
+    return q
+
+
+def espejo_izq(destinos):
+    q = destinos.copy()
+    q[:, IZQ] = destinos[:, DER] * SIGNOS
+    return q
+
+
+def espejo_der(destinos):
+    q = destinos.copy()
+    q[:, DER] = destinos[:, IZQ] * SIGNOS
+    return q
+
+
+def invertir(destinos, duraciones):
+    """
+    Los pasos al revés. El paso k va de la pose n-k a la n-1-k, así que dura
+    lo que duraba el paso n-k; el primero (desde el robot) conserva su duración.
+    """
+    duraciones = np.asarray(duraciones, dtype=np.float64)
+    return destinos[::-1].copy(), np.concatenate([duraciones[:1], duraciones[:0:-1]])
+
+
+def desplazar(destinos, offsets):
+    """Suma `offsets` {id o grupo: rad} a las columnas correspondientes."""
+    q = destinos.copy()
+    for clave, valor in offsets.items():
+        joints = GRUPOS[clave] if clave in GRUPOS else [int(clave)]
+        q[:, columnas(joints)] += valor
+    return q
+
+
+def limitar(destinos, inferior=None, superior=None):
+    """Recorta a los límites articulares -> (destinos, cuántos valores se recortaron)."""
+    if inferior is None:
+        inferior, superior = limites_urdf()
+    q = np.clip(destinos, inferior, superior)
+    return q, int(np.count_nonzero(q != destinos))
+
+
+def interpretar(operaciones):
+    """Lista de (nombre, argumento) a partir de 'espejo,velocidad=1.5,...'."""
+    resultado = []
+    for texto in filter(None, (o.strip() for o in operaciones.split(","))):
+        nombre, _, argumento = texto.partition("=")
+        if nombre.startswith("offset:"):
+            nombre, clave = "offset", nombre[len("offset:"):]
+            argumento = (clave, argumento)
+        if nombre not in ("espejo", "espejo_izq", "espejo_der", "invertir", "velocidad", "offset", "pasos"):
+            raise RutinaInvalida(f"Transformación desconocida: {texto!r}.")
+        resultado.append((nombre, argumento))
+    return resultado
+
+
+def transformar(destinos, duraciones, operaciones, limites=True):
+    """Aplica las operaciones en orden -> (destinos, duraciones, valores recortados)."""
+    q = np.asarray(destinos, dtype=np.float64)
+    d = np.asarray(duraciones, dtype=np.float64)
+    try:
+        for nombre, argumento in interpretar(operaciones) if isinstance(operaciones, str) else operaciones:
+            if nombre == "espejo":
+                q = espejo(q)
+            elif nombre == "espejo_izq":
+                q = espejo_izq(q)
+            elif nombre == "espejo_der":
+                q = espejo_der(q)
+            elif nombre == "invertir":
+                q, d = invertir(q, d)
+            elif nombre == "velocidad":
+                factor = float(argumento)
+                if not factor > 0:
+                    raise ValueError(f"velocidad no válida: {argumento!r}")
+                d = d / factor
+            elif nombre == "offset":
+                clave, valor = argumento
+                q = desplazar(q, {clave: float(valor)})
+            elif nombre == "pasos":
+                inicio, _, fin = argumento.partition(":")
+                tramo = slice(int(inicio) if inicio else None, int(fin) if fin else None)
+                q, d = q[tramo], d[tramo]
+                if not len(d):
+                    raise ValueError(f"el tramo {argumento!r} no tiene pasos")
+    except (ValueError, KeyError) as e:
+        raise RutinaInvalida(f"Transformación no válida ({operaciones}): {e}") from e
+    recortados = 0
+    if limites:
+        q, recortados = limitar(q)
+    return q, d, recortados
+
+
+def separar_variante(ruta):
+    """'base.txt#ops' -> ('base.txt', 'ops'); sin '#', ops es None."""
+    base, separador, operaciones = ruta.partition(SEPARADOR_VARIANTE)
+    return base, (operaciones if separador else None)
+
+
+def compilar_variante(data, operaciones, control_dt=CONTROL_DT, modo="coseno", nombre=None):
+    """RutinaCompilada de una rutina cargada con las operaciones aplicadas."""
+    destinos, duraciones = resolver_pasos(data)
+    destinos, duraciones, _ = transformar(destinos, duraciones, operaciones)
+    if nombre is None:
+        base = data.nombre if isinstance(data, RutinaBinaria) else data.get("nombre_rutina", "rutina")
+        nombre = f"{base}{SEPARADOR_VARIANTE}{operaciones}"
+    return compilar_destinos(destinos, duraciones.tolist(), control_dt, nombre, modo)
+
+
+def cargar_variante(ruta, control_dt=CONTROL_DT, modo="coseno"):
+    """Como rutinas.cargar_y_compilar, aceptando 'ruta#operaciones'."""
+    base, operaciones = separar_variante(ruta)
+    data = cargar_rutina(base)
+    if operaciones is None:
+        return compilar_rutina(data, control_dt, modo=modo)
+    return compilar_variante(data, operaciones, control_dt, modo)
+
+
+def rutina_variante(ruta):
+    """Diccionario de rutina (formato de los .txt) con la variante aplicada."""
+    base, operaciones = separar_variante(ruta)
+    data = cargar_rutina(base)
+    destinos, duraciones, recortados = transformar(*resolver_pasos(data), operaciones or "")
+    meta = data.meta if isinstance(data, RutinaBinaria) else data
+    nueva = {k: v for k, v in meta.items() if k not in ("pasos", "nombres_pasos")}
+    nueva["pasos"] = [
+        {"nombre": f"Paso {i + 1}",
+         "posiciones": {str(j): float(q) for j, q in zip(ARM_JOINTS, fila)},
+         "duracion": float(duracion)}
+        for i, (fila, duracion) in enumerate(zip(destinos, duraciones))
+    ]
+    if "numero_pasos" in nueva:
+        nueva["numero_pasos"] = len(nueva["pasos"])
+    return nueva, recortados
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(f"Uso: python3 {sys.argv[0]} <rutina.txt#operaciones> [salida.txt]")
+        sys.exit(1)
+    try:
+        nueva, recortados = rutina_variante(sys.argv[1])
+    except RutinaInvalida as e:
+        sys.exit(f"Error: {e}")
+    if recortados:
+        print(f"Aviso: {recortados} valores recortados a los límites del URDF.", file=sys.stderr)
+    texto = json.dumps(nueva, indent=2, ensure_ascii=False)
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], 'w') as f:
+            f.write(texto)
+        print(f"{len(nueva['pasos'])} pasos guardados en '{sys.argv[2]}'.")
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Interpolación continua por todos los puntos de paso de una rutina.
+
+Cúbica de Hermite monótona por tramos (PCHIP, Fritsch-Carlson), con
+velocidad cero al inicio y al final: los brazos pasan por cada posición sin
+detenerse y la velocidad es continua. Cada tramo queda entre sus dos puntos
+(en un máximo o mínimo local la velocidad es cero), así que la trayectoria
+nunca se sale de la envolvente de los puntos de paso, a diferencia de una
+spline C2. Todas las articulaciones se resuelven a la vez (una columna por
+articulación).
+"""
+import numpy as np
+
+
+def pendientes_monotonas(tiempos, valores):
+    """
+    Velocidad (n+1, articulaciones) en cada punto de `valores` (n+1,
+    articulaciones) en los instantes `tiempos` (n+1,): media armónica
+    ponderada de las pendientes vecinas, cero si cambian de signo y en los extremos.
+    """
+    t = np.asarray(tiempos, dtype=np.float64)
+    y = np.asarray(valores, dtype=np.float64)
+    h = np.diff(t)[:, None]
+    d = np.diff(y, axis=0) / h
+
+    m = np.zeros_like(y)
+    if len(t) > 2:
+        d0, d1 = d[:-1], d[1:]
+        w0 = 2 * h[1:] + h[:-1]
+        w1 = h[1:] + 2 * h[:-1]
+        mismo_signo = d0 * d1 > 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            media = (w0 + w1) / (w0 / d0 + w1 / d1)
+        m[1:-1] = np.where(mismo_signo, media, 0.0)
+    return m
+
+
+def _tramos(tiempos, t_eval):
+    t = np.asarray(tiempos, dtype=np.float64)
+    t_eval = np.clip(np.asarray(t_eval, dtype=np.float64), t[0], t[-1])
+    i = np.clip(np.searchsorted(t, t_eval, side='right') - 1, 0, len(t) - 2)
+    h = (t[i + 1] - t[i])[:, None]
+    s = (t_eval - t[i])[:, None] / h
+    return i, h, s
+
+
+def evaluar_hermite(tiempos, valores, pendientes, t_eval):
+    """Posición de la interpolación en los instantes `t_eval` (m,) -> (m, articulaciones)."""
+    y = np.asarray(valores, dtype=np.float64)
+    m = pendientes
+    i, h, s = _tramos(tiempos, t_eval)
+    s2, s3 = s * s, s * s * s
+    return ((2 * s3 - 3 * s2 + 1) * y[i] + (s3 - 2 * s2 + s) * h * m[i]
+            + (3 * s2 - 2 * s3) * y[i + 1] + (s3 - s2) * h * m[i + 1])
+
+
+def derivar_hermite(tiempos, valores, pendientes, t_eval):
+    """Velocidad analítica de la interpolación en los instantes `t_eval` (m,) -> (m, articulaciones)."""
+    y = np.asarray(valores, dtype=np.float64)
+    m = pendientes
+    i, h, s = _tramos(tiempos, t_eval)
+    s2 = s * s
+    return ((6 * s2 - 6 * s) * (y[i] - y[i + 1]) / h + (3 * s2 - 4 * s + 1) * m[i]
+            + (3 * s2 - 2 * s) * m[i + 1])
+
+
+def interpolar_fluido(destinos, ticks_por_paso, control_dt):
+    """
+    Tablas de posición y velocidad (ticks, articulaciones) que recorren
+    `destinos` sin detenerse.
+
+    Cada punto se alcanza en el mismo tick que en el modo por pasos (la
+    duración de cada paso redondeada a ticks), así que la duración total y
+    los límites entre pasos no cambian.
+    """
+    tiempos = np.concatenate([[0.0], np.cumsum(ticks_por_paso)]) * control_dt
+    pendientes = pendientes_monotonas(tiempos, destinos)
+    t_eval = np.arange(int(sum(ticks_por_paso))) * control_dt
+    return (evaluar_hermite(tiempos, destinos, pendientes, t_eval),
+            derivar_hermite(tiempos, destinos, pendientes, t_eval))
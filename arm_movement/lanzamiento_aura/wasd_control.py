@@ -9,6 +9,9 @@ import termios
 from unitree_sdk2py.core.channel import ChannelFactoryInitialize
 from unitree_sdk2py.g1.loco.g1_loco_client import LocoClient
 
+import cliente_rutinas
+from arbitro import PRIORIDAD_SEGURIDAD
+
 # Constantes de velocidad
 FORWARD_SPEED = 0.3
 LATERAL_SPEED = 0.3
@@ -128,8 +131,8 @@ def main():
                 yaw = -ROTATION_SPEED
             elif key == 'r':
                 print("Liberando control de los brazos...")
-                import subprocess
-                subprocess.Popen(["python3", "release_arm_sdk.py", sys.argv[1]])
+                cliente_rutinas.ejecutar_script("release_arm_sdk.py", sys.argv[1], esperar=False,
+                                                prioridad=PRIORIDAD_SEGURIDAD)
                 print("Control de los brazos liberado.")
                 info_controles()
             elif key == '1':
@@ -148,50 +151,42 @@ def main():
                 info_controles()
             elif key == '4':
                 print("Ejecutando...")
-                import subprocess
-                subprocess.Popen(["python3", "entrada_saludo.py", sys.argv[1]])
+                cliente_rutinas.ejecutar_script("entrada_saludo.py", sys.argv[1], esperar=False)
                 print("Ejecucion finalizada.")
                 info_controles()
             elif key == '5':
                 print("Ejecutando...")
-                import subprocess
-                subprocess.Popen(["python3", "saludoR.py", sys.argv[1]])
+                cliente_rutinas.ejecutar_script("saludoR.py", sys.argv[1], esperar=False)
                 print("Ejecucion finalizada.")
                 info_controles()
             elif key == '6':
                 print("Ejecutando...")
-                import subprocess
-                subprocess.Popen(["python3", "abrazo.py", sys.argv[1]])
+                cliente_rutinas.ejecutar_script("abrazo.py", sys.argv[1], esperar=False)
                 print("Ejecucion finalizada.")
                 info_controles()
             elif key == '7':
                 print("Ejecutando...")
-                import subprocess
-                subprocess.Popen(["python3", "gallina.py", sys.argv[1]])
+                cliente_rutinas.ejecutar_script("gallina.py", sys.argv[1], esperar=False)
                 print("Ejecucion finalizada.")
                 info_controles()
             elif key == '8':
                 print("Ejecutando...")
-                import subprocess
-                subprocess.Popen(["python3", "hi5.py", sys.argv[1]])
+                cliente_rutinas.ejecutar_script("hi5.py", sys.argv[1], esperar=False)
                 print("Ejecucion finalizada.")
                 info_controles()
             elif key == '9':
                 print("Ejecutando...")
-                import subprocess
-                subprocess.Popen(["python3", "sorprendido.py", sys.argv[1]])
+                cliente_rutinas.ejecutar_script("sorprendido.py", sys.argv[1], esperar=False)
                 print("Ejecucion finalizada.")
                 info_controles()
             elif key == '0':
                 print("Ejecutando...")
-                import subprocess
-                subprocess.Popen(["python3", "ohno.py", sys.argv[1]])
+                cliente_rutinas.ejecutar_script("ohno.py", sys.argv[1], esperar=False)
                 print("Ejecucion finalizada.")
                 info_controles()
             elif key == 'm':
                 print("Ejecutando...")
-                import subprocess
-                subprocess.Popen(["python3", "macarena.py", sys.argv[1]])
+                cliente_rutinas.ejecutar_script("macarena.py", sys.argv[1], esperar=False)
                 print("Ejecucion finalizada.")
                 info_controles()
             elif key == 'h':